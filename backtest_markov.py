@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Walk-forward backtest of the order-3/order-5 agreement signal
+
+Replays super_markov's FINAL TRADING SIGNAL out of sample:
+- Before each candle, each order predicts from the transition counts seen
+  SO FAR (never the candle itself or anything after it)
+- Trade only when both orders agree on GREEN/RED at >= 55%
+- LONG on GREEN, SHORT on RED, held from Open to Close of that candle,
+  with 5x leverage by default (a leveraged loss beyond -100% wipes the
+  equity out for good)
+
+The counts grow one candle at a time, but the whole history is computed in
+one vectorized pass: after a stable sort by state, "counts before candle t"
+is an exclusive cumulative sum inside each state's group. That keeps it
+O(N log N) per ticker instead of refitting calc_probs at every day (O(N^2)).
+Doji candles carry no color, so they never enter a state or a count, like
+in super_markov; but a doji is only known once it closes, so trades landing
+on one are kept and scored as misses with 0 return.
+"""
+
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from price_cache import load_prices
+from super_markov import SIGNAL_THRESHOLD, candle_mask, read_universe, scan_pool, state_codes
+
+
+ORDERS = (3, 5)
+
+
+def prior_counts(codes: np.ndarray, nexts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """U and D counts of each transition's state among all EARLIER transitions"""
+    n = len(codes)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sorted_nexts = nexts[order].astype(np.int64)
+
+    pos = np.arange(n)
+    starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]] if n else np.zeros(0, dtype=bool)
+    group_start = np.maximum.accumulate(np.where(starts, pos, 0)) if n else pos
+
+    d_before_all = np.cumsum(sorted_nexts) - sorted_nexts
+    d_before = d_before_all - d_before_all[group_start]
+    u_before = (pos - group_start) - d_before
+
+    n_u = np.empty(n, dtype=np.int64)
+    n_d = np.empty(n, dtype=np.int64)
+    n_u[order] = u_before
+    n_d[order] = d_before
+    return n_u, n_d
+
+
+def walk_forward_predictions(bits: np.ndarray, order: int,
+                             threshold: float = SIGNAL_THRESHOLD) -> Tuple[np.ndarray, np.ndarray]:
+    """Direction (+1 GREEN, -1 RED, 0 NEUTRAL/NO DATA) and confidence predicted before each candle
+
+    Both arrays are aligned with bits; the first `order` candles have no state
+    and get direction 0.
+    """
+    direction = np.zeros(len(bits), dtype=np.int8)
+    confidence = np.zeros(len(bits))
+    if len(bits) <= order:
+        return direction, confidence
+
+    n_u, n_d = prior_counts(state_codes(bits, order), bits[order:])
+    n = n_u + n_d
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pu = np.where(n > 0, n_u / n, 0.0)
+        pdown = np.where(n > 0, n_d / n, 0.0)
+
+    direction[order:] = np.where(pu >= threshold, 1, np.where(pdown >= threshold, -1, 0))
+    confidence[order:] = np.maximum(pu, pdown)
+    return direction, confidence
+
+
+def backtest_frame(df: pd.DataFrame, leverage: float = 5.0,
+                   threshold: float = SIGNAL_THRESHOLD) -> pd.DataFrame:
+    """Per-candle walk-forward record: both predictions, the trade taken and the equity curve
+
+    Every row gets the prediction made before it opens. A bar only turns out
+    to be a doji once it closes, so trades on dojis (and NaN bars) stay in
+    the record as non-hits with 0 return.
+    """
+    opens = df['Open'].to_numpy(dtype=float)
+    closes = df['Close'].to_numpy(dtype=float)
+    keep = candle_mask(df)
+    bits = (closes[keep] < opens[keep]).astype(np.uint8)
+
+    # Colored candles closed before each row; the prediction made after them
+    # holds until the next one (a placeholder bit covers rows after the last)
+    seen = np.cumsum(keep) - keep
+    padded = np.r_[bits, np.uint8(0)]
+    dir3, conf3 = (x[seen] for x in walk_forward_predictions(padded, ORDERS[0], threshold))
+    dir5, conf5 = (x[seen] for x in walk_forward_predictions(padded, ORDERS[1], threshold))
+
+    signal = np.where((dir3 == dir5) & (dir3 != 0), dir3, 0)
+    actual = np.where(keep, np.where(closes < opens, -1, 1), 0)
+    candle_return = np.where(keep, closes / opens - 1, 0.0)
+    trade_return = leverage * signal * candle_return
+
+    return pd.DataFrame({
+        'order3': dir3,
+        'order3_conf': conf3,
+        'order5': dir5,
+        'order5_conf': conf5,
+        'signal': signal,
+        'actual': actual,
+        'doji': ~keep,
+        'hit': (signal != 0) & (signal == actual),
+        'trade_return': trade_return,
+        'equity': np.cumprod(np.maximum(1 + trade_return, 0.0)),
+    }, index=df.index)
+
+
+def summarize(record: pd.DataFrame) -> Dict:
+    """Hit rate, coverage and equity statistics of one backtest record
+
+    Eligible rows start once max(ORDERS) colored candles have closed; doji
+    trades count as misses and are also reported on their own.
+    """
+    colored = ~record['doji'].to_numpy(dtype=bool)
+    eligible = record[np.cumsum(colored) - colored >= max(ORDERS)]
+    trades = eligible[eligible['signal'] != 0]
+    equity = record['equity']
+    drawdown = equity / equity.cummax() - 1 if len(equity) else equity
+
+    return {
+        'candles': int(len(record)),
+        'trades': int(len(trades)),
+        'longs': int((trades['signal'] > 0).sum()),
+        'shorts': int((trades['signal'] < 0).sum()),
+        'doji_trades': int(trades['doji'].sum()),
+        'coverage': len(trades) / len(eligible) if len(eligible) else 0.0,
+        'hit_rate': float(trades['hit'].mean()) if len(trades) else np.nan,
+        'total_return': float(equity.iloc[-1] - 1) if len(equity) else 0.0,
+        'max_drawdown': float(drawdown.min()) if len(drawdown) else 0.0,
+    }
+
+
+def backtest_ticker(ticker: str, leverage: float = 5.0, threshold: float = SIGNAL_THRESHOLD,
+                    cache_dir: Optional[str] = None, offline: bool = False) -> Tuple[Dict, pd.Series]:
+    """Summary row and equity curve for one ticker"""
+    df = load_prices(ticker, cache_dir=cache_dir, offline=offline)
+    record = backtest_frame(df, leverage, threshold)
+    return {'ticker': ticker, **summarize(record)}, record['equity']
+
+
+def backtest_universe(tickers: List[str], workers: Optional[int] = None,
+                      **kwargs) -> Tuple[pd.DataFrame, Dict[str, pd.Series]]:
+    """Backtest many tickers across a process pool; returns summaries and equity curves"""
+    outputs = scan_pool(backtest_ticker, tickers, workers,
+                        lambda ticker, error: ({'ticker': ticker, 'error': error}, None), **kwargs)
+
+    summary = pd.DataFrame([row for row, _ in outputs])
+    for col in ['candles', 'trades', 'longs', 'shorts', 'doji_trades']:
+        if col in summary:
+            summary[col] = summary[col].astype("Int64")
+    curves = {row['ticker']: curve for row, curve in outputs if curve is not None}
+    if 'total_return' in summary:
+        summary = summary.sort_values('total_return', ascending=False, kind="stable")
+    return summary.reset_index(drop=True), curves
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Walk-forward backtest of the order-3/order-5 candle color agreement signal"
+    )
+    ap.add_argument("ticker", nargs="*", help="Stock tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    ap.add_argument("--leverage", type=float, default=5.0, help="Leverage per trade (default: 5)")
+    ap.add_argument("--threshold", type=float, default=SIGNAL_THRESHOLD,
+                    help=f"Minimum P(GREEN)/P(RED) per order (default: {SIGNAL_THRESHOLD})")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only")
+    ap.add_argument("--out", default="backtest_results.csv", help="Summary file, .csv or .json")
+    ap.add_argument("--curves", default=None, help="Also write equity curves (ticker, date, equity) to this CSV")
+    args = ap.parse_args()
+
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    if not tickers:
+        ap.error("give at least one ticker or --universe")
+
+    summary, curves = backtest_universe(tickers, workers=args.workers, leverage=args.leverage,
+                                        threshold=args.threshold, cache_dir=args.cache_dir,
+                                        offline=args.offline)
+
+    print(f"{'='*70}")
+    print(f"WALK-FORWARD BACKTEST ({len(tickers)} tickers, {args.leverage:g}x leverage)")
+    print(f"{'='*70}\n")
+
+    display = summary.astype(object)
+    for col in ['coverage', 'hit_rate', 'total_return', 'max_drawdown']:
+        if col in display:
+            display[col] = summary[col].map(lambda x: f"{x:.1%}" if pd.notna(x) else "")
+    print(display.fillna("").to_string(index=False))
+    print()
+
+    if args.out.endswith(".json"):
+        summary.to_json(args.out, orient="records", indent=2)
+    else:
+        summary.to_csv(args.out, index=False)
+    print(f"Summary written to {args.out}")
+
+    if args.curves and curves:
+        long = pd.concat(
+            [c.rename('equity').rename_axis('date').reset_index().assign(ticker=t)
+             for t, c in curves.items()]
+        )
+        long[['ticker', 'date', 'equity']].to_csv(args.curves, index=False)
+        print(f"Equity curves written to {args.curves}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
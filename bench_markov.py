@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Markov hot paths
+
+Times the reference implementations (build_pairs, calc_probs, last_state,
+the original row-by-row candle color, volume category and
+build_markov_model loops) and their
+vectorized counterparts on a deterministic synthetic OHLCV history at
+10k, 100k, 1M and 10M candles.
+
+Every run appends one JSON line per (case, size) to a results file, tagged
+with the git revision and library versions, so two versions can be compared:
+
+    python bench_markov.py                          # all sizes, append to bench_results.jsonl
+    python bench_markov.py --sizes 10000,100000 --repeat 5
+    python bench_markov.py --compare old.jsonl      # speedup vs an older results file
+    python bench_markov.py --check-only             # only verify fast == reference tables
+
+Before timing, the vectorized paths are checked against the reference
+implementations: a faster version must produce the same probability tables.
+The pure-Python reference loops take minutes at 10M rows, so they are only
+timed up to --max-reference rows (default 1M, 0 = no limit).
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+import simple_markov_etoro as etoro
+import super_markov as sm
+
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_RESULTS = "bench_results.jsonl"
+
+
+def synthetic_ohlcv(n: int, seed: int = 0) -> pd.DataFrame:
+    """Deterministic daily-like OHLCV history: log random walk, cent prices, some dojis"""
+    rng = np.random.default_rng(seed)
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[close[0], close[:-1]] * np.exp(rng.normal(0, 0.003, n))
+    open_, close = np.round(open_, 2), np.round(close, 2)
+
+    wick = np.abs(rng.normal(0, 0.004, (2, n))) * close
+    high = np.round(np.maximum(open_, close) + wick[0], 2)
+    low = np.round(np.minimum(open_, close) - wick[1], 2)
+    volume = np.round(rng.lognormal(13, 0.5, n))
+
+    index = pd.date_range("1970-01-01", periods=n, freq="min", name="Date")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                        index=index)
+
+
+def as_etoro(df: pd.DataFrame) -> pd.DataFrame:
+    """The same bars in get_ohlc_data()'s layout (lowercase columns, datetime column)"""
+    out = df.rename(columns=str.lower).reset_index(drop=True)
+    out.insert(0, "datetime", df.index)
+    return out
+
+
+def reference_candle_colors(df):
+    """The original row-by-row get_candle_colors()"""
+    return ["G" if df.iloc[i]["close"] >= df.iloc[i]["open"] else "R" for i in range(len(df))]
+
+
+def reference_volume_category(df):
+    """The original per-bar np.mean get_volume_category()"""
+    volumes = df["volume"].values
+    categories = []
+    for i in range(len(volumes)):
+        avg_vol = np.mean(volumes[:i+1]) if i < 20 else np.mean(volumes[i-20:i])
+        categories.append("H" if volumes[i] > avg_vol else "L")
+    return categories
+
+
+def reference_build_markov_model(df, pattern_length=3):
+    """The original build_markov_model(): one dict per occurrence, exp() per generator item"""
+    colors = reference_candle_colors(df)
+    volumes = reference_volume_category(df)
+    transitions = defaultdict(list)
+
+    for i in range(pattern_length, len(colors)):
+        pattern = "".join(colors[i-pattern_length:i])
+        volume_cat = volumes[i-1]
+        pattern_key = f"{pattern}_{volume_cat}"
+        next_color = colors[i]
+        transitions[pattern_key].append({
+            "next": next_color,
+            "index": i,
+            "date_offset": len(colors) - i
+        })
+
+    pattern_stats = {}
+    for pattern, occurrences in transitions.items():
+        total = len(occurrences)
+        if total == 0:
+            continue
+
+        green_count = sum(np.exp(-0.01 * occ["date_offset"]) for occ in occurrences if occ["next"] == "G")
+        red_count = sum(np.exp(-0.01 * occ["date_offset"]) for occ in occurrences if occ["next"] == "R")
+        total_weighted = green_count + red_count
+
+        pattern_stats[pattern] = {
+            "total_occurrences": total,
+            "p_bullish": green_count / total_weighted if total_weighted > 0 else 0.5,
+            "p_bearish": red_count / total_weighted if total_weighted > 0 else 0.5,
+            "last_seen": min([occ["date_offset"] for occ in occurrences]),
+            "occurrences": occurrences
+        }
+
+    return pattern_stats, colors, volumes
+
+
+class Case(NamedTuple):
+    name: str
+    reference: bool                      # pure-Python reference implementation
+    setup: Callable[[Dict], Tuple]       # untimed: frames -> args
+    run: Callable                        # timed
+
+
+def _frames(n: int, seed: int) -> Dict:
+    df = synthetic_ohlcv(n, seed)
+    return {"yf": df, "etoro": as_etoro(df), "bits": sm.encode_candles(df)}
+
+
+def _matrix_sweep(df):
+    """build_full_transition_matrix for pattern lengths 2..8, each fitted from scratch"""
+    etoro.clear_model_cache()
+    return [etoro.build_full_transition_matrix(df, length) for length in range(2, 9)]
+
+
+CASES: List[Case] = [
+    Case("build_pairs[order=5]", True, lambda f: (f["yf"], 5), sm.build_pairs),
+    Case("calc_probs[order=5]", True,
+         lambda f: (sm.build_pairs(f["yf"], 5), sm.generate_all_states(5)), sm.calc_probs),
+    Case("last_state[order=5]", True, lambda f: (f["yf"], 5), sm.last_state),
+    Case("reference_candle_colors", True, lambda f: (f["etoro"],), reference_candle_colors),
+    Case("reference_volume_category", True, lambda f: (f["etoro"],), reference_volume_category),
+    Case("get_candle_colors", False, lambda f: (f["etoro"],), etoro.get_candle_colors),
+    Case("get_volume_category", False, lambda f: (f["etoro"],), etoro.get_volume_category),
+    Case("reference_build_markov_model", True, lambda f: (f["etoro"],), reference_build_markov_model),
+    Case("fit_markov_model", False, lambda f: (f["etoro"],), etoro.fit_markov_model),
+    Case("build_markov_model[cached]", False,
+         lambda f: (etoro.build_markov_model(f["etoro"]) and f["etoro"],), etoro.build_markov_model),
+    Case("fit_markov_model[8 decays]", False,
+         lambda f: (f["etoro"], 3, etoro.NULL_PROFILER, etoro.VOLUME_WINDOW, etoro.VOLUME_EDGES,
+                    np.geomspace(0.001, 0.1, 8)),
+         etoro.fit_markov_model),
+    Case("transition_matrix[len=2..8]", False, lambda f: (f["etoro"],), _matrix_sweep),
+    Case("encode_candles", False, lambda f: (f["yf"],), sm.encode_candles),
+    Case("count_states[order=5]", False, lambda f: (f["bits"], 5), sm.count_states),
+    Case("count_all_orders[1..12]", False, lambda f: (f["bits"], 12), sm.count_all_orders),
+]
+
+
+def check_equivalence(n: int = 20_000, seed: int = 1) -> List[str]:
+    """Compare every vectorized path with its reference; returns failure messages"""
+    frames = _frames(n, seed)
+    df, bits = frames["yf"], frames["bits"]
+    failures = []
+
+    tables = sm.count_all_orders(bits, 8)
+    for order in range(1, 9):
+        all_states = sm.generate_all_states(order)
+        ref = sm.calc_probs(sm.build_pairs(df, order), all_states)
+        fast = sm.probs_from_counts(tables[order].to_dense(), all_states)
+        if not (ref.index.equals(fast.index) and np.array_equal(ref.to_numpy(), fast.to_numpy())):
+            failures.append(f"order={order}: count_all_orders table differs from calc_probs")
+
+        code = sm.last_state_code(bits, order)
+        if sm.last_state(df, order) != sm.decode_state(code, order):
+            failures.append(f"order={order}: last_state_code differs from last_state")
+
+    etoro_df = frames["etoro"]
+    if etoro.get_candle_colors(etoro_df) != reference_candle_colors(etoro_df):
+        failures.append("get_candle_colors differs from the row-by-row reference")
+    if etoro.get_volume_category(etoro_df) != reference_volume_category(etoro_df):
+        failures.append("get_volume_category differs from the per-bar mean reference")
+
+    ref_stats = reference_build_markov_model(etoro_df)[0]
+    fast_stats = etoro.fit_markov_model(etoro_df)[0]
+    if list(ref_stats) != list(fast_stats):
+        failures.append("build_markov_model patterns differ from the reference")
+    for key in ref_stats.keys() & fast_stats.keys():
+        ref, fast = ref_stats[key], fast_stats[key]
+        same = (ref["total_occurrences"] == fast["total_occurrences"]
+                and ref["last_seen"] == fast["last_seen"]
+                and np.isclose(ref["p_bullish"], fast["p_bullish"], rtol=1e-12, atol=0)
+                and np.isclose(ref["p_bearish"], fast["p_bearish"], rtol=1e-12, atol=0))
+        if not same:
+            failures.append(f"build_markov_model stats for {key} differ from the reference")
+
+    stream = etoro.StreamingMarkovModel()
+    for o, c, v in zip(etoro_df["open"].to_numpy(), etoro_df["close"].to_numpy(), etoro_df["volume"].to_numpy()):
+        stream.update(o, c, v)
+    stream_stats = stream.pattern_stats()
+    for key, fast in fast_stats.items():
+        streamed = stream_stats.get(key)
+        if (streamed is None or streamed["total_occurrences"] != fast["total_occurrences"]
+                or streamed["last_seen"] != fast["last_seen"]
+                or not np.isclose(streamed["p_bullish"], fast["p_bullish"], rtol=1e-9, atol=0)):
+            failures.append(f"StreamingMarkovModel stats for {key} differ from build_markov_model")
+
+    return failures
+
+
+def time_case(case: Case, frames: Dict, repeat: int) -> float:
+    """Best wall time of `repeat` runs"""
+    args = case.setup(frames)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        case.run(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path: str, new_rows: List[Dict]) -> pd.DataFrame:
+    """Speedup of the new rows against the latest matching rows of an older results file"""
+    with open(old_path) as f:
+        old = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    old = old.groupby(["case", "size"], as_index=False).last()
+    new = pd.DataFrame(new_rows)
+
+    merged = new.merge(old, on=["case", "size"], suffixes=("", "_old"))
+    merged["speedup"] = merged["seconds_old"] / merged["seconds"]
+    return merged[["case", "size", "seconds_old", "seconds", "speedup"]]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the Markov hot paths on synthetic OHLCV data")
+    ap.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                    help="Comma-separated candle counts")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per case, best time kept (default: 3)")
+    ap.add_argument("--max-reference", type=int, default=1_000_000,
+                    help="Largest size to time reference loops at (0 = no limit)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--cases", default=None, help="Only cases whose name contains one of these (comma-separated)")
+    ap.add_argument("--out", default=DEFAULT_RESULTS, help=f"JSON lines results file (default: {DEFAULT_RESULTS})")
+    ap.add_argument("--compare", default=None, help="Older results file to compute speedups against")
+    ap.add_argument("--check-only", action="store_true", help="Only run the equivalence checks")
+    args = ap.parse_args()
+
+    failures = check_equivalence()
+    for msg in failures:
+        print(f"[FAIL] {msg}")
+    if failures:
+        return 1
+    print("Equivalence checks passed: vectorized tables match the reference implementation.\n")
+    if args.check_only:
+        return 0
+
+    cases = CASES
+    if args.cases:
+        wanted = [w.strip() for w in args.cases.split(",")]
+        cases = [c for c in cases if any(w in c.name for w in wanted)]
+
+    meta = {
+        "revision": _revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        frames = _frames(size, args.seed)
+        for case in cases:
+            if case.reference and args.max_reference and size > args.max_reference:
+                continue
+            seconds = time_case(case, frames, args.repeat)
+            row = {**meta, "case": case.name, "size": size, "seconds": seconds,
+                   "reference": case.reference}
+            rows.append(row)
+            print(f"  {case.name:<28} {size:>11,}  {seconds * 1e3:>12.2f} ms")
+
+            with open(args.out, "a") as f:
+                f.write(json.dumps(row) + "\n")
+
+    print(f"\nResults appended to {args.out}")
+
+    if args.compare:
+        print()
+        print(compare(args.compare, rows).to_string(index=False))
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
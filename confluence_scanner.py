@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Confluence scanner: S/R + volume profile + order flow, scored per ticker
+
+The README's triple confirmation, computed for a whole universe. Each
+ticker's bars are loaded once and three components vote on a direction
+for the last bar:
+
+- S/R (40%): close within `near_pct` of the nearest support (BUY) or
+  resistance (SELL); the nearer one wins when both are close
+- Volume profile (30%): BELOW VA, or Lower VA near VAL (BUY); ABOVE VA, or
+  Upper VA near VAH (SELL); near the POC confirms whichever side the
+  others take
+- Order flow (30%): 3+ consecutive BUY IMB bins (BUY) or SELL IMB bins (SELL)
+
+The score is the summed weight of the components agreeing with the
+direction: ⭐⭐⭐ all three, ⭐⭐ two, ⭐ one. Components voting both ways
+make the setup CONFLICTING (❌, score 0, SKIP).
+
+The volume profile and order flow are binned together: one window range,
+one set of bins and one overlap computation (profile_bins() with the
+columns volume, buy, sell), so both use the profile's lookback and
+resolution rather than the order-flow script's own 10-bar profile.
+
+    python confluence_scanner.py NVDA AAPL TSLA
+    python confluence_scanner.py --universe universe.txt --workers 8 --out setups.csv
+"""
+
+import argparse
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from orderflow_engine import IMBALANCE_THRESHOLD, MIN_RUN, bin_imbalance, buy_sell_split, longest_run
+from super_markov import read_universe, scan_pool
+from support_resistance_engine import LOOKBACK as SR_LOOKBACK, SWING_LENGTH, support_resistance
+from volume_profile_engine import (ABOVE_VA, BELOW_VA, LOOKBACK, LOWER_VA, MINTICK, RESOLUTION, UPPER_VA,
+                                   VALUE_AREA_PCT, profile_bins, va_position, value_area)
+
+
+WEIGHTS = {"sr": 40, "vp": 30, "of": 30}
+NEAR_PCT = 2.0            # "at" a level: within this % of the close
+STARS = {3: "⭐⭐⭐", 2: "⭐⭐", 1: "⭐", 0: ""}
+CONFLICTING = "❌"
+ACTIONS = {3: "STRONG", 2: "Medium"}
+
+
+def _vote(bullish: bool, bearish: bool) -> int:
+    return int(bullish) - int(bearish)
+
+
+def confluence(df: pd.DataFrame, lookback: int = LOOKBACK, resolution: int = RESOLUTION,
+               value_area_pct: float = VALUE_AREA_PCT, threshold: float = IMBALANCE_THRESHOLD,
+               min_run: int = MIN_RUN, sr_lookback: int = SR_LOOKBACK, swing_length: int = SWING_LENGTH,
+               near_pct: float = NEAR_PCT, mintick: float = MINTICK) -> Dict:
+    """Component votes, direction, score and stars for the last bar of df"""
+    frame = df.rename(columns=str.lower)
+    window = lookback + 1
+    if len(frame) < window + 1:
+        raise ValueError(f"Need {window + 1} bars, got {len(frame)}")
+
+    # The last two windows (the one before tells whether the order-flow run is fresh)
+    tail = frame.iloc[-(window + 1):]
+    o, h, l, c, v = (tail[col].to_numpy(dtype=float) for col in ("open", "high", "low", "close", "volume"))
+    buy, sell = buy_sell_split(o, h, l, c, v)
+    bins = profile_bins(h, l, np.column_stack([v, buy, sell]), window, resolution, mintick)
+    close = c[-1]
+
+    # Volume profile
+    poc_bin, lower, upper = (int(x[-1]) for x in value_area(bins.volumes[-1:, :, 0], value_area_pct))
+    bottom, step = bins.bottom[-1], bins.step[-1]
+    poc, vah, val = bottom + (poc_bin + 0.5) * step, bottom + (upper + 1) * step, bottom + lower * step
+    position = str(va_position([close], [poc], [vah], [val])[0])
+
+    def near(level: float) -> bool:
+        return abs(close - level) / close * 100 <= near_pct
+
+    # VAL only counts from the lower half of the value area, VAH from the upper half
+    vp_vote = _vote(position == BELOW_VA or (position == LOWER_VA and near(val)),
+                    position == ABOVE_VA or (position == UPPER_VA and near(vah)))
+
+    # Order flow, from the same bins
+    buy_imb, sell_imb = bin_imbalance(bins.volumes[:, :, 1], bins.volumes[:, :, 2], threshold)
+    buy_text, sell_text = longest_run(buy_imb) >= min_run, longest_run(sell_imb) >= min_run
+    of_vote = _vote(buy_text[-1], sell_text[-1])
+    fresh = (of_vote > 0 and not buy_text[0]) or (of_vote < 0 and not sell_text[0])
+
+    # Support / resistance
+    sr = support_resistance(df, sr_lookback, swing_length)
+    support = sr.supports[0] if sr.supports else np.nan
+    resistance = sr.resistances[0] if sr.resistances else np.nan
+    support_dist = (close - support) / close * 100
+    resistance_dist = (resistance - close) / close * 100
+    at_support = support_dist <= near_pct
+    at_resistance = resistance_dist <= near_pct
+    if at_support and at_resistance:
+        at_support, at_resistance = support_dist <= resistance_dist, resistance_dist < support_dist
+    sr_vote = _vote(at_support, at_resistance)
+
+    votes = {"sr": sr_vote, "vp": vp_vote, "of": of_vote}
+    conflicting = max(votes.values()) > 0 and min(votes.values()) < 0
+    direction = 0 if conflicting else int(np.sign(sum(votes.values())))
+    aligned = [k for k, vote in votes.items() if direction and vote == direction]
+    if direction and vp_vote == 0 and near(poc):
+        aligned.append("vp")                    # POC confirms either side
+
+    n = len(aligned)
+    side = "BUY" if direction > 0 else "SELL" if direction < 0 else None
+    return {
+        "close": close,
+        "direction": side,
+        "stars": CONFLICTING if conflicting else STARS[n],
+        "score": sum(WEIGHTS[k] for k in aligned),
+        "action": "SKIP" if n == 0 else "WAIT" if n == 1 else f"{side} {ACTIONS[n]}",
+        "sr": "support" if sr_vote > 0 else "resistance" if sr_vote < 0 else "",
+        "support": support,
+        "support_dist_pct": support_dist,
+        "resistance": resistance,
+        "resistance_dist_pct": resistance_dist,
+        "vp_position": position,
+        "poc": poc,
+        "vah": vah,
+        "val": val,
+        "orderflow": "BUY IMB" if of_vote > 0 else "SELL IMB" if of_vote < 0 else "Balanced",
+        "fresh_imbalance": bool(fresh),
+        "conflicting": conflicting,
+    }
+
+
+def scan_ticker(ticker: str, cache_dir: Optional[str] = None, offline: bool = False, **params) -> Dict:
+    """Load one ticker's bars once and score its confluence"""
+    from price_cache import load_prices
+
+    df = load_prices(ticker, cache_dir=cache_dir, offline=offline)
+    return {"ticker": ticker, **confluence(df, **params),
+            "last_date": str(df.index[-1].date()) if len(df) else None}
+
+
+def scan_universe(tickers: List[str], workers: Optional[int] = None, **kwargs) -> pd.DataFrame:
+    """Score many tickers across a process pool, best setups first"""
+    rows = scan_pool(scan_ticker, tickers, workers,
+                     lambda ticker, error: {"ticker": ticker, "score": np.nan, "error": error}, **kwargs)
+
+    results = pd.DataFrame(rows)
+    # Nearest level in the trade direction breaks ties between equal scores
+    level_dist = np.where(results.get("direction") == "SELL", results.get("resistance_dist_pct", np.nan),
+                          results.get("support_dist_pct", np.nan))
+    results["_dist"] = pd.Series(level_dist, index=results.index).fillna(np.inf)
+    results = results.sort_values(["score", "_dist"], ascending=[False, True], kind="stable",
+                                  na_position="last")
+    return results.drop(columns="_dist").reset_index(drop=True)
+
+
+def print_scan(results: pd.DataFrame, top: Optional[int] = None) -> None:
+    """Ranked setup table"""
+    print(f"{'='*70}")
+    print(f"CONFLUENCE SCAN ({len(results)} tickers)")
+    print(f"{'='*70}\n")
+
+    if "stars" in results:
+        for stars in (STARS[3], STARS[2], STARS[1], CONFLICTING):
+            n = int((results["stars"] == stars).sum())
+            if n:
+                print(f"  {stars:<8} {n}")
+        print()
+
+    cols = [c for c in ["ticker", "stars", "score", "action", "close", "sr", "support_dist_pct",
+                        "resistance_dist_pct", "vp_position", "orderflow", "last_date", "error"]
+            if c in results]
+    display = results[cols].head(top).astype(object)
+    if "score" in display:
+        display["score"] = results["score"].head(top).map(lambda x: f"{x:.0f}%" if pd.notna(x) else "")
+    if "close" in display:
+        display["close"] = results["close"].head(top).map(lambda x: f"{x:.2f}" if pd.notna(x) else "")
+    for col in ("support_dist_pct", "resistance_dist_pct"):
+        if col in display:
+            display[col] = results[col].head(top).map(lambda x: f"{x:.1f}%" if pd.notna(x) else "")
+    print(display.fillna("").to_string(index=False))
+    print()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Score S/R + volume profile + order flow confluence per ticker")
+    ap.add_argument("ticker", nargs="*", help="Tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count)")
+    ap.add_argument("--lookback", type=int, default=LOOKBACK,
+                    help=f"Profile lookback, volume profile and order flow (default: {LOOKBACK})")
+    ap.add_argument("--resolution", type=int, default=RESOLUTION, help=f"Profile bins (default: {RESOLUTION})")
+    ap.add_argument("--sr-lookback", type=int, default=SR_LOOKBACK,
+                    help=f"S/R lookback bars (default: {SR_LOOKBACK})")
+    ap.add_argument("--near-pct", type=float, default=NEAR_PCT,
+                    help=f"Distance %% that counts as at a level (default: {NEAR_PCT})")
+    ap.add_argument("--top", type=int, default=None, help="Only print the N best setups")
+    ap.add_argument("--out", default=None, help="Also write the results, .csv or .json")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only")
+    args = ap.parse_args()
+
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    if not tickers:
+        ap.error("give at least one ticker or --universe")
+
+    results = scan_universe(tickers, workers=args.workers, cache_dir=args.cache_dir, offline=args.offline,
+                            lookback=args.lookback, resolution=args.resolution,
+                            sr_lookback=args.sr_lookback, near_pct=args.near_pct)
+    print_scan(results, args.top)
+    if args.out:
+        if args.out.endswith(".json"):
+            results.to_json(args.out, orient="records", indent=2)
+        else:
+            results.to_csv(args.out, index=False)
+        print(f"Results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
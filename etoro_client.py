@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+eToro market-data client with pooled connections
+
+One requests.Session per client keeps TLS connections alive between calls,
+so a history fetch no longer pays two fresh handshakes. Responses with
+status 429 or 5xx are retried with exponential backoff (honouring
+Retry-After). Ticker -> instrumentId lookups are kept in a JSON file, so
+the search endpoint is called once per symbol ever:
+
+    client = EtoroClient(api_key, user_key, rate_limit=5)
+    df = client.get_ohlc_data("NVDA", "1d", 1000)
+    df = client.get_history("NVDA", "5m", start="2025-01-01", workers=8)
+
+History beyond the 1000-candle cap is split into date windows that are
+fetched concurrently (bounded thread pool, shared token-bucket rate limit),
+then de-duplicated and stitched into one sorted frame.
+
+mock_market_server.py replays recorded search/candles responses locally;
+pass its base_url to exercise the client without network access.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:             # Windows: entries are still merged, just without the file lock
+    fcntl = None
+
+from price_cache import DEFAULT_CACHE_DIR
+
+
+BASE_URL = "https://public-api.etoro.com/api/v1"
+DEFAULT_INSTRUMENT_CACHE = DEFAULT_CACHE_DIR / "etoro_instruments.json"
+MAX_CANDLES = 1000
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+TIMEFRAMES = {
+    "1m": "OneMinute", "5m": "FiveMinutes", "10m": "TenMinutes",
+    "15m": "FifteenMinutes", "30m": "ThirtyMinutes", "1h": "OneHour",
+    "4h": "FourHours", "1d": "OneDay", "1w": "OneWeek"
+}
+BAR_LENGTHS = {
+    "1m": pd.Timedelta(minutes=1), "5m": pd.Timedelta(minutes=5), "10m": pd.Timedelta(minutes=10),
+    "15m": pd.Timedelta(minutes=15), "30m": pd.Timedelta(minutes=30), "1h": pd.Timedelta(hours=1),
+    "4h": pd.Timedelta(hours=4), "1d": pd.Timedelta(days=1), "1w": pd.Timedelta(weeks=1)
+}
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# Longer than any market closure: no bars for this long means the history is exhausted
+HISTORY_GAP = pd.Timedelta(days=10)
+
+
+class TokenBucket:
+    """Thread-safe rate limiter: `rate` requests per second, bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token (possibly going negative); returns how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    def acquire(self) -> None:
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """acquire() for coroutines: waits with asyncio.sleep, so the event loop keeps running"""
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class CombinedLimiter:
+    """Takes a token from every bucket in turn, so the strictest one sets the pace"""
+
+    def __init__(self, *buckets: TokenBucket):
+        self.buckets = buckets
+
+    def acquire(self) -> None:
+        for bucket in self.buckets:
+            bucket.acquire()
+
+
+def history_windows(start: pd.Timestamp, end: pd.Timestamp, timeframe: str = "1d",
+                    per_window: int = MAX_CANDLES) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """[from, to) spans, newest first, each short enough to hold at most per_window bars"""
+    span = BAR_LENGTHS.get(timeframe, BAR_LENGTHS["1d"]) * per_window
+    windows = []
+    to = end
+    while to > start:
+        windows.append((max(start, to - span), to))
+        to -= span
+    return windows
+
+
+def stitch_windows(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """One sorted frame from overlapping window frames (the later copy of a bar wins)"""
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return parse_candles({})
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates("datetime", keep="last").sort_values("datetime", kind="stable")
+    return df.reset_index(drop=True)
+
+
+class InstrumentCache:
+    """Persistent ticker -> {"id", "name"} map (JSON, rewritten atomically on every add)
+
+    Several processes may share the file: each add re-reads it and merges
+    under an exclusive lock on a sidecar .lock file, so concurrent writers
+    keep each other's entries.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or DEFAULT_INSTRUMENT_CACHE)
+        self._lock = threading.Lock()
+        try:
+            self._entries: Dict[str, Dict] = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, ticker: str) -> Optional[Dict]:
+        return self._entries.get(ticker.upper())
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def put(self, ticker: str, instrument_id: int, name: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock, self._file_lock():
+            try:
+                entries = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                entries = {}
+            entries.update(self._entries)
+            entries[ticker.upper()] = {"id": int(instrument_id), "name": name}
+            self._entries = entries
+            tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._entries, indent=1, sort_keys=True))
+            os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def parse_candles(data: Dict) -> pd.DataFrame:
+    """history/candles JSON -> DataFrame(datetime, open, high, low, close, volume)"""
+    candles = [candle for instrument_candles in data.get("candles", [])
+               for candle in instrument_candles.get("candles", [])]
+
+    # Column by column: much cheaper than one dict per candle
+    df = pd.DataFrame({
+        "datetime": [candle.get("fromDate") for candle in candles],
+        "open": [candle.get("open") for candle in candles],
+        "high": [candle.get("high") for candle in candles],
+        "low": [candle.get("low") for candle in candles],
+        "close": [candle.get("close") for candle in candles],
+        "volume": [candle.get("volume", 0) for candle in candles],
+    })
+    df["datetime"] = pd.to_datetime(df["datetime"], format="ISO8601")
+    return df
+
+
+class EtoroClient:
+    """Keep-alive session to the eToro public API with retries and cached instrument IDs"""
+
+    def __init__(self, api_key: str, user_key: str, base_url: str = BASE_URL,
+                 instrument_cache: Optional[Path] = None, retries: int = 3,
+                 backoff: float = 0.5, pool_size: int = 10, timeout: float = 30.0,
+                 rate_limit: Optional[float] = None, limiter: Optional[TokenBucket] = None):
+        self.api_key = api_key
+        self.user_key = user_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.instruments = InstrumentCache(instrument_cache)
+        self.pool_size = pool_size
+        # Shared by every request of this client, including the history workers;
+        # pass `limiter` to share one bucket with other clients or fetchers
+        self.limiter = limiter or (TokenBucket(rate_limit) if rate_limit else None)
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=["GET"], respect_retry_after_header=True,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def with_limiter(self, limiter: TokenBucket) -> "EtoroClient":
+        """This client with `limiter` added to its own rate limit, leaving the client unchanged
+
+        The view shares the session and the instrument cache.
+        """
+        view = copy.copy(self)
+        view.limiter = limiter if self.limiter is None else CombinedLimiter(self.limiter, limiter)
+        return view
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "x-request-id": str(uuid.uuid4()),
+            "x-api-key": self.api_key,
+            "x-user-key": self.user_key,
+        }
+
+    def get_json(self, path: str, params: Optional[Dict] = None) -> Dict:
+        if self.limiter is not None:
+            self.limiter.acquire()
+        r = self.session.get(f"{self.base_url}/{path}", headers=self.headers(), params=params,
+                             timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+    def resolve(self, ticker: str) -> Dict:
+        """{"id", "name"} of a ticker; searches only on the first lookup ever"""
+        entry = self.instruments.get(ticker)
+        if entry is not None:
+            return entry
+
+        data = self.get_json("market-data/search", {"internalSymbolFull": ticker})
+        if isinstance(data, dict) and data.get("items"):
+            instrument = data["items"][0]
+            instrument_id = (
+                instrument.get("internalInstrumentId") or
+                instrument.get("InstrumentID") or
+                instrument.get("instrumentId")
+            )
+            if instrument_id:
+                name = instrument.get("internalInstrumentDisplayName", ticker)
+                self.instruments.put(ticker, int(instrument_id), name)
+                return self.instruments.get(ticker)
+
+        raise Exception(f"Instrument not found: {ticker}")
+
+    def get_instrument_id(self, ticker: str) -> int:
+        return self.resolve(ticker)["id"]
+
+    def get_candles(self, instrument_id: int, timeframe: str = "1d", count: int = MAX_CANDLES) -> pd.DataFrame:
+        """The latest `count` (at most MAX_CANDLES) candles of an instrument, oldest first"""
+        interval = TIMEFRAMES.get(timeframe, "OneDay")
+        count = min(count, MAX_CANDLES)
+        data = self.get_json(
+            f"market-data/instruments/{instrument_id}/history/candles/asc/{interval}/{count}"
+        )
+        return parse_candles(data)
+
+    def get_window(self, instrument_id: int, timeframe: str, start: pd.Timestamp,
+                   end: pd.Timestamp) -> pd.DataFrame:
+        """Candles with start <= fromDate < end (at most MAX_CANDLES)
+
+        The candles endpoint only documents a count, so the bounds go along as
+        fromDate/toDate query parameters, and bars outside them are dropped
+        here in case the server ignores them.
+        """
+        return self._window(instrument_id, timeframe, start, end)[0]
+
+    def _window(self, instrument_id: int, timeframe: str, start: pd.Timestamp,
+                end: pd.Timestamp) -> Tuple[pd.DataFrame, bool]:
+        """get_window() plus whether the server sent bars outside the bounds (it ignored them)"""
+        interval = TIMEFRAMES.get(timeframe, "OneDay")
+        data = self.get_json(
+            f"market-data/instruments/{instrument_id}/history/candles/asc/{interval}/{MAX_CANDLES}",
+            {"fromDate": start.strftime(DATE_FORMAT), "toDate": end.strftime(DATE_FORMAT)},
+        )
+        df = parse_candles(data)
+        if df.empty:
+            return df, False
+        inside = (df["datetime"] >= start) & (df["datetime"] < end)
+        return df[inside], not inside.all()
+
+    def get_history(self, ticker: str, timeframe: str = "1d", start=None, end=None,
+                    limit: Optional[int] = None, workers: int = 4) -> pd.DataFrame:
+        """Candles beyond the MAX_CANDLES cap, fetched as windows on `workers` threads
+
+        Give `start` (and optionally `end`, default now) for a date range, or
+        `limit` for the latest `limit` bars: windows are then fetched newest
+        first, `workers` at a time, until enough bars arrived or HISTORY_GAP
+        of consecutive windows came back empty (start of the history). Fewer
+        than `limit` bars from a server that ignored the window bounds raise
+        a RuntimeWarning: the older windows were empty because of that, not
+        because the history starts there.
+        """
+        instrument_id = self.get_instrument_id(ticker)
+        end = pd.Timestamp(end or pd.Timestamp.now(tz="UTC"))
+        end = end.tz_localize("UTC") if end.tz is None else end.tz_convert("UTC")
+        workers = max(1, min(workers, self.pool_size))
+
+        ignored_bounds = False
+
+        def fetch(window):
+            nonlocal ignored_bounds
+            df, outside = self._window(instrument_id, timeframe, *window)
+            ignored_bounds = ignored_bounds or outside
+            return df
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            if start is not None:
+                start = pd.Timestamp(start)
+                start = start.tz_localize("UTC") if start.tz is None else start.tz_convert("UTC")
+                frames = list(pool.map(fetch, history_windows(start, end, timeframe)))
+                return stitch_windows(frames)
+
+            if limit is None:
+                raise ValueError("give start or limit")
+            frames, n_bars = [], 0
+            batch_span = BAR_LENGTHS.get(timeframe, BAR_LENGTHS["1d"]) * MAX_CANDLES * workers
+            empty_span = pd.Timedelta(0)
+            while n_bars < limit and empty_span < HISTORY_GAP:
+                batch = list(pool.map(fetch, history_windows(end - batch_span, end, timeframe)))
+                frames += batch
+                n_bars += sum(len(f) for f in batch)
+                end -= batch_span
+                # Weekends and holidays leave short empty stretches in intraday data
+                empty_span = empty_span + batch_span if all(f.empty for f in batch) else pd.Timedelta(0)
+
+        if n_bars < limit and ignored_bounds:
+            warnings.warn(f"{ticker}: only {n_bars} of {limit} {timeframe} bars; the server ignored the "
+                          f"fromDate/toDate window bounds, so older history could not be fetched",
+                          RuntimeWarning, stacklevel=2)
+        return stitch_windows(frames).tail(limit).reset_index(drop=True)
+
+    def get_ohlc_data(self, ticker: str, timeframe: str = "1d", limit: int = MAX_CANDLES,
+                      workers: int = 4) -> pd.DataFrame:
+        """The latest `limit` candles; beyond MAX_CANDLES they are fetched in concurrent windows"""
+        if limit > MAX_CANDLES:
+            df = self.get_history(ticker, timeframe, limit=limit, workers=workers)
+        else:
+            df = self.get_candles(self.get_instrument_id(ticker), timeframe, limit)
+        if df.empty:
+            raise Exception("No candle data found")
+        return df
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "EtoroClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
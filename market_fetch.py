@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Asyncio multi-ticker market-data fetcher
+
+Fetches many tickers concurrently instead of waiting on each download in
+turn, and yields every frame as soon as it arrives, so encoding can start
+before the slowest download finishes:
+
+    async for ticker, df, error in fetch_frames(tickers, source="etoro", client=client):
+        ...
+
+The blocking clients (EtoroClient over its pooled session, load_prices /
+yfinance) run in threads via asyncio.to_thread. Requests are limited by
+- one global token bucket (`rate` HTTP requests per second, all hosts
+  together); eToro tickers can take several requests (search, history
+  windows), so every request of the client takes a token (on top of the
+  client's own limit, if it has one), while a yfinance download takes one
+  token per ticker
+- a semaphore per host (`per_host` downloads in flight to one API)
+- an optional overall `timeout`
+
+Leaving the loop early (break, exception, timeout) cancels every download
+that has not started; no new ticker starts, but a thread already fetching
+one runs to the end of it (for an eToro history beyond MAX_CANDLES, the
+remaining window requests too) and its result is dropped.
+
+    python market_fetch.py --universe universe.txt --source yfinance
+    python market_fetch.py --mock 1000 --latency 0.05      # local mock eToro server
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from etoro_client import EtoroClient, TokenBucket
+from price_cache import load_prices
+
+
+YFINANCE_HOST = "query1.finance.yahoo.com"
+
+FetchResult = Tuple[str, Optional[pd.DataFrame], Optional[BaseException]]
+
+
+def _etoro_fetch(client: EtoroClient, timeframe: str, limit: int):
+    def fetch(ticker: str) -> pd.DataFrame:
+        return client.get_ohlc_data(ticker, timeframe, limit)
+    return urlparse(client.base_url).netloc, fetch
+
+
+def _yfinance_fetch(cache_dir: Optional[str], offline: bool):
+    def fetch(ticker: str) -> pd.DataFrame:
+        return load_prices(ticker, cache_dir=cache_dir, offline=offline)
+    return YFINANCE_HOST, fetch
+
+
+async def fetch_frames(tickers: List[str], source: str = "etoro", client: Optional[EtoroClient] = None,
+                       timeframe: str = "1d", limit: int = 1000, cache_dir: Optional[str] = None,
+                       offline: bool = False, rate: float = 50.0, per_host: int = 16,
+                       limiter: Optional[TokenBucket] = None,
+                       timeout: Optional[float] = None) -> AsyncIterator[FetchResult]:
+    """(ticker, frame, None) or (ticker, None, error) for every ticker, in order of arrival
+
+    source "etoro" needs a client (each ticker is one candles request, or one
+    per history window beyond MAX_CANDLES, plus a search the first time a
+    symbol is ever seen); "yfinance" goes through the local price cache.
+    Pass a shared `limiter` to rate-limit several concurrent calls together.
+
+    `rate` (or `limiter`) caps the client's HTTP requests rather than its
+    tickers: the requests go through a per-call view of the client that
+    takes a token from this call's bucket as well as from the client's own.
+    The caller's client is not modified.
+    """
+    limiter = limiter or TokenBucket(rate, burst=per_host)
+    per_ticker = None
+    if source == "etoro":
+        if client is None:
+            raise ValueError("source='etoro' needs an EtoroClient")
+        # Every HTTP request of the client takes a token, inside its thread
+        host, fetch = _etoro_fetch(client.with_limiter(limiter), timeframe, limit)
+    elif source == "yfinance":
+        host, fetch = _yfinance_fetch(cache_dir, offline)
+        per_ticker = limiter
+    else:
+        raise ValueError(f"Unknown source: {source}")
+    semaphores: Dict[str, asyncio.Semaphore] = {host: asyncio.Semaphore(per_host)}
+
+    async def one(ticker: str) -> FetchResult:
+        async with semaphores[host]:
+            if per_ticker is not None:
+                await per_ticker.acquire_async()
+            try:
+                return ticker, await asyncio.to_thread(fetch, ticker), None
+            except Exception as e:
+                return ticker, None, e
+
+    tasks = [asyncio.create_task(one(t)) for t in tickers]
+    deadline = None if timeout is None else asyncio.get_running_loop().time() + timeout
+    try:
+        pending = set(tasks)
+        while pending:
+            remaining = None if deadline is None else deadline - asyncio.get_running_loop().time()
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError(f"{len(pending)} of {len(tasks)} tickers still pending")
+            done, pending = await asyncio.wait(pending, timeout=remaining,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def fetch_all(tickers: List[str], threads: Optional[int] = None, **kwargs) -> Dict[str, FetchResult]:
+    """Run fetch_frames() to completion from synchronous code; keyed by ticker
+
+    `threads` sizes the pool behind asyncio.to_thread (default: per_host),
+    since the default pool would cap concurrency at min(32, CPUs + 4).
+    """
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=threads or kwargs.get("per_host", 16)))
+        return {r[0]: r async for r in fetch_frames(tickers, **kwargs)}
+
+    return asyncio.run(run())
+
+
+async def _consume(tickers: List[str], encode: bool, **kwargs) -> Tuple[List[Dict], float, float]:
+    """Fetch everything, optionally fitting each frame as it arrives
+
+    Returns the rows, the seconds until the first frame and the total seconds.
+    """
+    from simple_markov_etoro import fit_markov_model
+
+    start = time.perf_counter()
+    first = None
+    rows = []
+    async for ticker, df, error in fetch_frames(tickers, **kwargs):
+        first = first if first is not None else time.perf_counter() - start
+        if error is not None:
+            rows.append({"ticker": ticker, "bars": None, "error": f"{type(error).__name__}: {error}"})
+            continue
+        row = {"ticker": ticker, "bars": len(df), "error": ""}
+        if encode and kwargs.get("source", "etoro") == "etoro":
+            row["patterns"] = len(fit_markov_model(df)[0])
+        rows.append(row)
+    return rows, first or 0.0, time.perf_counter() - start
+
+
+def main():
+    from super_markov import read_universe
+
+    ap = argparse.ArgumentParser(description="Fetch many tickers concurrently (asyncio, rate-limited)")
+    ap.add_argument("ticker", nargs="*", help="Tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--source", choices=["etoro", "yfinance"], default="etoro")
+    ap.add_argument("--timeframe", default="1d")
+    ap.add_argument("--limit", type=int, default=1000, help="Candles per eToro ticker (default: 1000)")
+    ap.add_argument("--rate", type=float, default=50.0, help="HTTP requests per second, all hosts (default: 50)")
+    ap.add_argument("--per-host", type=int, default=16, help="Concurrent downloads per host (default: 16)")
+    ap.add_argument("--timeout", type=float, default=None, help="Give up after this many seconds")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory (yfinance)")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only (yfinance)")
+    ap.add_argument("--encode", action="store_true", help="Fit the eToro Markov model on each frame as it arrives")
+    ap.add_argument("--mock", type=int, default=0, metavar="N",
+                    help="Serve N synthetic tickers from a local mock eToro server and fetch those")
+    ap.add_argument("--latency", type=float, default=0.05, help="Mock server latency per request (default: 0.05)")
+    args = ap.parse_args()
+
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+
+    server = None
+    client = None
+    if args.source == "etoro":
+        import tempfile
+        import simple_markov_etoro as etoro
+
+        if args.mock:
+            from bench_markov import synthetic_ohlcv
+            from mock_market_server import MockMarketServer, candles_payload
+
+            server = MockMarketServer(latency=args.latency).start()
+            payload = candles_payload(0, synthetic_ohlcv(args.limit))
+            tickers = tickers or [f"MOCK{i:04d}" for i in range(args.mock)]
+            for i, ticker in enumerate(tickers):
+                server.add_instrument(ticker, 100000 + i)
+                server.candles[(100000 + i, "OneDay")] = payload
+            client = EtoroClient(etoro.API_KEY, etoro.USER_KEY, base_url=server.base_url,
+                                 pool_size=args.per_host,
+                                 instrument_cache=tempfile.mkdtemp() + "/instruments.json")
+        else:
+            client = EtoroClient(etoro.API_KEY, etoro.USER_KEY, pool_size=args.per_host)
+
+    if not tickers:
+        ap.error("give at least one ticker, --universe or --mock")
+
+    kwargs = dict(source=args.source, client=client, timeframe=args.timeframe, limit=args.limit,
+                  cache_dir=args.cache_dir, offline=args.offline, rate=args.rate,
+                  per_host=args.per_host, timeout=args.timeout)
+
+    async def run():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.per_host))
+        return await _consume(tickers, args.encode, **kwargs)
+
+    try:
+        rows, first, elapsed = asyncio.run(run())
+    except asyncio.TimeoutError as e:
+        print(f"Timed out after {args.timeout}s: {e}")
+        return 1
+    finally:
+        if server is not None:
+            server.stop()
+
+    results = pd.DataFrame(rows)
+    results["bars"] = results["bars"].astype("Int64")
+    errors = results[results["error"] != ""]
+    print(results.astype(object).fillna("").head(20).to_string(index=False))
+    if len(results) > 20:
+        print(f"... {len(results) - 20} more")
+    print(f"\n{len(results) - len(errors)}/{len(results)} tickers in {elapsed:.2f}s "
+          f"(first frame after {first:.2f}s, {len(errors)} errors)")
+    return 0 if errors.empty else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
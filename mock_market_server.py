@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the eToro market-data endpoints
+
+Serves recorded (or synthetic) responses for
+
+    GET /api/v1/market-data/search?internalSymbolFull=<TICKER>
+    GET /api/v1/market-data/instruments/<id>/history/candles/asc/<interval>/<count>
+        [?fromDate=...&toDate=...]
+
+on 127.0.0.1, so EtoroClient and the fetchers can be run and timed without
+network access or API keys:
+
+    with MockMarketServer() as server:
+        server.add_instrument("NVDA", 1137, candles_df)
+        server.fail_next(2, status=503)           # exercise retry/backoff
+        server.latency = 0.05                     # simulate a remote API
+        client = EtoroClient("key", "user", base_url=server.base_url)
+
+Recorded responses can be loaded from a directory laid out as
+search/<TICKER>.json and candles/<id>_<interval>.json. Every request is
+logged in server.requests (path, query) for assertions.
+
+    python mock_market_server.py --tickers NVDA,AAPL --bars 5000 --port 8765
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+
+API_PREFIX = "/api/v1/market-data"
+
+
+def candles_payload(instrument_id: int, df: pd.DataFrame, interval: str = "OneDay") -> Dict:
+    """history/candles JSON for a frame with a datetime column (or DatetimeIndex) and OHLCV"""
+    frame = df.rename(columns=str.lower)
+    if "datetime" not in frame:
+        frame = frame.rename_axis("datetime").reset_index()
+    stamps = pd.to_datetime(frame["datetime"])
+    if stamps.dt.tz is None:
+        stamps = stamps.dt.tz_localize("UTC")
+
+    candles = [
+        {"instrumentID": instrument_id, "fromDate": ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+         "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for ts, o, h, l, c, v in zip(stamps.dt.tz_convert("UTC"), frame["open"], frame["high"],
+                                     frame["low"], frame["close"], frame["volume"])
+    ]
+    return {"interval": interval, "candles": [{"instrumentId": instrument_id, "candles": candles}]}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256      # many concurrent clients connect at once
+
+
+class MockMarketServer:
+    """Threaded HTTP server replaying search and candles responses"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency                               # seconds added to every response
+        self.ignore_bounds = False                           # drop fromDate/toDate like a server without them
+        self.search: Dict[str, Dict] = {}                    # TICKER -> search JSON
+        self.candles: Dict[Tuple[int, str], Dict] = {}       # (id, interval) -> candles JSON
+        self.requests: List[Tuple[str, Dict]] = []
+        self._failures = deque()
+        self._encoded: Dict[Tuple, Tuple[Dict, bytes]] = {}
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True      # headers and body go out as separate writes
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                status, body = server._handle(self.path)
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = _Server((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/api/v1"
+
+    def add_instrument(self, ticker: str, instrument_id: int, df: Optional[pd.DataFrame] = None,
+                       interval: str = "OneDay", name: Optional[str] = None) -> None:
+        self.search[ticker.upper()] = {"items": [{
+            "internalInstrumentId": instrument_id,
+            "internalSymbolFull": ticker.upper(),
+            "internalInstrumentDisplayName": name or ticker.upper(),
+        }]}
+        if df is not None:
+            self.candles[(int(instrument_id), interval)] = candles_payload(instrument_id, df, interval)
+
+    def load_recordings(self, directory) -> None:
+        """search/<TICKER>.json and candles/<id>_<interval>.json under directory"""
+        directory = Path(directory)
+        for path in sorted((directory / "search").glob("*.json")):
+            self.search[path.stem.upper()] = json.loads(path.read_text())
+        for path in sorted((directory / "candles").glob("*.json")):
+            instrument_id, interval = path.stem.split("_", 1)
+            self.candles[(int(instrument_id), interval)] = json.loads(path.read_text())
+
+    def fail_next(self, n: int = 1, status: int = 503) -> None:
+        """Answer the next n requests with an error status"""
+        with self._lock:
+            self._failures.extend([status] * n)
+
+    def count(self, kind: str) -> int:
+        """Requests seen so far for "search" or "candles" """
+        return sum(1 for path, _ in self.requests if kind in path)
+
+    def _candles_response(self, key: Tuple[int, str], *window) -> bytes:
+        """Encoded candles window; each distinct window is encoded once and reused"""
+        payload = self.candles[key]
+        with self._lock:
+            cached = self._encoded.get((id(payload), window))
+        if cached is not None and cached[0] is payload:
+            return cached[1]
+        body = json.dumps(self._window(payload, *window)).encode()
+        with self._lock:
+            self._encoded[(id(payload), window)] = (payload, body)
+        return body
+
+    def _handle(self, raw_path: str) -> Tuple[int, Union[Dict, bytes]]:
+        url = urlparse(raw_path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        with self._lock:
+            self.requests.append((url.path, query))
+            if self._failures:
+                status = self._failures.popleft()
+                return status, {"error": f"injected {status}"}
+
+        if url.path == f"{API_PREFIX}/search":
+            ticker = query.get("internalSymbolFull", "").upper()
+            return 200, self.search.get(ticker, {"items": []})
+
+        parts = url.path[len(API_PREFIX) + 1:].split("/")
+        # instruments/<id>/history/candles/asc/<interval>/<count>
+        if len(parts) == 7 and parts[0] == "instruments" and parts[2:4] == ["history", "candles"]:
+            key = (int(parts[1]), parts[5])
+            if key not in self.candles:
+                return 404, {"error": "unknown instrument"}
+            if self.ignore_bounds:
+                return 200, self._candles_response(key, parts[4], int(parts[6]))
+            return 200, self._candles_response(key, parts[4], int(parts[6]),
+                                               query.get("fromDate"), query.get("toDate"))
+
+        return 404, {"error": "not found"}
+
+    @staticmethod
+    def _window(payload: Dict, direction: str, count: int, start: Optional[str] = None,
+                end: Optional[str] = None) -> Dict:
+        """The latest `count` candles with start <= fromDate < end, oldest first for asc"""
+        out = {**payload, "candles": []}
+        for group in payload["candles"]:
+            candles = group["candles"]
+            if start or end:
+                # fromDate strings share one UTC format, so they sort chronologically
+                candles = [c for c in candles if (not start or c["fromDate"] >= start)
+                           and (not end or c["fromDate"] < end)]
+            candles = candles[-count:] if count else []
+            if direction == "desc":
+                candles = candles[::-1]
+            out["candles"].append({**group, "candles": candles})
+        return out
+
+    def start(self) -> "MockMarketServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockMarketServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    from bench_markov import synthetic_ohlcv
+
+    ap = argparse.ArgumentParser(description="Serve recorded or synthetic eToro market-data responses locally")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--recordings", default=None, help="Directory with search/ and candles/ JSON files")
+    ap.add_argument("--tickers", default="NVDA", help="Comma-separated tickers served with synthetic bars")
+    ap.add_argument("--bars", type=int, default=5000, help="Synthetic daily bars per ticker")
+    ap.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = ap.parse_args()
+
+    server = MockMarketServer(port=args.port, latency=args.latency)
+    if args.recordings:
+        server.load_recordings(args.recordings)
+    for i, ticker in enumerate(t.strip().upper() for t in args.tickers.split(",") if t.strip()):
+        bars = synthetic_ohlcv(args.bars, seed=i)
+        bars.index = pd.date_range("2000-01-03", periods=args.bars, freq="B", name="Date")
+        server.add_instrument(ticker, 1000 + i, bars)
+
+    print(f"Serving {len(server.search)} instruments at {server.base_url} (Ctrl-C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
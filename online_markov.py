@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Online candle direction Markov model with persisted count state
+
+Instead of rebuilding the tables from the full history on every run, the
+model keeps, per order, a dense (2**order, 2) U/D count tensor plus the
+last max_order candle colors as an integer context. A new candle is one
+O(1) update per order; predictions read the counts directly.
+
+State is saved as a compact, versioned .npz per ticker, so a nightly update
+of thousands of tickers only reads the new bars and rewrites a few KB each:
+
+    python online_markov.py AAPL MSFT --state-dir models/
+    python online_markov.py --universe universe.txt --offline
+
+Colors follow super_markov: U = Close > Open, D = Close < Open, dojis skipped.
+"""
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from price_cache import decode_timestamp, encode_timestamp, load_prices
+from super_markov import (VERDICT_ORDERS, candle_mask, combine_signals, count_states, predict_direction,
+                          read_universe)
+
+
+MODEL_VERSION = 1
+DEFAULT_STATE_DIR = Path("markov_models")
+
+
+class OnlineMarkovModel:
+    """U/D count tensors for several orders plus the last-k context, updated one candle at a time
+
+    Orders 3 and 5 are always kept, since signal() needs both.
+    """
+
+    def __init__(self, orders: Iterable[int] = VERDICT_ORDERS):
+        self.orders = tuple(sorted(set(orders) | set(VERDICT_ORDERS)))
+        self.max_order = self.orders[-1]
+        self.counts = {k: np.zeros((2 ** k, 2), dtype=np.int64) for k in self.orders}
+        self.context = 0        # last max_order bits, newest candle in the lowest bit
+        self.n_candles = 0      # colored candles seen so far
+        self.last_date = None   # timestamp of the last bar consumed (doji or not)
+
+    def _context_bits(self) -> np.ndarray:
+        """The remembered candle colors, oldest first"""
+        m = min(self.n_candles, self.max_order)
+        return np.array([(self.context >> (m - 1 - j)) & 1 for j in range(m)], dtype=np.uint8)
+
+    def update(self, open_: float, close: float, date=None) -> None:
+        """Add one candle: a single count increment per order"""
+        if date is not None:
+            self.last_date = pd.Timestamp(date)
+        if np.isnan(open_) or np.isnan(close) or close == open_:
+            return
+
+        bit = int(close < open_)
+        for k in self.orders:
+            if self.n_candles >= k:
+                self.counts[k][self.context & ((1 << k) - 1), bit] += 1
+
+        self.context = ((self.context << 1) | bit) & ((1 << self.max_order) - 1)
+        self.n_candles += 1
+
+    def update_frame(self, df: pd.DataFrame) -> int:
+        """Add every bar of df after last_date in one vectorized step; returns bars consumed"""
+        if self.last_date is not None:
+            df = df[df.index > self.last_date]
+        if df.empty:
+            return 0
+
+        keep = candle_mask(df)
+        new_bits = (df['Close'].to_numpy(dtype=float)[keep]
+                    < df['Open'].to_numpy(dtype=float)[keep]).astype(np.uint8)
+
+        # Transitions into the new candles = all transitions of context + new,
+        # minus the ones that lie entirely inside the already-counted context
+        prev = self._context_bits()
+        ext = np.concatenate([prev, new_bits])
+        for k in self.orders:
+            self.counts[k] += count_states(ext, k) - count_states(prev, k)
+
+        for b in new_bits[-self.max_order:]:
+            self.context = ((self.context << 1) | int(b)) & ((1 << self.max_order) - 1)
+        self.n_candles += len(new_bits)
+        self.last_date = pd.Timestamp(df.index[-1])
+        return len(df)
+
+    def row(self, order: int) -> Dict[str, float]:
+        """calc_probs()-style row for the current state of one order"""
+        if self.n_candles < order:
+            return {"n": 0, "P(U)": 0.0, "P(D)": 0.0}
+
+        n_u, n_d = (int(x) for x in self.counts[order][self.context & ((1 << order) - 1)])
+        n = n_u + n_d
+        return {"n": n, "P(U)": n_u / n if n else 0.0, "P(D)": n_d / n if n else 0.0}
+
+    def predict(self, order: int) -> Dict:
+        return predict_direction(self.row(order))
+
+    def signal(self) -> str:
+        """The order-3/order-5 verdict (STRONG, WEAK, CONFLICTING or NO DATA)"""
+        return combine_signals(self.predict(3), self.predict(5))
+
+    def save(self, path) -> None:
+        arrays = {f"counts_{k}": self.counts[k] for k in self.orders}
+        last_date, last_tz = encode_timestamp(self.last_date)
+        np.savez(
+            path,
+            version=np.int64(MODEL_VERSION),
+            orders=np.array(self.orders, dtype=np.int64),
+            context=np.int64(self.context),
+            n_candles=np.int64(self.n_candles),
+            last_date=last_date,
+            last_tz=last_tz,
+            **arrays,
+        )
+
+    @classmethod
+    def load(cls, path) -> "OnlineMarkovModel":
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version != MODEL_VERSION:
+                raise ValueError(f"Unsupported model version {version} in {path}")
+
+            orders = data["orders"].tolist()
+            if not set(VERDICT_ORDERS) <= set(orders):
+                raise ValueError(f"Model in {path} lacks the verdict orders {VERDICT_ORDERS}")
+
+            model = cls(orders)
+            for k in model.orders:
+                model.counts[k] = data[f"counts_{k}"].copy()
+            model.context = int(data["context"])
+            model.n_candles = int(data["n_candles"])
+            model.last_date = decode_timestamp(data["last_date"][()], data["last_tz"])
+        return model
+
+
+def model_path(ticker: str, state_dir: Path) -> Path:
+    return Path(state_dir) / f"{ticker.upper()}.npz"
+
+
+def update_ticker(ticker: str, state_dir: Path = DEFAULT_STATE_DIR, orders: Iterable[int] = VERDICT_ORDERS,
+                  cache_dir: Optional[str] = None, offline: bool = False) -> Dict:
+    """Load (or create) a ticker's model, feed it the new bars and save it back
+
+    A saved model keeps the orders it was built with: asking for one it
+    does not count raises instead of silently predicting without it.
+    """
+    path = model_path(ticker, state_dir)
+    if path.exists():
+        model = OnlineMarkovModel.load(path)
+        missing = sorted(set(orders) - set(model.orders))
+        if missing:
+            raise ValueError(f"Model in {path} counts orders {list(model.orders)}, not {missing}; "
+                             f"delete it to rebuild")
+    else:
+        model = OnlineMarkovModel(orders)
+
+    df = load_prices(ticker, cache_dir=cache_dir, offline=offline)
+    added = model.update_frame(df)
+
+    if added:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        model.save(path)
+
+    pred3, pred5 = model.predict(3), model.predict(5)
+    return {
+        'ticker': ticker,
+        'new_bars': added,
+        'last_date': str(model.last_date.date()) if model.last_date is not None else None,
+        'order3': pred3['direction'],
+        'order5': pred5['direction'],
+        'signal': model.signal(),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Incrementally update persisted candle direction Markov models")
+    ap.add_argument("ticker", nargs="*", help="Stock tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--state-dir", default=str(DEFAULT_STATE_DIR),
+                    help=f"Directory of saved models (default: {DEFAULT_STATE_DIR})")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only")
+    args = ap.parse_args()
+
+    tickers: List[str] = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    if not tickers:
+        ap.error("give at least one ticker or --universe")
+
+    rows = []
+    for ticker in tickers:
+        try:
+            rows.append(update_ticker(ticker, Path(args.state_dir), cache_dir=args.cache_dir,
+                                      offline=args.offline))
+        except Exception as e:
+            rows.append({'ticker': ticker, 'signal': 'ERROR', 'error': f"{type(e).__name__}: {e}"})
+
+    results = pd.DataFrame(rows)
+    if 'new_bars' in results:
+        results['new_bars'] = results['new_bars'].astype("Int64")
+    print(results.astype(object).fillna("").to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
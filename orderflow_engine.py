@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Vectorized buy/sell order-flow profile with bin imbalance alerts
+
+Python port of orderflow_tradingview.py (a Pine script). Every bar's
+volume is split into buy and sell volume from its body:
+
+- bullish bar: buy = volume * max(body / range, 0.6), sell = the rest
+- bearish bar: the same with buy and sell swapped
+- doji (close == open): 50/50
+- zero range: the body ratio counts as 1.0
+
+For each bar the last plook + 1 bars are binned into `res` price bins
+between the window's low and high, spreading each bar's buy and sell volume
+in proportion to the overlap with its high-low range. A bin is imbalanced
+when one side holds at least `threshold` of its volume; three or more
+consecutive imbalanced bins print the BUY IMB / SELL IMB text, and the
+alert fires on the bar where that text first appears.
+
+Pine fills the buy and the sell bins in two separate O(res x plook) loops
+on every bar. Here the split runs once over the whole history, and both
+sides share one overlap computation (profile_bins() with two weight
+columns), so years of intraday bars take one pass:
+
+    flow = orderflow_bins(df)                  # per-bar (res,) buy and sell matrices
+    signals = rolling_orderflow(df)            # imbalance runs and fresh alerts per bar
+    alert_stats(signals, horizon=5)            # forward returns after each alert
+
+    python orderflow_engine.py NVDA --source etoro --timeframe 15m --limit 20000
+"""
+
+import argparse
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from volume_profile_engine import MINTICK, profile_bins
+
+
+PLOOK = 10
+RESOLUTION = 20
+IMBALANCE_THRESHOLD = 0.75
+MIN_BODY_RATIO = 0.6
+MIN_RUN = 3               # consecutive imbalanced bins that print the IMB text
+
+
+class OrderflowBins(NamedTuple):
+    """Buy/sell bins of every bar; rows before the first full window are NaN"""
+    bottom: np.ndarray     # (N,) lowest low of the window
+    step: np.ndarray       # (N,) bin height
+    buy: np.ndarray        # (N, res) buy volume per bin
+    sell: np.ndarray       # (N, res) sell volume per bin
+
+
+def buy_sell_split(open_, high, low, close, volume):
+    """Buy and sell volume of every bar from its body-to-range ratio (floored at 0.6)"""
+    open_, high, low, close, volume = (np.asarray(x, dtype=float) for x in (open_, high, low, close, volume))
+    rng = high - low
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(rng > 0, np.abs(close - open_) / rng, 1.0)
+    major = volume * np.maximum(ratio, MIN_BODY_RATIO)
+    minor = volume * (1 - np.maximum(ratio, MIN_BODY_RATIO))
+
+    bullish = close > open_
+    doji = close == open_
+    buy = np.where(doji, volume * 0.5, np.where(bullish, major, minor))
+    sell = np.where(doji, volume * 0.5, np.where(bullish, minor, major))
+    return buy, sell
+
+
+def _split_frame(df: pd.DataFrame):
+    frame = df.rename(columns=str.lower)
+    o, h, l, c, v = (frame[col].to_numpy(dtype=float) for col in ("open", "high", "low", "close", "volume"))
+    buy, sell = buy_sell_split(o, h, l, c, v)
+    return h, l, c, buy, sell
+
+
+def orderflow_bins(df: pd.DataFrame, plook: int = PLOOK, res: int = RESOLUTION,
+                   mintick: float = MINTICK) -> OrderflowBins:
+    """Buy and sell bins of every bar's plook + 1 window, from one overlap computation"""
+    high, low, _, buy, sell = _split_frame(df)
+    window = plook + 1
+    bins = profile_bins(high, low, np.column_stack([buy, sell]), window, res, mintick)
+
+    n = len(high)
+    bottom, step = np.full(n, np.nan), np.full(n, np.nan)
+    buy_bins, sell_bins = np.full((n, res), np.nan), np.full((n, res), np.nan)
+    done = slice(window - 1, n)
+    bottom[done], step[done] = bins.bottom, bins.step
+    buy_bins[done], sell_bins[done] = bins.volumes[:, :, 0], bins.volumes[:, :, 1]
+    return OrderflowBins(bottom, step, buy_bins, sell_bins)
+
+
+def bin_imbalance(buy: np.ndarray, sell: np.ndarray, threshold: float = IMBALANCE_THRESHOLD):
+    """Boolean (N, res) buy- and sell-imbalance masks: one side >= threshold of the bin's volume"""
+    total = buy + sell
+    with np.errstate(divide="ignore", invalid="ignore"):
+        buy_imb = (total > 0) & (buy / total >= threshold)
+        sell_imb = (total > 0) & (sell / total >= threshold)
+    return buy_imb, sell_imb
+
+
+def longest_run(mask: np.ndarray) -> np.ndarray:
+    """Longest run of consecutive True along the last axis, for every row at once
+
+    The run ending at column j has length j - (last False at or before j),
+    so a running maximum of False positions gives every run length.
+    """
+    n_rows, n_cols = mask.shape
+    cols = np.broadcast_to(np.arange(n_cols), mask.shape)
+    last_false = np.maximum.accumulate(np.where(mask, -1, cols), axis=1)
+    return (cols - last_false).max(axis=1, initial=0)
+
+
+def rolling_orderflow(df: pd.DataFrame, plook: int = PLOOK, res: int = RESOLUTION,
+                      threshold: float = IMBALANCE_THRESHOLD, min_run: int = MIN_RUN,
+                      mintick: float = MINTICK) -> pd.DataFrame:
+    """Per-bar order-flow summary: window buy/sell volume, imbalance runs and fresh alerts
+
+    buy_text / sell_text: a run of min_run+ imbalanced bins exists (Pine's
+    text "present"); new_buy_alert / new_sell_alert: it was absent on the
+    bar before (the alertcondition triggers).
+    """
+    flow = orderflow_bins(df, plook, res, mintick)
+    buy_imb, sell_imb = bin_imbalance(flow.buy, flow.sell, threshold)
+    buy_run, sell_run = longest_run(buy_imb), longest_run(sell_imb)
+
+    out = pd.DataFrame({
+        "close": df.rename(columns=str.lower)["close"].to_numpy(dtype=float),
+        "buy_volume": flow.buy.sum(axis=1),
+        "sell_volume": flow.sell.sum(axis=1),
+        "buy_imb_bins": buy_imb.sum(axis=1),
+        "sell_imb_bins": sell_imb.sum(axis=1),
+        "buy_run": buy_run,
+        "sell_run": sell_run,
+    }, index=df.index)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["delta_pct"] = (out["buy_volume"] - out["sell_volume"]) / (out["buy_volume"] + out["sell_volume"]) * 100
+    for side, run in (("buy", buy_run), ("sell", sell_run)):
+        present = run >= min_run
+        out[f"{side}_text"] = present
+        out[f"new_{side}_alert"] = present & ~np.r_[False, present[:-1]]
+    return out
+
+
+def alert_stats(signals: pd.DataFrame, horizon: int = 5) -> pd.DataFrame:
+    """Count, mean forward return and hit rate over `horizon` bars after each fresh alert
+
+    A BUY alert is a hit when price is higher `horizon` bars later, a SELL
+    alert when it is lower. Alerts without `horizon` bars after them are skipped.
+    """
+    close = signals["close"].to_numpy(dtype=float)
+    forward = np.full(len(close), np.nan)
+    forward[:-horizon or None] = close[horizon:] / close[:-horizon or None] - 1
+
+    rows = []
+    for side, sign in (("buy", 1), ("sell", -1)):
+        fired = signals[f"new_{side}_alert"].to_numpy() & ~np.isnan(forward)
+        returns = forward[fired]
+        rows.append({
+            "alert": f"{side.upper()} IMB",
+            "count": int(fired.sum()),
+            "mean_return_pct": returns.mean() * 100 if len(returns) else np.nan,
+            "hit_rate": (sign * returns > 0).mean() if len(returns) else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Order-flow imbalance alerts and their forward returns")
+    ap.add_argument("ticker", nargs="+", help="Tickers")
+    ap.add_argument("--source", choices=["yfinance", "etoro"], default="yfinance",
+                    help="Daily bars from the price cache, or any timeframe from eToro")
+    ap.add_argument("--timeframe", default="1d", help="eToro timeframe (default: 1d)")
+    ap.add_argument("--limit", type=int, default=1000, help="eToro candles (default: 1000)")
+    ap.add_argument("--plook", type=int, default=PLOOK, help=f"Profile lookback (default: {PLOOK})")
+    ap.add_argument("--res", type=int, default=RESOLUTION, help=f"Profile bins (default: {RESOLUTION})")
+    ap.add_argument("--threshold", type=float, default=IMBALANCE_THRESHOLD,
+                    help=f"Bin imbalance threshold (default: {IMBALANCE_THRESHOLD})")
+    ap.add_argument("--horizon", type=int, default=5, help="Bars ahead for alert returns (default: 5)")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory (yfinance)")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only (yfinance)")
+    args = ap.parse_args()
+
+    status = 0
+    for ticker in (t.upper() for t in args.ticker):
+        try:
+            if args.source == "etoro":
+                from simple_markov_etoro import get_client
+                df = get_client().get_ohlc_data(ticker, args.timeframe, args.limit).set_index("datetime")
+            else:
+                from price_cache import load_prices
+                df = load_prices(ticker, cache_dir=args.cache_dir, offline=args.offline)
+        except Exception as e:
+            print(f"{ticker}: {type(e).__name__}: {e}")
+            status = 1
+            continue
+
+        signals = rolling_orderflow(df, args.plook, args.res, args.threshold)
+        last = signals.iloc[-1]
+        print(f"{'='*70}")
+        print(f"{ticker}: {len(df)} bars, {df.index[0]} to {df.index[-1]}")
+        print(f"{'='*70}")
+        print(f"  Window delta: {last['delta_pct']:+.1f}% "
+              f"(buy {last['buy_volume']:,.0f} / sell {last['sell_volume']:,.0f})")
+        print(f"  Imbalanced bins: {last['buy_imb_bins']} buy (run {last['buy_run']}), "
+              f"{last['sell_imb_bins']} sell (run {last['sell_run']})")
+        for side in ("buy", "sell"):
+            if last[f"new_{side}_alert"]:
+                print(f"  🔔 Fresh {side.upper()} IMB on the last bar")
+        stats = alert_stats(signals, args.horizon)
+        stats["mean_return_pct"] = stats["mean_return_pct"].map(lambda x: f"{x:+.2f}%" if pd.notna(x) else "")
+        stats["hit_rate"] = stats["hit_rate"].map(lambda x: f"{x:.1%}" if pd.notna(x) else "")
+        print(f"\n  Fresh alerts, {args.horizon} bars ahead:")
+        print(stats.to_string(index=False))
+        print()
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
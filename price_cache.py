@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Local incremental OHLC cache
+
+Keeps daily bars per ticker on disk as memory-mapped NumPy arrays so a run
+only downloads the bars after the last cached date:
+
+    <cache_dir>/<TICKER>/index.npy   bar timestamps (datetime64[ns])
+    <cache_dir>/<TICKER>/values.npy  float64 array (n_bars, n_columns)
+    <cache_dir>/<TICKER>/meta.json   column names, timezone, format version
+
+Offline mode reads the cache and never touches the network; online mode
+only does when a session has completed since the last cached bar.
+
+A provider is any callable provider(ticker, start) -> DataFrame returning
+bars from `start` (a date, or None for the full history) with a
+DatetimeIndex. FrameProvider serves bars from an in-memory frame, so the
+cache can be exercised without network access.
+"""
+
+import json
+import os
+import re
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from trading_calendar import get_calendar
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = Path(os.environ.get("MARKOV_CACHE_DIR", "~/.cache/learn_simple_markov")).expanduser()
+
+Provider = Callable[[str, Optional[date]], pd.DataFrame]
+
+
+def yfinance_provider(ticker: str, start: Optional[date] = None) -> pd.DataFrame:
+    """Default provider: completed daily bars from yfinance"""
+    from super_markov import download_prices_yfinance
+
+    if start is None:
+        return download_prices_yfinance(ticker, period="max")
+    return download_prices_yfinance(ticker, start=start.isoformat(), allow_empty=True)
+
+
+class FrameProvider:
+    """Stand-in provider serving bars from a DataFrame, recording every request"""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.calls: List[Tuple[str, Optional[date]]] = []
+
+    def __call__(self, ticker: str, start: Optional[date] = None) -> pd.DataFrame:
+        self.calls.append((ticker, start))
+        if start is None:
+            return self.frame.copy()
+        return self.frame[self.frame.index.date >= start].copy()
+
+
+def encode_timestamp(ts: Optional[pd.Timestamp]) -> Tuple[np.datetime64, np.str_]:
+    """(datetime64, zone) of a timestamp for an .npz file: UTC for tz-aware stamps, NaT for None"""
+    if ts is None:
+        return np.datetime64("NaT", "ns"), np.str_("")
+    ts = pd.Timestamp(ts)
+    return ts.to_datetime64(), np.str_(str(ts.tz) if ts.tz is not None else "")
+
+
+def decode_timestamp(value: np.datetime64, tz: str) -> Optional[pd.Timestamp]:
+    """Inverse of encode_timestamp(): None for NaT, back in its zone when one was saved"""
+    if np.isnat(value):
+        return None
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC").tz_convert(str(tz)) if str(tz) else ts
+
+
+def cache_path(ticker: str, cache_dir: Optional[Path] = None) -> Path:
+    """Directory holding one ticker's cache (symbols like ^GSPC made file-safe)"""
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+    return Path(cache_dir or DEFAULT_CACHE_DIR) / safe
+
+
+def read_cache(ticker: str, cache_dir: Optional[Path] = None) -> Optional[pd.DataFrame]:
+    """Cached bars for a ticker, or None if nothing (compatible) is cached"""
+    path = cache_path(ticker, cache_dir)
+    try:
+        meta = json.loads((path / "meta.json").read_text())
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("version") != CACHE_VERSION:
+        return None
+
+    try:
+        stamps = np.load(path / "index.npy", mmap_mode="r")
+        values = np.load(path / "values.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    # The three files are replaced one by one: a reader racing a writer can
+    # pair arrays (or metadata) of different versions, so treat that as a miss
+    if values.ndim != 2 or len(stamps) != len(values) or values.shape[1] != len(meta["columns"]):
+        return None
+
+    index = pd.DatetimeIndex(stamps, name=meta.get("index_name"))
+    if meta.get("tz"):
+        index = index.tz_localize("UTC").tz_convert(meta["tz"])
+
+    return pd.DataFrame(values, index=index, columns=meta["columns"])
+
+
+def write_cache(ticker: str, df: pd.DataFrame, cache_dir: Optional[Path] = None) -> None:
+    """Replace a ticker's cache with df (written to temp files, then renamed)"""
+    path = cache_path(ticker, cache_dir)
+    path.mkdir(parents=True, exist_ok=True)
+
+    index = pd.DatetimeIndex(df.index)
+    tz = str(index.tz) if index.tz is not None else None
+    if tz:
+        index = index.tz_convert("UTC").tz_localize(None)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "columns": [str(c) for c in df.columns],
+        "index_name": df.index.name,
+        "tz": tz,
+    }
+
+    arrays = {
+        "index.npy": index.to_numpy(dtype="datetime64[ns]"),
+        "values.npy": df.to_numpy(dtype=float),
+    }
+    for name, arr in arrays.items():
+        with open(path / (name + ".tmp"), "wb") as f:
+            np.save(f, arr)
+    (path / "meta.json.tmp").write_text(json.dumps(meta))
+
+    # Each rename is atomic but the three are not; read_cache() treats a
+    # mismatched set of files as a miss
+    for name in ["index.npy", "values.npy", "meta.json"]:
+        os.replace(path / (name + ".tmp"), path / name)
+
+
+def load_prices(ticker: str, provider: Optional[Provider] = None,
+                cache_dir: Optional[Path] = None, offline: bool = False) -> pd.DataFrame:
+    """Daily bars from the cache, topped up with only the bars after the last cached date
+
+    A cache that already ends at the last completed session is returned
+    without calling the provider.
+    """
+    cached = read_cache(ticker, cache_dir)
+
+    if offline:
+        if cached is None:
+            raise RuntimeError(f"No cached data for {ticker} (offline mode).")
+        return cached
+
+    provider = provider or yfinance_provider
+
+    if cached is None or cached.empty:
+        df = provider(ticker, None)
+    else:
+        # Already holds the latest completed session: nothing new to download
+        if cached.index[-1].date() >= get_calendar().last_completed_session():
+            return cached
+        start = cached.index[-1].date() + timedelta(days=1)
+        new = provider(ticker, start)
+        if new is None or new.empty:
+            return cached
+
+        new = new.reindex(columns=cached.columns)
+        df = pd.concat([cached, new])
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+
+    write_cache(ticker, df, cache_dir)
+    return df
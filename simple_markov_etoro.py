@@ -1,61 +1,57 @@
+import argparse
+import hashlib
 import numpy as np
 import pandas as pd
-import requests
-import uuid
-from collections import defaultdict
-from datetime import datetime
-import pytz
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import NamedTuple
+
+from etoro_client import BASE_URL, MAX_CANDLES, EtoroClient
+from stage_profiler import StageProfiler, add_profile_args, finish_profile, profiler_from_args
+from trading_calendar import get_calendar
+
+NULL_PROFILER = StageProfiler(enabled=False)
+
+COLOR_LABELS = np.array(["G", "R"])
+
+# Volume class: compare each bar to the mean of the previous 20 bars;
+# one edge at 1.0x average gives the two classes L and H
+VOLUME_WINDOW = 20
+VOLUME_EDGES = (1.0,)
+
+# Transitions are weighted by exp(-DECAY_RATE * bars since the transition)
+DECAY_RATE = 0.01
+
+# Fitted models kept by build_markov_model(), keyed by frame fingerprint + parameters
+MODEL_CACHE_SIZE = 32
+_MODEL_CACHE = OrderedDict()
 
 API_KEY = "YOUR_API_KEY_HERE"
 USER_KEY = "YOUR_USER_KEY_HERE"
-BASE_URL = "https://public-api.etoro.com/api/v1"
-
-def headers():
-    return {
-        "x-request-id": str(uuid.uuid4()),
-        "x-api-key": API_KEY,
-        "x-user-key": USER_KEY,
-    }
+RATE_LIMIT = 5.0          # requests per second for the shared client
+_client = None
 
 def is_us_market_open():
     """
     Check if US stock market is currently open.
     
-    Market hours: 9:30 AM - 4:00 PM EST, Monday-Friday
+    Market hours: 9:30 AM - 4:00 PM New York time on NYSE sessions
+    (weekends, holidays and 1:00 PM early closes come from the trading calendar)
     """
-    est = pytz.timezone('US/Eastern')
-    now_est = datetime.now(est)
-    
-    # Check if weekend
-    if now_est.weekday() >= 5:  # Saturday=5, Sunday=6
-        return False
-    
-    # Check market hours (9:30 AM - 4:00 PM EST)
-    market_open = now_est.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close = now_est.replace(hour=16, minute=0, second=0, microsecond=0)
-    
-    return market_open <= now_est <= market_close
+    return get_calendar().is_open()
+
+def get_client():
+    """The shared EtoroClient: one pooled session and instrument-ID cache per process"""
+    global _client
+    if _client is None:
+        _client = EtoroClient(API_KEY, USER_KEY, BASE_URL, rate_limit=RATE_LIMIT)
+    return _client
 
 def get_instrument_id(ticker):
-    url = f"{BASE_URL}/market-data/search"
-    r = requests.get(url, headers=headers(), params={"internalSymbolFull": ticker})
-    r.raise_for_status()
-    data = r.json()
-    
-    if isinstance(data, dict) and 'items' in data and len(data['items']) > 0:
-        instrument = data['items'][0]
-        instrument_id = (
-            instrument.get("internalInstrumentId") or 
-            instrument.get("InstrumentID") or 
-            instrument.get("instrumentId")
-        )
-        if instrument_id:
-            name = instrument.get("internalInstrumentDisplayName", ticker)
-            print(f"✓ Found: {name}")
-            print(f"✓ Instrument ID: {instrument_id}")
-            return int(instrument_id)
-    
-    raise Exception(f"Instrument not found: {ticker}")
+    instrument = get_client().resolve(ticker)
+    print(f"✓ Found: {instrument['name']}")
+    print(f"✓ Instrument ID: {instrument['id']}")
+    return instrument["id"]
 
 def get_ohlc_data(ticker, timeframe="1d", limit=1000):
     print(f"\n{'='*70}")
@@ -63,150 +59,412 @@ def get_ohlc_data(ticker, timeframe="1d", limit=1000):
     print(f"{'='*70}\n")
     
     instrument_id = get_instrument_id(ticker)
+    if limit > MAX_CANDLES:
+        # Past the per-request cap: concurrent date windows, stitched together
+        df = get_client().get_history(ticker, timeframe, limit=limit)
+    else:
+        df = get_client().get_candles(instrument_id, timeframe, limit)
     
-    timeframe_map = {
-        "1m": "OneMinute", "5m": "FiveMinutes", "10m": "TenMinutes",
-        "15m": "FifteenMinutes", "30m": "ThirtyMinutes", "1h": "OneHour",
-        "4h": "FourHours", "1d": "OneDay", "1w": "OneWeek"
-    }
-    
-    interval = timeframe_map.get(timeframe, "OneDay")
-    candlesCount = min(limit, 1000)
-    
-    url = f"{BASE_URL}/market-data/instruments/{instrument_id}/history/candles/asc/{interval}/{candlesCount}"
-    
-    r = requests.get(url, headers=headers())
-    r.raise_for_status()
-    data = r.json()
-    
-    candles_data = []
-    for instrument_candles in data.get("candles", []):
-        for candle in instrument_candles.get("candles", []):
-            candles_data.append({
-                "datetime": candle.get("fromDate"),
-                "open": candle.get("open"),
-                "high": candle.get("high"),
-                "low": candle.get("low"),
-                "close": candle.get("close"),
-                "volume": candle.get("volume", 0)
-            })
-    
-    if not candles_data:
+    if df.empty:
         raise Exception("No candle data found")
     
-    df = pd.DataFrame(candles_data)
-    df['datetime'] = pd.to_datetime(df['datetime'])
-    
     print(f"✓ Fetched {len(df)} candles\n")
     
     return df
 
+def candle_color_codes(df):
+    """0 = G (close >= open), 1 = R, for every bar in one pass"""
+    closes = df["close"].to_numpy(dtype=float)
+    opens = df["open"].to_numpy(dtype=float)
+    return (~(closes >= opens)).astype(np.uint8)
+
 def get_candle_colors(df):
-    return ["G" if df.iloc[i]["close"] >= df.iloc[i]["open"] else "R" for i in range(len(df))]
-
-def get_volume_category(df):
-    volumes = df["volume"].values
-    categories = []
-    for i in range(len(volumes)):
-        avg_vol = np.mean(volumes[:i+1]) if i < 20 else np.mean(volumes[i-20:i])
-        categories.append("H" if volumes[i] > avg_vol else "L")
-    return categories
-
-def build_markov_model(df, pattern_length=3):
-    colors = get_candle_colors(df)
-    volumes = get_volume_category(df)
-    transitions = defaultdict(list)
-    
-    for i in range(pattern_length, len(colors)):
-        pattern = "".join(colors[i-pattern_length:i])
-        volume_cat = volumes[i-1]
-        pattern_key = f"{pattern}_{volume_cat}"
-        next_color = colors[i]
-        transitions[pattern_key].append({
-            "next": next_color,
-            "index": i,
-            "date_offset": len(colors) - i
-        })
+    return COLOR_LABELS[candle_color_codes(df)].tolist()
+
+def _window_sums(volumes, window):
+    """Sum of the `window` volumes before each bar (bar i uses volumes[i-window:i])"""
+    sums = np.zeros(len(volumes))
+    if len(volumes) <= window:
+        return sums
+    
+    # Integral volumes sum exactly in float64, so a cumulative sum is safe;
+    # otherwise sum each window directly to avoid cancellation drift
+    if np.all(volumes == np.round(volumes)) and np.abs(volumes).sum() < 2 ** 53:
+        cs = np.concatenate([[0.0], np.cumsum(volumes)])
+        sums[window:] = cs[window:-1] - cs[:-window - 1]
+    else:
+        windows = np.lib.stride_tricks.sliding_window_view(volumes[:-1], window)
+        sums[window:] = windows.sum(axis=1)
+    return sums
+
+def volume_classes(volumes, window=VOLUME_WINDOW, edges=VOLUME_EDGES):
+    """Volume bucket per bar: how many `edges` volume[i] / average exceeds
+
+    The average is the mean of the previous `window` bars, or the expanding
+    mean including the bar itself for the first `window` bars. With the
+    default edges=(1.0,) this is 1 for High (above average), 0 for Low.
+    """
+    volumes = np.asarray(volumes, dtype=float)
+    n = len(volumes)
+    
+    head = min(n, window)
+    avg = _window_sums(volumes, window) / window
+    avg[:head] = np.cumsum(volumes[:head]) / np.arange(1, head + 1)
+    
+    classes = np.zeros(n, dtype=np.int8)
+    for edge in edges:
+        classes += volumes > avg * edge
+    return classes
+
+def volume_labels(n_buckets):
+    return ("L", "H") if n_buckets == 2 else tuple(f"V{i}" for i in range(n_buckets))
+
+def get_volume_category(df, window=VOLUME_WINDOW, edges=VOLUME_EDGES):
+    classes = volume_classes(df["volume"].to_numpy(dtype=float), window, edges)
+    return np.array(volume_labels(len(edges) + 1))[classes].tolist()
+
+class Occurrences(NamedTuple):
+    """Every transition as parallel arrays (one entry per bar after the first pattern)"""
+    state: np.ndarray        # int64 state code: pattern colors, then the volume class
+    next: np.ndarray         # uint8 next candle color, 0 = G, 1 = R
+    date_offset: np.ndarray  # int64 bars between the transition and the end of the data
+
+@lru_cache(maxsize=None)
+def state_code_labels(pattern_length=3, n_buckets=2):
+    """State names ("GGR_H", ...) indexed by state code"""
+    # Mixed radix: pattern_length binary color digits, then one base-n_buckets volume digit
+    codes = np.arange(2 ** pattern_length * n_buckets)
+    bits = (codes[:, None] // n_buckets >> np.arange(pattern_length - 1, -1, -1)) & 1
+    vols = np.array(volume_labels(n_buckets))[codes % n_buckets]
+    return tuple("".join(colors) + f"_{vol}" for colors, vol in zip(COLOR_LABELS[bits], vols))
+
+def pattern_occurrences(color_codes, vol_classes, pattern_length=3, n_buckets=2):
+    """State code, next color and date offset of every transition
+
+    The state of bar i is the colors of bars i-pattern_length..i-1 (oldest
+    in the highest bit) and the volume class of bar i-1.
+    """
+    n = len(color_codes)
+    m = max(n - pattern_length, 0)
+    
+    state = np.zeros(m, dtype=np.int64)
+    for j in range(pattern_length):
+        state = (state << 1) | color_codes[j:j + m]
+    state = state * n_buckets + vol_classes[pattern_length - 1:pattern_length - 1 + m]
+    
+    return Occurrences(
+        state=state,
+        next=np.asarray(color_codes[pattern_length:], dtype=np.uint8),
+        date_offset=np.arange(m, 0, -1, dtype=np.int64),
+    )
+
+def decay_weights(date_offset, decay=DECAY_RATE):
+    """exp(-decay * offset) for one rate (n,) or a vector of rates (n_rates, n)"""
+    return np.exp(-np.multiply.outer(np.asarray(decay, dtype=float), date_offset))
+
+def weighted_color_counts(occ, n_states, decay=DECAY_RATE):
+    """Decay-weighted G and R counts per state, shape (n_states,) or (n_rates, n_states)"""
+    weights = np.atleast_2d(decay_weights(occ.date_offset, decay))
+    n_rates = len(weights)
+    
+    # One bincount for all rates: rate r uses the codes r * n_states + state
+    codes = (np.arange(n_rates)[:, None] * n_states + occ.state).ravel()
+    green = np.bincount(codes, weights=(weights * (occ.next == 0)).ravel(), minlength=n_rates * n_states)
+    red = np.bincount(codes, weights=(weights * (occ.next == 1)).ravel(), minlength=n_rates * n_states)
+    
+    shape = (n_states,) if np.ndim(decay) == 0 else (n_rates, n_states)
+    return green.reshape(shape), red.reshape(shape)
+
+def frame_fingerprint(df):
+    """Cheap content hash of the columns the model reads (open, close, volume, datetime)"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(len(df)).encode())
+    for col in ("open", "close", "volume"):
+        h.update(np.ascontiguousarray(df[col].to_numpy(dtype=float)).tobytes())
+    if "datetime" in df and len(df):
+        h.update(f"{df['datetime'].iloc[0]}|{df['datetime'].iloc[-1]}".encode())
+    return h.hexdigest()
+
+def clear_model_cache():
+    _MODEL_CACHE.clear()
+
+def build_markov_model(df, pattern_length=3, profiler=NULL_PROFILER,
+                       volume_window=VOLUME_WINDOW, volume_edges=VOLUME_EDGES, decay=DECAY_RATE):
+    """fit_markov_model() memoized on the frame's fingerprint and the model parameters
+
+    The last MODEL_CACHE_SIZE fits are kept (least recently used evicted
+    first), so analyze(), the transition matrix and later reports share one
+    fit. The returned objects are shared between callers: don't mutate them.
+    """
+    key = (frame_fingerprint(df), pattern_length, volume_window, tuple(volume_edges),
+           tuple(np.atleast_1d(np.asarray(decay, dtype=float)).tolist()), np.ndim(decay))
+    
+    if key in _MODEL_CACHE:
+        _MODEL_CACHE.move_to_end(key)
+        return _MODEL_CACHE[key]
+    
+    model = fit_markov_model(df, pattern_length, profiler, volume_window, volume_edges, decay)
+    _MODEL_CACHE[key] = model
+    while len(_MODEL_CACHE) > MODEL_CACHE_SIZE:
+        _MODEL_CACHE.popitem(last=False)
+    return model
+
+def fit_markov_model(df, pattern_length=3, profiler=NULL_PROFILER,
+                     volume_window=VOLUME_WINDOW, volume_edges=VOLUME_EDGES, decay=DECAY_RATE):
+    """Pattern statistics plus the color and volume labels of every bar
+
+    decay may be one rate or a vector of rates; with a vector, p_bullish and
+    p_bearish of each pattern are arrays with one entry per rate, all
+    computed from the same occurrence arrays.
+    """
+    with profiler.stage("encoding", rows=len(df)):
+        color_codes = candle_color_codes(df)
+        vol_classes = volume_classes(df["volume"].to_numpy(dtype=float), volume_window, volume_edges)
+        colors = COLOR_LABELS[color_codes].tolist()
+        volumes = np.array(volume_labels(len(volume_edges) + 1))[vol_classes].tolist()
+    
+    with profiler.stage("counting", rows=len(df)):
+        occ = pattern_occurrences(color_codes, vol_classes, pattern_length, len(volume_edges) + 1)
+        pattern_stats = _count_patterns(occ, pattern_length, len(volume_edges) + 1, decay)
+    
+    return pattern_stats, colors, volumes
+
+def _count_patterns(occ, pattern_length, n_buckets, decay):
+    n_states = 2 ** pattern_length * n_buckets
+    green, red = weighted_color_counts(occ, n_states, decay)
+    total_weighted = green + red
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_bullish = np.where(total_weighted > 0, green / total_weighted, 0.5)
+        p_bearish = np.where(total_weighted > 0, red / total_weighted, 0.5)
+    
+    # Group the occurrences by state; within a state they stay in bar order
+    order = np.argsort(occ.state, kind="stable")
+    present, first, totals = np.unique(occ.state[order], return_index=True, return_counts=True)
+    bounds = np.r_[first, len(order)]
+    labels = state_code_labels(pattern_length, n_buckets)
     
     pattern_stats = {}
-    for pattern, occurrences in transitions.items():
-        total = len(occurrences)
-        if total == 0:
-            continue
-        
-        green_count = sum(np.exp(-0.01 * occ["date_offset"]) for occ in occurrences if occ["next"] == "G")
-        red_count = sum(np.exp(-0.01 * occ["date_offset"]) for occ in occurrences if occ["next"] == "R")
-        total_weighted = green_count + red_count
-        
-        pattern_stats[pattern] = {
-            "total_occurrences": total,
-            "p_bullish": green_count / total_weighted if total_weighted > 0 else 0.5,
-            "p_bearish": red_count / total_weighted if total_weighted > 0 else 0.5,
-            "last_seen": min([occ["date_offset"] for occ in occurrences]),
-            "occurrences": occurrences
+    # Patterns in order of first appearance, like the old dict of lists
+    for k in np.argsort(order[first], kind="stable"):
+        code = present[k]
+        rows = order[bounds[k]:bounds[k + 1]]
+        pattern_stats[labels[code]] = {
+            "total_occurrences": int(totals[k]),
+            "p_bullish": p_bullish[..., code] if np.ndim(decay) else float(p_bullish[code]),
+            "p_bearish": p_bearish[..., code] if np.ndim(decay) else float(p_bearish[code]),
+            "last_seen": int(occ.date_offset[rows[-1]]),
+            "occurrences": Occurrences(occ.state[rows], occ.next[rows], occ.date_offset[rows]),
         }
     
-    return pattern_stats, colors, volumes
+    return pattern_stats
+
+class StreamingMarkovModel:
+    """Decay-weighted pattern counts updated one bar at a time
+
+    Equivalent to fit_markov_model() on all bars seen so far, but each bar
+    costs O(1): every transition's weight is exp(-decay * bars since), so a
+    new bar multiplies all weights by exp(-decay) and adds its transition
+    with weight exp(-decay). The multiplication is kept as one global scale
+    (stored weights * scale = true weights), renormalized before it
+    underflows. Memory is constant per state plus the volume window.
+    """
+    
+    RENORMALIZE_BELOW = 1e-150
+    
+    def __init__(self, pattern_length=3, decay=DECAY_RATE, volume_window=VOLUME_WINDOW,
+                 volume_edges=VOLUME_EDGES):
+        self.pattern_length = pattern_length
+        self.decay = float(decay)
+        self.volume_window = volume_window
+        self.volume_edges = tuple(volume_edges)
+        self.n_buckets = len(self.volume_edges) + 1
+        self.n_states = 2 ** pattern_length * self.n_buckets
+        
+        self.weights = np.zeros((self.n_states, 2))            # G, R; scaled by self.scale
+        self.totals = np.zeros(self.n_states, dtype=np.int64)
+        self.last_index = np.full(self.n_states, -1, dtype=np.int64)
+        self.scale = 1.0
+        self._factor = np.exp(-self.decay)
+        
+        self.n_bars = 0
+        self.context = 0          # last pattern_length colors, newest in the lowest bit
+        self.last_class = 0       # volume class of the last bar
+        self._volumes = deque()
+        self._volume_sum = 0.0
+        self._integral = True     # every volume so far integral: the running sum is exact
+    
+    @classmethod
+    def from_frame(cls, df, pattern_length=3, decay=DECAY_RATE, volume_window=VOLUME_WINDOW,
+                   volume_edges=VOLUME_EDGES):
+        """Warm start from a history in one vectorized pass, then continue with update()"""
+        model = cls(pattern_length, decay, volume_window, volume_edges)
+        color_codes = candle_color_codes(df)
+        volumes = df["volume"].to_numpy(dtype=float)
+        vol_classes = volume_classes(volumes, volume_window, model.volume_edges)
+        occ = pattern_occurrences(color_codes, vol_classes, pattern_length, model.n_buckets)
+        
+        green, red = weighted_color_counts(occ, model.n_states, decay)
+        model.weights = np.column_stack([green, red])
+        model.totals = np.bincount(occ.state, minlength=model.n_states).astype(np.int64)
+        n = len(color_codes)
+        model.last_index[occ.state] = n - occ.date_offset      # later occurrences overwrite earlier
+        
+        model.n_bars = n
+        for bit in color_codes[-pattern_length:]:
+            model.context = ((model.context << 1) | int(bit)) & ((1 << pattern_length) - 1)
+        model.last_class = int(vol_classes[-1]) if n else 0
+        model._volumes.extend(volumes[-volume_window:].tolist())
+        model._volume_sum = float(np.cumsum(volumes[-volume_window:])[-1]) if n else 0.0
+        model._integral = bool(np.all(volumes == np.round(volumes)))
+        return model
+    
+    def _volume_class(self, volume):
+        """Same average as volume_classes(): expanding for the first window bars, then the previous window
 
-def build_full_transition_matrix(df, pattern_length=3):
-    pattern_stats, colors, volumes = build_markov_model(df, pattern_length)
-    
-    all_patterns = []
-    for c1 in ['G', 'R']:
-        for c2 in ['G', 'R']:
-            for c3 in ['G', 'R']:
-                for vol in ['H', 'L']:
-                    pattern = f"{c1}{c2}{c3}_{vol}"
-                    all_patterns.append(pattern)
-    
-    matrix_data = []
-    for pattern in sorted(all_patterns):
-        if pattern in pattern_stats:
-            stats = pattern_stats[pattern]
-            matrix_data.append({
-                "State": pattern,
-                "Count": stats["total_occurrences"],
-                "P(Green)": f"{stats['p_bullish']:.1%}",
-                "P(Red)": f"{stats['p_bearish']:.1%}",
-                "LastSeen": stats["last_seen"],
-                "Bias": "🟢 BULL" if stats['p_bullish'] > stats['p_bearish'] else "🔴 BEAR"
-            })
+        Like _window_sums(), the running window sum is only trusted while
+        every volume is integral; otherwise the window is summed directly.
+        """
+        if self.n_bars < self.volume_window:
+            self._integral = self._integral and volume.is_integer()
+            self._volumes.append(volume)
+            self._volume_sum += volume
+            avg = self._volume_sum / len(self._volumes)
         else:
-            matrix_data.append({
-                "State": pattern,
-                "Count": 0,
-                "P(Green)": "N/A",
-                "P(Red)": "N/A",
-                "LastSeen": "N/A",
-                "Bias": "⚪ NONE"
-            })
-    
-    return pd.DataFrame(matrix_data)
-
-def analyze(df, pattern_length=3):
+            if self._integral and abs(self._volume_sum) < 2 ** 53:
+                avg = self._volume_sum / self.volume_window
+            else:
+                avg = float(np.sum(np.fromiter(self._volumes, float, len(self._volumes)))) / self.volume_window
+            self._integral = self._integral and volume.is_integer()
+            self._volume_sum += volume - self._volumes.popleft()
+            self._volumes.append(volume)
+        return sum(volume > avg * edge for edge in self.volume_edges)
+    
+    def update(self, open_, close, volume):
+        """Add one bar: one decay step and at most one count increment"""
+        color = 0 if close >= open_ else 1
+        vol_class = self._volume_class(float(volume))
+        
+        if self.n_bars >= self.pattern_length:
+            state = self.context * self.n_buckets + self.last_class
+            self.weights[state, color] += 1.0 / self.scale
+            self.totals[state] += 1
+            self.last_index[state] = self.n_bars
+            self.scale *= self._factor
+            if self.scale < self.RENORMALIZE_BELOW:
+                self.weights *= self.scale
+                self.scale = 1.0
+        
+        self.context = ((self.context << 1) | color) & ((1 << self.pattern_length) - 1)
+        self.last_class = vol_class
+        self.n_bars += 1
+    
+    def current_state(self):
+        """State label of the last pattern_length bars (the state the next bar will be counted in)"""
+        if self.n_bars < self.pattern_length:
+            return None
+        labels = state_code_labels(self.pattern_length, self.n_buckets)
+        return labels[self.context * self.n_buckets + self.last_class]
+    
+    def pattern_stats(self):
+        """build_markov_model()-style stats (without the occurrence arrays)"""
+        labels = state_code_labels(self.pattern_length, self.n_buckets)
+        green = self.weights[:, 0] * self.scale
+        red = self.weights[:, 1] * self.scale
+        total_weighted = green + red
+        
+        stats = {}
+        for code in np.flatnonzero(self.totals):
+            weighted = total_weighted[code]
+            stats[labels[code]] = {
+                "total_occurrences": int(self.totals[code]),
+                "p_bullish": float(green[code] / weighted) if weighted > 0 else 0.5,
+                "p_bearish": float(red[code] / weighted) if weighted > 0 else 0.5,
+                "last_seen": int(self.n_bars - self.last_index[code]),
+            }
+        return stats
+
+def build_full_transition_matrix(df, pattern_length=3, profiler=NULL_PROFILER, decay=DECAY_RATE,
+                                 volume_window=VOLUME_WINDOW, volume_edges=VOLUME_EDGES):
+    """Every state of the pattern_length x volume-bucket grid with its statistics
+
+    Columns are numeric: Count, P(Green)/P(Red) (NaN for states never seen)
+    and LastSeen (<NA> for states never seen). Rows are sorted by State name.
+    format_transition_matrix() turns it into the printed table.
+    """
+    pattern_stats, _, _ = build_markov_model(df, pattern_length, profiler, volume_window, volume_edges, decay)
+    n_buckets = len(volume_edges) + 1
+    labels = state_code_labels(pattern_length, n_buckets)
+    n_states = len(labels)
+    
+    stats = list(pattern_stats.values())
+    seen = np.array([s["occurrences"].state[0] for s in stats], dtype=np.int64)
+    count = np.zeros(n_states, dtype=np.int64)
+    p_green = np.full(n_states, np.nan)
+    p_red = np.full(n_states, np.nan)
+    last_seen = np.zeros(n_states, dtype=np.int64)
+    count[seen] = [s["total_occurrences"] for s in stats]
+    p_green[seen] = [s["p_bullish"] for s in stats]
+    p_red[seen] = [s["p_bearish"] for s in stats]
+    last_seen[seen] = [s["last_seen"] for s in stats]
+    
+    # State name order: colors (G < R), then the volume label
+    codes = np.arange(n_states)
+    vol_rank = np.argsort(np.argsort(volume_labels(n_buckets)))
+    order = np.lexsort((vol_rank[codes % n_buckets], codes // n_buckets))
+    
+    return pd.DataFrame({
+        "State": np.array(labels)[order],
+        "Count": count[order],
+        "P(Green)": p_green[order],
+        "P(Red)": p_red[order],
+        "LastSeen": pd.Series(last_seen[order], dtype="Int64").where(count[order] > 0),
+    })
+
+def format_transition_matrix(matrix):
+    """The printed table: percentages, N/A for unseen states and a Bias column"""
+    seen = (matrix["Count"] > 0).to_numpy()
+    p_green = matrix["P(Green)"].to_numpy()
+    p_red = matrix["P(Red)"].to_numpy()
+    
+    return pd.DataFrame({
+        "State": matrix["State"],
+        "Count": matrix["Count"],
+        "P(Green)": np.where(seen, [f"{p:.1%}" for p in p_green], "N/A"),
+        "P(Red)": np.where(seen, [f"{p:.1%}" for p in p_red], "N/A"),
+        "LastSeen": [int(x) if s else "N/A" for x, s in zip(matrix["LastSeen"].fillna(0), seen)],
+        "Bias": np.select([~seen, p_green > p_red], ["⚪ NONE", "🟢 BULL"], "🔴 BEAR"),
+    })
+
+def analyze(df, pattern_length=3, profiler=NULL_PROFILER, decay=DECAY_RATE,
+            volume_window=VOLUME_WINDOW, volume_edges=VOLUME_EDGES, timeframe="1d"):
     """
     Simple analysis based on US market hours.
     
-    - Market OPEN → last candle is forming, use -4, -3, -2
-    - Market CLOSED → last candle is complete, use -3, -2, -1
+    - Last candle still forming → use the pattern_length candles before it
+    - Last candle complete → use the last pattern_length candles
+    
+    Whether the last candle is complete comes from the trading calendar for
+    its own timeframe: an intraday bar is done once its end (or an early
+    close) has passed, a daily bar once its session has closed.
     """
     market_open = is_us_market_open()
+    last_complete = bool(get_calendar().label_bars(df["datetime"].iloc[-1:], timeframe)["complete"].iloc[-1])
     
-    pattern_stats, colors, volumes = build_markov_model(df, pattern_length)
+    pattern_stats, colors, volumes = build_markov_model(df, pattern_length, profiler,
+                                                        volume_window, volume_edges, decay)
     
-    # Determine indices based on market status
-    if market_open:
-        # Market is OPEN → last candle is forming
-        idx1, idx2, idx3 = -4, -3, -2
-        vol_idx = -2
-        status = "🟢 MARKET OPEN - Last candle is forming"
+    # Determine indices based on the last candle's status
+    market = "🟢 MARKET OPEN" if market_open else "🔴 MARKET CLOSED"
+    if last_complete:
+        last = -1
+        status = f"{market} - All candles complete"
     else:
-        # Market is CLOSED → last candle is complete
-        idx1, idx2, idx3 = -3, -2, -1
-        vol_idx = -1
-        status = "🔴 MARKET CLOSED - All candles complete"
+        last = -2
+        status = f"{market} - Last candle is forming"
+    pattern_idx = list(range(last - pattern_length + 1, last + 1))
+    vol_idx = last
     
-    current_pattern = "".join([colors[idx1], colors[idx2], colors[idx3]])
+    current_pattern = "".join(colors[i] for i in pattern_idx)
     current_volume = volumes[vol_idx]
     current_state = f"{current_pattern}_{current_volume}"
     
@@ -216,13 +474,13 @@ def analyze(df, pattern_length=3):
     print(f"  {status}\n")
     
     print(f"{'='*70}")
-    print(f"CURRENT STATE (Last 3 COMPLETED Candles)")
+    print(f"CURRENT STATE (Last {pattern_length} COMPLETED Candles)")
     print(f"{'='*70}\n")
     
-    print(f"  {df['datetime'].iloc[idx1].date()}: {colors[idx1]} ({'🟢 Green' if colors[idx1] == 'G' else '🔴 Red'})")
-    print(f"  {df['datetime'].iloc[idx2].date()}: {colors[idx2]} ({'🟢 Green' if colors[idx2] == 'G' else '🔴 Red'})")
-    print(f"  {df['datetime'].iloc[idx3].date()}: {colors[idx3]} ({'🟢 Green' if colors[idx3] == 'G' else '🔴 Red'})")
-    print(f"\n  Volume ({df['datetime'].iloc[vol_idx].date()}): {current_volume} ({'High' if current_volume == 'H' else 'Low'})")
+    for i in pattern_idx:
+        print(f"  {df['datetime'].iloc[i].date()}: {colors[i]} ({'🟢 Green' if colors[i] == 'G' else '🔴 Red'})")
+    volume_name = {"H": "High", "L": "Low"}.get(current_volume, f"bucket {current_volume[1:]}")
+    print(f"\n  Volume ({df['datetime'].iloc[vol_idx].date()}): {current_volume} ({volume_name})")
     print(f"  State: {current_state}\n")
     
     # PREDICTION
@@ -247,26 +505,40 @@ def analyze(df, pattern_length=3):
     
     # FULL TRANSITION MATRIX
     print(f"{'='*70}")
-    print(f"FULL TRANSITION MATRIX (ALL 16 STATES)")
+    print(f"FULL TRANSITION MATRIX (ALL {2 ** pattern_length * (len(volume_edges) + 1)} STATES)")
     print(f"{'='*70}\n")
     
-    matrix = build_full_transition_matrix(df, pattern_length)
-    print(matrix.to_string(index=False))
+    matrix = build_full_transition_matrix(df, pattern_length, profiler, decay, volume_window, volume_edges)
+    with profiler.stage("rendering"):
+        print(format_transition_matrix(matrix).to_string(index=False))
     print(f"\n👉 Current state: {current_state}")
     print()
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="eToro Markov model (prompts for anything not given)")
+    ap.add_argument("ticker", nargs="?", help="Ticker (NVDA)")
+    ap.add_argument("timeframe", nargs="?", help="Timeframe (1d)")
+    ap.add_argument("--limit", type=int, default=1000,
+                    help="Candles to fetch; above 1000 they are fetched in concurrent windows (default: 1000)")
+    ap.add_argument("--decay", type=float, default=DECAY_RATE,
+                    help=f"Per-bar decay rate of transition weights (default: {DECAY_RATE})")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    prof = profiler_from_args(args)
+    
     print("\n" + "="*70)
     print("ETORO MARKOV MODEL - SIMPLE VERSION")
     print("Checks US market hours to determine complete candles")
     print("="*70 + "\n")
     
-    ticker = input("Ticker (NVDA): ").strip().upper() or "NVDA"
-    timeframe = input("Timeframe (1d): ").strip().lower() or "1d"
+    ticker = (args.ticker or input("Ticker (NVDA): ")).strip().upper() or "NVDA"
+    timeframe = (args.timeframe or input("Timeframe (1d): ")).strip().lower() or "1d"
     
     try:
-        df = get_ohlc_data(ticker, timeframe, 1000)
-        analyze(df)
+        with prof.stage("download"):
+            df = get_ohlc_data(ticker, timeframe, args.limit)
+        prof.rows("download", len(df))
+        analyze(df, profiler=prof, decay=args.decay, timeframe=timeframe)
         
         print(f"{'='*70}")
         print("✓ Analysis Complete!")
@@ -276,3 +548,5 @@ if __name__ == "__main__":
         print(f"\n❌ Error: {e}\n")
         import traceback
         traceback.print_exc()
+    
+    finish_profile(prof, args)
@@ -0,0 +1,141 @@
+"""
+Per-stage timing for the CLI entry points
+
+    prof = StageProfiler(enabled=args.profile)
+    with prof.stage("download"):
+        df = load_prices(ticker)
+    prof.rows("download", len(df))
+    ...
+    prof.print_report()
+
+Each stage records wall time, rows processed and peak traced memory
+(tracemalloc, which also sees NumPy buffers). Repeated stage names
+accumulate. A disabled profiler hands out one shared no-op context and
+returns immediately from every call, so the hooks can stay in place.
+"""
+
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+
+_NULL = nullcontext()
+
+
+class StageProfiler:
+    """Wall time, rows and peak memory per named stage"""
+
+    def __init__(self, enabled: bool = False, cprofile_path: Optional[str] = None):
+        self.enabled = enabled
+        self.cprofile_path = cprofile_path
+        self.stages: Dict[str, Dict] = {}
+        self._started = time.perf_counter()
+        self._cprofile = None
+        self._run_peak = 0          # bytes; reset_peak() per stage would otherwise lose it
+
+        if enabled:
+            tracemalloc.start()
+        if cprofile_path:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stage(self, name: str, rows: Optional[int] = None):
+        if not self.enabled:
+            return _NULL
+        return self._measure(name, rows)
+
+    @contextmanager
+    def _measure(self, name: str, rows: Optional[int]):
+        self._run_peak = max(self._run_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            traced_peak = tracemalloc.get_traced_memory()[1]
+            self._run_peak = max(self._run_peak, traced_peak)
+            peak = traced_peak - base
+
+            rec = self.stages.setdefault(name, {"stage": name, "seconds": 0.0, "rows": None,
+                                                "peak_mb": 0.0, "calls": 0})
+            rec["seconds"] += elapsed
+            rec["peak_mb"] = max(rec["peak_mb"], peak / 2 ** 20)
+            rec["calls"] += 1
+            if rows is not None:
+                rec["rows"] = (rec["rows"] or 0) + rows
+
+    def rows(self, name: str, rows: int) -> None:
+        """Attach a row count once it is known (e.g. after a download)"""
+        if self.enabled and name in self.stages:
+            self.stages[name]["rows"] = (self.stages[name]["rows"] or 0) + rows
+
+    def report(self) -> List[Dict]:
+        self._stop_cprofile()
+        stages = list(self.stages.values())
+        total = time.perf_counter() - self._started
+        stages.append({"stage": "total", "seconds": total, "rows": None,
+                       "peak_mb": self._peak_bytes() / 2 ** 20 if self.enabled else 0.0,
+                       "calls": 1})
+        return stages
+
+    def _peak_bytes(self) -> int:
+        """Peak traced memory over the whole run, across every reset_peak()"""
+        return max(self._run_peak, tracemalloc.get_traced_memory()[1])
+
+    def print_report(self, file=sys.stdout) -> None:
+        if not self.enabled:
+            return
+
+        print(f"\n{'='*70}", file=file)
+        print("PROFILE", file=file)
+        print(f"{'='*70}", file=file)
+        print(f"  {'stage':<16}{'wall (s)':>12}{'rows':>14}{'peak MB':>12}{'calls':>8}", file=file)
+        for rec in self.report():
+            rows = f"{rec['rows']:,}" if rec["rows"] is not None else "-"
+            print(f"  {rec['stage']:<16}{rec['seconds']:>12.4f}{rows:>14}"
+                  f"{rec['peak_mb']:>12.1f}{rec['calls']:>8}", file=file)
+        if self.cprofile_path:
+            print(f"\n  cProfile stats written to {self.cprofile_path}", file=file)
+        print(file=file)
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"stages": self.report()}, f, indent=2)
+
+    def _stop_cprofile(self) -> None:
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+            self._cprofile = None
+
+
+def add_profile_args(ap) -> None:
+    """The --profile/--profile-json/--cprofile options shared by the entry points"""
+    ap.add_argument("--profile", action="store_true",
+                    help="Report wall time, rows and peak memory per stage")
+    ap.add_argument("--profile-json", default=None, metavar="PATH",
+                    help="Also write the stage report as JSON (implies --profile)")
+    ap.add_argument("--cprofile", default=None, metavar="PATH",
+                    help="Dump cProfile stats of the whole run to PATH")
+
+
+def profiler_from_args(args) -> StageProfiler:
+    return StageProfiler(enabled=bool(args.profile or args.profile_json),
+                         cprofile_path=args.cprofile)
+
+
+def finish_profile(prof: StageProfiler, args) -> None:
+    """Print the report and write the requested files"""
+    if prof.enabled:
+        prof.print_report()
+        if args.profile_json:
+            prof.write_json(args.profile_json)
+            print(f"Profile written to {args.profile_json}\n")
+    else:
+        prof.report()
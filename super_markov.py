@@ -19,18 +19,37 @@ Shows BOTH order=3 and order=5 for confirmation:
 - If they disagree → WEAK SIGNAL (don't trade)
 
 Data: Uses ALL available historical data (max available from yfinance)
-Data cutoff: Up to yesterday in US Eastern Time
+Data cutoff: Up to the last completed NYSE session (trading_calendar.py)
 """
 
 import argparse
+import os
 import sys
 from collections import defaultdict
-from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple, Optional
 
 import numpy as np
 import pandas as pd
 
+from price_cache import load_prices
+from stage_profiler import add_profile_args, finish_profile, profiler_from_args
+from trading_calendar import TZ as NY_TZ, get_calendar
+
+
+# Above this order a dense 2**order table is no longer counted directly
+DENSE_MAX_ORDER = 16
+
+# A model calls GREEN/RED only at or above this probability
+SIGNAL_THRESHOLD = 0.55
+
+# The two orders whose agreement makes the trading signal
+VERDICT_ORDERS = (3, 5)
+
+# Universe scan ordering, best signal first
+SIGNAL_RANK = {"STRONG": 0, "WEAK": 1, "CONFLICTING": 2, "NO DATA": 3, "ERROR": 4}
+
 
 def generate_all_states(order: int) -> List[str]:
     """Generate all possible states for given order"""
@@ -50,20 +69,24 @@ def generate_all_states(order: int) -> List[str]:
     return states
 
 
-def download_prices_yfinance(ticker: str, period: str = "max") -> pd.DataFrame:
+def download_prices_yfinance(ticker: str, period: str = "max", start: Optional[str] = None,
+                             allow_empty: bool = False) -> pd.DataFrame:
     import yfinance as yf
 
-    # Download ALL available data
+    # Download ALL available data (or only from `start` when topping up a cache)
+    span = {"start": start} if start else {"period": period}
     df = yf.download(
         ticker,
-        period=period,
         interval="1d",
         auto_adjust=False,
         progress=False,
         threads=False,
+        **span,
     )
 
     if df is None or df.empty:
+        if allow_empty:
+            return pd.DataFrame()
         raise RuntimeError("yfinance returned no data.")
 
     # Handle MultiIndex columns
@@ -76,18 +99,10 @@ def download_prices_yfinance(ticker: str, period: str = "max") -> pd.DataFrame:
     if "Close" not in df.columns:
         raise RuntimeError("No Close column found.")
 
-    # Filter to yesterday in US Eastern Time
-    try:
-        from zoneinfo import ZoneInfo
-        us_eastern = ZoneInfo('America/New_York')
-        now_eastern = datetime.now(us_eastern)
-    except:
-        import pytz
-        us_eastern = pytz.timezone('America/New_York')
-        now_eastern = datetime.now(us_eastern)
-    
-    yesterday_eastern = (now_eastern - timedelta(days=1)).date()
-    df = df[df.index.date <= yesterday_eastern]
+    # Keep completed NYSE sessions only (today's bar is dropped until the close,
+    # including 1:00 PM early closes; holidays and weekends carry no bar)
+    cutoff = get_calendar().last_completed_session()
+    df = df[df.index.date <= cutoff]
     
     return df
 
@@ -140,6 +155,215 @@ def calc_probs(pairs: List[Tuple[str, str]], all_states: List[str]) -> pd.DataFr
     return pd.DataFrame(rows).set_index("state")
 
 
+def candle_mask(df: pd.DataFrame) -> np.ndarray:
+    """Rows that count as a candle: Open and Close present and not a doji"""
+    opens = df['Open'].to_numpy(dtype=float)
+    closes = df['Close'].to_numpy(dtype=float)
+    return ~(np.isnan(opens) | np.isnan(closes)) & (closes != opens)
+
+
+def encode_candles(df: pd.DataFrame) -> np.ndarray:
+    """Encode candle colors as a uint8 array (0=U green, 1=D red), dojis and NaN rows dropped
+
+    The bit values follow the ordering of generate_all_states(), so an order-k
+    state code built from these bits is also the row index of that state.
+    """
+    keep = candle_mask(df)
+    opens = df['Open'].to_numpy(dtype=float)[keep]
+    closes = df['Close'].to_numpy(dtype=float)[keep]
+    return (closes < opens).astype(np.uint8)
+
+
+def state_codes(bits: np.ndarray, order: int) -> np.ndarray:
+    """Rolling integer code of the `order` candles before each transition
+
+    codes[i] encodes bits[i:i+order] with the oldest candle in the highest bit,
+    i.e. the state that precedes bits[i+order].
+    """
+    n = len(bits) - order
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    
+    codes = np.zeros(n, dtype=np.int64)
+    for j in range(order):
+        codes <<= 1
+        codes |= bits[j:j + n]
+    return codes
+
+
+def count_states(bits: np.ndarray, order: int) -> np.ndarray:
+    """Count next-candle U/D for every state with a single bincount
+
+    Returns an int64 array of shape (2**order, 2): column 0 = U, column 1 = D.
+    """
+    codes = state_codes(bits, order)
+    nexts = bits[order:].astype(np.int64)
+    counts = np.bincount((codes << 1) | nexts, minlength=2 ** (order + 1))
+    return counts.reshape(2 ** order, 2)
+
+
+@dataclass
+class StateTable:
+    """Sparse count table: only observed states, as sorted codes with U/D counts
+
+    codes is a sorted int64 array of state codes and counts an int64 array of
+    shape (len(codes), 2) with column 0 = U and column 1 = D. Memory grows with
+    the number of observed states, not with 2**order.
+    """
+    order: int
+    codes: np.ndarray
+    counts: np.ndarray
+    
+    @classmethod
+    def from_dense(cls, counts: np.ndarray, order: int) -> "StateTable":
+        observed = np.flatnonzero(counts.sum(axis=1))
+        return cls(order, observed.astype(np.int64), counts[observed])
+    
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, nexts: np.ndarray, order: int,
+                   weights: Optional[np.ndarray] = None) -> "StateTable":
+        """Group (state code, next bit) observations, optionally pre-counted"""
+        keys = (codes.astype(np.int64) << 1) | nexts.astype(np.int64)
+        if len(keys) == 0:
+            return cls(order, np.zeros(0, dtype=np.int64), np.zeros((0, 2), dtype=np.int64))
+        
+        # One sort groups equal (state, next) keys; states come out sorted too
+        if weights is None:
+            keys = np.sort(keys)
+        else:
+            idx = np.argsort(keys, kind="stable")
+            keys, weights = keys[idx], weights[idx]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        if weights is None:
+            key_counts = np.diff(np.r_[starts, len(keys)])
+        else:
+            key_counts = np.add.reduceat(weights, starts)
+        
+        key_states = keys[starts] >> 1
+        first = np.r_[True, key_states[1:] != key_states[:-1]]
+        counts = np.zeros((int(first.sum()), 2), dtype=np.int64)
+        counts[np.cumsum(first) - 1, keys[starts] & 1] = key_counts
+        return cls(order, key_states[first], counts)
+    
+    @property
+    def n_states(self) -> int:
+        return len(self.codes)
+    
+    @property
+    def n_transitions(self) -> int:
+        return int(self.counts.sum())
+    
+    def lookup(self, code: int) -> Tuple[int, int]:
+        """(U count, D count) for one state code, (0, 0) if never observed"""
+        i = int(np.searchsorted(self.codes, code))
+        if i < len(self.codes) and self.codes[i] == code:
+            return int(self.counts[i, 0]), int(self.counts[i, 1])
+        return 0, 0
+    
+    def row(self, code: int) -> Dict[str, float]:
+        """Same fields as a calc_probs() row for one state code"""
+        n_u, n_d = self.lookup(code)
+        n = n_u + n_d
+        return {"n": n, "P(U)": n_u / n if n else 0.0, "P(D)": n_d / n if n else 0.0}
+    
+    def marginalize(self, order: int) -> "StateTable":
+        """Table for a lower order, keeping only the most recent `order` candles"""
+        codes = self.codes & ((1 << order) - 1)
+        if order <= DENSE_MAX_ORDER:
+            dense = np.stack([np.bincount(codes, weights=self.counts[:, j], minlength=2 ** order)
+                              for j in range(2)], axis=1)
+            return StateTable.from_dense(dense.astype(np.int64), order)
+        
+        nexts = np.tile([0, 1], len(codes))
+        return StateTable.from_codes(np.repeat(codes, 2), nexts, order, self.counts.ravel())
+    
+    def add(self, code: int, next_bit: int) -> "StateTable":
+        """Table with one extra (state, next candle) observation"""
+        i = int(np.searchsorted(self.codes, code))
+        if i < len(self.codes) and self.codes[i] == code:
+            counts = self.counts.copy()
+            counts[i, next_bit] += 1
+            return StateTable(self.order, self.codes, counts)
+        
+        row = np.zeros((1, 2), dtype=np.int64)
+        row[0, next_bit] = 1
+        return StateTable(self.order, np.insert(self.codes, i, code),
+                          np.insert(self.counts, i, row, axis=0))
+    
+    def to_frame(self) -> pd.DataFrame:
+        """P(U)/P(D) table of the observed states, ordered like calc_probs()"""
+        all_states = [decode_state(int(c), self.order) for c in self.codes]
+        return probs_from_counts(self.counts, all_states)
+    
+    def to_dense(self) -> np.ndarray:
+        """Full (2**order, 2) count array; only build this for small orders"""
+        dense = np.zeros((2 ** self.order, 2), dtype=np.int64)
+        dense[self.codes] = self.counts
+        return dense
+    
+    def top(self, n: int) -> pd.DataFrame:
+        """The n most frequently observed states"""
+        totals = self.counts.sum(axis=1)
+        keep = np.argsort(-totals, kind="stable")[:n]
+        return StateTable(self.order, self.codes[keep], self.counts[keep]).to_frame()
+
+
+def count_states_sparse(bits: np.ndarray, order: int) -> StateTable:
+    """Count observed states only; dense bincount when 2**order is small"""
+    if order <= DENSE_MAX_ORDER:
+        return StateTable.from_dense(count_states(bits, order), order)
+    
+    return StateTable.from_codes(state_codes(bits, order), bits[order:], order)
+
+
+def count_all_orders(bits: np.ndarray, max_order: int) -> Dict[int, StateTable]:
+    """Count tables for every order 1..max_order from one encoding pass
+
+    Only the max_order table is counted directly. Each lower order k is the
+    order k+1 table marginalized over its oldest bit, plus the single
+    transition at t = k that the longer states cannot see.
+    """
+    tables = {max_order: count_states_sparse(bits, max_order)}
+    
+    for order in range(max_order - 1, 0, -1):
+        table = tables[order + 1].marginalize(order)
+        
+        # Transition too early in history to have an order+1 state
+        if len(bits) > order:
+            table = table.add(last_state_code(bits[:order], order), int(bits[order]))
+        
+        tables[order] = table
+    
+    return tables
+
+
+def probs_from_counts(counts: np.ndarray, all_states: List[str]) -> pd.DataFrame:
+    """Build the same P(U)/P(D) table as calc_probs() from a count_states() array"""
+    n = counts.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pu = np.where(n > 0, counts[:, 0] / n, 0.0)
+        pdown = np.where(n > 0, counts[:, 1] / n, 0.0)
+    
+    probs = pd.DataFrame({"state": all_states, "n": n, "P(U)": pu, "P(D)": pdown})
+    return probs.set_index("state")
+
+
+def decode_state(code: int, order: int) -> str:
+    """Turn an integer state code back into its U/D string"""
+    return "".join("D" if (code >> (order - 1 - j)) & 1 else "U" for j in range(order))
+
+
+def last_state_code(bits: np.ndarray, order: int) -> Optional[int]:
+    """Integer code of the last N candle colors"""
+    if len(bits) < order:
+        return None
+    
+    code = 0
+    for b in bits[len(bits) - order:]:
+        code = (code << 1) | int(b)
+    return code
+
+
 def last_state(df: pd.DataFrame, order: int) -> Optional[str]:
     """Get last N candle colors"""
     opens = df['Open'].astype(float)
@@ -166,113 +390,150 @@ def last_state(df: pd.DataFrame, order: int) -> Optional[str]:
     return "".join(candles[-order:])
 
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Candle Direction Markov: Predicts GREEN (bullish) or RED (bearish) candles",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog="""
-How it works:
-  Learns patterns: "After GREEN-RED-GREEN, what color is next candle?"
-  Uses market data (yfinance) to train on real candle colors
-  
-Why show both order=3 and order=5?
-  If both agree on GREEN → STRONG BUY signal (use 5x leverage)
-  If both agree on RED → STRONG SELL signal (use 5x leverage)  
-  If they disagree → DON'T TRADE (market uncertain)
-        """
-    )
-    ap.add_argument("ticker", nargs="?", help="Stock ticker")
-    args = ap.parse_args()
-    
-    ticker = args.ticker or input("Enter stock ticker: ").strip().upper()
-    
-    print(f"\nDownloading ALL available data for {ticker}...")
-    df = download_prices_yfinance(ticker, period="max")
-    
-    # Show data range
-    first_date = df.index[0].date() if hasattr(df.index[0], 'date') else df.index[0]
-    last_date = df.index[-1].date() if hasattr(df.index[-1], 'date') else df.index[-1]
-    years = (last_date - first_date).days / 365.25
+def predict_direction(row: Dict[str, float], threshold: float = SIGNAL_THRESHOLD) -> Dict:
+    """GREEN/RED when P(U)/P(D) reaches the threshold, NEUTRAL otherwise, NO DATA if unseen"""
+    if row['n'] <= 0:
+        return {'direction': 'NO DATA', 'confidence': 0, 'sample': 0}
+    
+    if row['P(U)'] >= threshold:
+        prediction = "GREEN"
+        confidence = row['P(U)']
+    elif row['P(D)'] >= threshold:
+        prediction = "RED"
+        confidence = row['P(D)']
+    else:
+        prediction = "NEUTRAL"
+        confidence = max(row['P(U)'], row['P(D)'])
     
-    print(f"Data range: {first_date} to {last_date} ({years:.1f} years, {len(df)} trading days)")
+    return {'direction': prediction, 'confidence': confidence, 'sample': int(row['n'])}
+
+
+def combine_signals(pred3: Dict, pred5: Dict) -> str:
+    """STRONG if both orders agree on a color, WEAK if either is NEUTRAL, else CONFLICTING"""
+    d3, d5 = pred3['direction'], pred5['direction']
+    
+    if 'NO DATA' in (d3, d5):
+        return "NO DATA"
+    if d3 == d5 and d3 != 'NEUTRAL':
+        return "STRONG"
+    if 'NEUTRAL' in (d3, d5):
+        return "WEAK"
+    return "CONFLICTING"
+
+
+def scan_ticker(ticker: str, orders: Tuple[int, ...] = VERDICT_ORDERS, cache_dir: Optional[str] = None,
+                offline: bool = False, no_cache: bool = False) -> Dict:
+    """Load, encode, count and compute the order-3/order-5 verdict for one ticker
+
+    Orders 3 and 5 are always counted, whatever `orders` asks for; no_cache
+    downloads the full history instead of going through the price cache.
+    """
+    orders = sorted(set(orders) | set(VERDICT_ORDERS))
+    if no_cache:
+        df = download_prices_yfinance(ticker, period="max")
+    else:
+        df = load_prices(ticker, cache_dir=cache_dir, offline=offline)
+    bits = encode_candles(df)
+    tables = count_all_orders(bits, max(orders))
     
-    # Debug: Show last 6 candles (enough for order=5)
-    n_show = min(6, len(df))
-    print("\n" + "="*70)
-    print(f"DEBUG: Last {n_show} candles")
-    print("="*70)
+    result = {
+        'ticker': ticker,
+        'last_date': str(df.index[-1].date()) if len(df) else None,
+        'candles': int(len(bits)),
+    }
     
+    predictions = {}
+    for order in orders:
+        code = last_state_code(bits, order)
+        row = tables[order].row(code) if code is not None else {'n': 0, 'P(U)': 0.0, 'P(D)': 0.0}
+        predictions[order] = predict_direction(row)
+        result[f'order{order}_direction'] = predictions[order]['direction']
+        result[f'order{order}_confidence'] = predictions[order]['confidence']
+        result[f'order{order}_n'] = predictions[order]['sample']
+    
+    pred3, pred5 = predictions[3], predictions[5]
+    result['signal'] = combine_signals(pred3, pred5)
+    result['direction'] = pred3['direction'] if result['signal'] == "STRONG" else None
+    result['confidence'] = (pred3['confidence'] + pred5['confidence']) / 2
+    return result
+
+
+def _pool_job(job: Tuple[Callable, str, Dict]) -> Tuple[Any, Optional[str]]:
+    """Process-pool worker: (result, None), or (None, error message) instead of a crash"""
+    fn, ticker, kwargs = job
     try:
-        from zoneinfo import ZoneInfo
-        us_eastern = ZoneInfo('America/New_York')
-        now_eastern = datetime.now(us_eastern)
-    except:
-        import pytz
-        us_eastern = pytz.timezone('America/New_York')
-        now_eastern = datetime.now(us_eastern)
-    
-    yesterday_eastern = (now_eastern - timedelta(days=1)).date()
-    local_time = datetime.now()
-    
-    print(f"\nTimezone info:")
-    print(f"  Your local time: {local_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"  US Eastern time: {now_eastern.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    print(f"  Data cutoff: {yesterday_eastern} (yesterday US Eastern)")
-    
-    if len(df) >= n_show:
-        last_n = df.tail(n_show)
-        actual_last = df.index[-1].date() if hasattr(df.index[-1], 'date') else df.index[-1]
-        print(f"  Actual last date in data: {actual_last}")
-        
-        print(f"\nStock data (last {n_show} candles):")
-        for idx, row in last_n.iterrows():
-            date_str = idx.strftime('%Y-%m-%d') if hasattr(idx, 'strftime') else str(idx)
-            h = row.get('High', 'N/A')
-            l = row.get('Low', 'N/A')
-            o = row.get('Open', 'N/A')
-            c = row.get('Close', 'N/A')
-            print(f"  {date_str}: O={o:.2f}, H={h:.2f}, L={l:.2f}, C={c:.2f}")
-        
-        print("\nCandle colors (GREEN=bullish, RED=bearish):")
-        for idx, row in last_n.iterrows():
-            date_str = idx.strftime('%Y-%m-%d') if hasattr(idx, 'strftime') else str(idx)
-            o = row.get('Open', 0)
-            c = row.get('Close', 0)
-            
-            if c > o:
-                color = "GREEN (U)"
-                pct = ((c / o) - 1) * 100
-            elif c < o:
-                color = "RED (D)"
-                pct = ((c / o) - 1) * 100
-            else:
-                color = "DOJI (=)"
-                pct = 0
-            
-            print(f"  {date_str}: O={o:.2f} → C={c:.2f} ({pct:+.2f}%) = {color}")
-    
-    print("="*70 + "\n")
-    
-    # Calculate for BOTH order=3 and order=5
-    results = {}
-    
-    for order in [3, 5]:
-        all_states = generate_all_states(order)
-        pairs = build_pairs(df, order)
-        
-        if len(pairs) < 10:
-            print(f"[warn] Order={order}: Only {len(pairs)} transitions. Skipping.")
-            continue
-        
-        probs = calc_probs(pairs, all_states)
-        curr_state = last_state(df, order)
-        
-        results[order] = {
-            'probs': probs,
-            'state': curr_state,
-            'pairs': len(pairs)
-        }
+        return fn(ticker, **kwargs), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def scan_pool(fn: Callable, tickers: List[str], workers: Optional[int] = None,
+              on_error: Optional[Callable[[str, str], Any]] = None, **kwargs) -> List:
+    """fn(ticker, **kwargs) for every ticker across a process pool, in ticker order
+
+    fn must be a module-level function (it is pickled to the workers). A
+    ticker whose call raises becomes on_error(ticker, "Type: message").
+    Jobs go out in chunks of about a quarter of each worker's share.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = [(fn, t, kwargs) for t in tickers]
+    chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        outputs = list(pool.map(_pool_job, jobs, chunksize=chunksize))
+    return [value if error is None else on_error(ticker, error)
+            for ticker, (value, error) in zip(tickers, outputs)]
+
+
+def read_universe(path: str) -> List[str]:
+    """Tickers from a file: one per line or comma-separated, '#' starts a comment"""
+    tickers = []
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0]
+            tickers.extend(t.strip().upper() for t in line.split(",") if t.strip())
+    return list(dict.fromkeys(tickers))
+
+
+def scan_universe(tickers: List[str], workers: Optional[int] = None, **kwargs) -> pd.DataFrame:
+    """Scan many tickers across a process pool, ranked STRONG > WEAK > CONFLICTING"""
+    rows = scan_pool(scan_ticker, tickers, workers,
+                     lambda ticker, error: {'ticker': ticker, 'signal': 'ERROR', 'error': error}, **kwargs)
+    
+    results = pd.DataFrame(rows)
+    for col in results.columns:
+        if col == 'candles' or col.endswith('_n'):
+            results[col] = results[col].astype("Int64")
+    if 'confidence' not in results:
+        results['confidence'] = np.nan
+    results['_rank'] = results['signal'].map(SIGNAL_RANK).fillna(len(SIGNAL_RANK))
+    results = results.sort_values(['_rank', 'confidence'], ascending=[True, False], kind="stable")
+    return results.drop(columns='_rank').reset_index(drop=True)
+
+
+def print_scan(results: pd.DataFrame) -> None:
+    """Ranked signal table for a universe scan"""
+    print(f"{'='*70}")
+    print(f"UNIVERSE SCAN ({len(results)} tickers)")
+    print(f"{'='*70}\n")
     
+    for signal in SIGNAL_RANK:
+        n = int((results['signal'] == signal).sum())
+        if n:
+            print(f"  {signal:<12} {n}")
+    print()
+    
+    cols = [c for c in ['ticker', 'signal', 'direction', 'confidence', 'order3_direction',
+                        'order3_n', 'order5_direction', 'order5_n', 'last_date', 'error']
+            if c in results]
+    display = results[cols].astype(object)
+    display['confidence'] = display['confidence'].map(lambda x: f"{x:.1%}" if pd.notna(x) else "")
+    print(display.fillna("").to_string(index=False))
+    print()
+
+
+def render_results(results: Dict, orders: List[int]) -> None:
+    """Print the probability table of every order and the final order-3/order-5 signal"""
     # Display results for both orders
     print(f"{'='*70}")
     print(f"FULL PROBABILITY TABLES")
@@ -280,18 +541,20 @@ Why show both order=3 and order=5?
     
     predictions = {}
     
-    for order in [3, 5]:
+    for order in orders:
         if order not in results:
             continue
         
+        table = results[order]['table']
         probs = results[order]['probs']
+        curr_code = results[order]['code']
         curr_state = results[order]['state']
         n_pairs = results[order]['pairs']
         
         print(f"{'='*70}")
         print(f"ORDER={order} (last {order} candles)")
         print(f"{'='*70}")
-        print(f"Total states: {2**order} | States with data: {len(probs[probs['n'] > 0])} | Transitions: {n_pairs}")
+        print(f"Total states: {2**order} | States with data: {table.n_states} | Transitions: {n_pairs}")
         print(f"Current state: {curr_state}\n")
         
         # Show full probability table (only states with data)
@@ -306,8 +569,8 @@ Why show both order=3 and order=5?
         print()
         
         # Extract prediction for current state
-        if curr_state and curr_state in probs.index:
-            row = probs.loc[curr_state]
+        if curr_code is not None:
+            row = table.row(curr_code)
             if row['n'] > 0:
                 print(f"CURRENT STATE DETAIL:")
                 print(f"  State: {curr_state}")
@@ -315,22 +578,9 @@ Why show both order=3 and order=5?
                 print(f"  P(RED next):   {row['P(D)']:.2%}")
                 print(f"  Sample size:   {int(row['n'])} times")
                 
-                # Determine prediction
-                if row['P(U)'] >= 0.55:
-                    prediction = "GREEN"
-                    confidence = row['P(U)']
-                elif row['P(D)'] >= 0.55:
-                    prediction = "RED"
-                    confidence = row['P(D)']
-                else:
-                    prediction = "NEUTRAL"
-                    confidence = max(row['P(U)'], row['P(D)'])
-                
-                predictions[order] = {
-                    'direction': prediction,
-                    'confidence': confidence,
-                    'sample': int(row['n'])
-                }
+                predictions[order] = predict_direction(row)
+                prediction = predictions[order]['direction']
+                confidence = predictions[order]['confidence']
                 
                 print(f"  → Prediction: {prediction} candle ({confidence:.1%})")
             else:
@@ -357,7 +607,9 @@ Why show both order=3 and order=5?
         print()
         
         # Check agreement
-        if pred3['direction'] == pred5['direction'] and pred3['direction'] != 'NEUTRAL':
+        signal = combine_signals(pred3, pred5)
+        
+        if signal == "STRONG":
             avg_confidence = (pred3['confidence'] + pred5['confidence']) / 2
             print(f"✓✓✓ STRONG {pred3['direction']} CANDLE SIGNAL ✓✓✓")
             print(f"Both models AGREE → High confidence!")
@@ -368,7 +620,10 @@ Why show both order=3 and order=5?
             else:
                 print(f"\n→ Trade: SHORT/SELL with 5x leverage")
                 
-        elif pred3['direction'] == 'NEUTRAL' or pred5['direction'] == 'NEUTRAL':
+        elif signal == "NO DATA":
+            print(f"⚠ NO SIGNAL - At least one model has never seen its current state")
+            print(f"Recommendation: DO NOT TRADE")
+        elif signal == "WEAK":
             print(f"⚠ WEAK SIGNAL - At least one model shows NEUTRAL")
             print(f"Recommendation: Avoid trading or use small position")
         else:
@@ -377,7 +632,172 @@ Why show both order=3 and order=5?
             print(f"Recommendation: DO NOT TRADE - Market direction unclear")
     else:
         print("Insufficient data for comparison")
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Candle Direction Markov: Predicts GREEN (bullish) or RED (bearish) candles",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+How it works:
+  Learns patterns: "After GREEN-RED-GREEN, what color is next candle?"
+  Uses market data (yfinance) to train on real candle colors
+  
+Why show both order=3 and order=5?
+  If both agree on GREEN → STRONG BUY signal (use 5x leverage)
+  If both agree on RED → STRONG SELL signal (use 5x leverage)  
+  If they disagree → DON'T TRADE (market uncertain)
+        """
+    )
+    ap.add_argument("ticker", nargs="*", help="Stock ticker (several tickers run a universe scan)")
+    ap.add_argument("--universe", default=None,
+                    help="File of tickers to scan (one per line or comma-separated)")
+    ap.add_argument("--workers", type=int, default=None,
+                    help="Processes for a universe scan (default: CPU count)")
+    ap.add_argument("--out", default="scan_results.csv",
+                    help="Universe scan results file, .csv or .json (default: scan_results.csv)")
+    ap.add_argument("--orders", default="3,5",
+                    help="Comma-separated Markov orders to show; 3 and 5 are always added "
+                         "for the signal (default: 3,5)")
+    ap.add_argument("--top", type=int, default=None,
+                    help="Only print the N most frequent states per order")
+    ap.add_argument("--cache-dir", default=None,
+                    help="Price cache directory (default: $MARKOV_CACHE_DIR or ~/.cache/learn_simple_markov)")
+    ap.add_argument("--offline", action="store_true",
+                    help="Use cached prices only, never touch the network")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="Always download the full history, bypassing the cache")
+    add_profile_args(ap)
+    args = ap.parse_args()
+    
+    orders = sorted({int(o) for o in args.orders.split(",") if o.strip()})
+    if not orders or orders[0] < 1:
+        ap.error("--orders must be positive integers")
+    orders = sorted(set(orders) | set(VERDICT_ORDERS))
+    if args.no_cache and args.offline:
+        ap.error("--no-cache and --offline are mutually exclusive")
+    
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    
+    prof = profiler_from_args(args)
+    
+    if len(tickers) > 1:
+        with prof.stage("scan", rows=len(tickers)):
+            results = scan_universe(tickers, workers=args.workers, orders=tuple(orders),
+                                    cache_dir=args.cache_dir, offline=args.offline, no_cache=args.no_cache)
+        with prof.stage("rendering"):
+            print_scan(results)
+        if args.out.endswith(".json"):
+            results.to_json(args.out, orient="records", indent=2)
+        else:
+            results.to_csv(args.out, index=False)
+        print(f"Results written to {args.out}")
+        finish_profile(prof, args)
+        return 0
+    
+    ticker = tickers[0] if tickers else input("Enter stock ticker: ").strip().upper()
+    
+    if args.no_cache:
+        print(f"\nDownloading ALL available data for {ticker}...")
+        with prof.stage("download"):
+            df = download_prices_yfinance(ticker, period="max")
+    else:
+        print(f"\nLoading data for {ticker} ({'cache only' if args.offline else 'cache + new bars'})...")
+        with prof.stage("download"):
+            df = load_prices(ticker, cache_dir=args.cache_dir, offline=args.offline)
+    prof.rows("download", len(df))
+    
+    # Show data range
+    first_date = df.index[0].date() if hasattr(df.index[0], 'date') else df.index[0]
+    last_date = df.index[-1].date() if hasattr(df.index[-1], 'date') else df.index[-1]
+    years = (last_date - first_date).days / 365.25
+    
+    print(f"Data range: {first_date} to {last_date} ({years:.1f} years, {len(df)} trading days)")
+    
+    # Debug: Show last 6 candles (enough for order=5)
+    n_show = min(6, len(df))
+    print("\n" + "="*70)
+    print(f"DEBUG: Last {n_show} candles")
+    print("="*70)
+    
+    now_eastern = pd.Timestamp.now(tz=NY_TZ)
+    cutoff = get_calendar().last_completed_session()
+    local_time = datetime.now()
+    
+    print(f"\nTimezone info:")
+    print(f"  Your local time: {local_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"  US Eastern time: {now_eastern.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+    print(f"  Data cutoff: {cutoff} (last completed NYSE session)")
+    
+    if len(df) >= n_show:
+        last_n = df.tail(n_show)
+        actual_last = df.index[-1].date() if hasattr(df.index[-1], 'date') else df.index[-1]
+        print(f"  Actual last date in data: {actual_last}")
+        
+        print(f"\nStock data (last {n_show} candles):")
+        for idx, row in last_n.iterrows():
+            date_str = idx.strftime('%Y-%m-%d') if hasattr(idx, 'strftime') else str(idx)
+            h = row.get('High', 'N/A')
+            l = row.get('Low', 'N/A')
+            o = row.get('Open', 'N/A')
+            c = row.get('Close', 'N/A')
+            print(f"  {date_str}: O={o:.2f}, H={h:.2f}, L={l:.2f}, C={c:.2f}")
+        
+        print("\nCandle colors (GREEN=bullish, RED=bearish):")
+        for idx, row in last_n.iterrows():
+            date_str = idx.strftime('%Y-%m-%d') if hasattr(idx, 'strftime') else str(idx)
+            o = row.get('Open', 0)
+            c = row.get('Close', 0)
+            
+            if c > o:
+                color = "GREEN (U)"
+                pct = ((c / o) - 1) * 100
+            elif c < o:
+                color = "RED (D)"
+                pct = ((c / o) - 1) * 100
+            else:
+                color = "DOJI (=)"
+                pct = 0
+            
+            print(f"  {date_str}: O={o:.2f} → C={c:.2f} ({pct:+.2f}%) = {color}")
+    
+    print("="*70 + "\n")
+    
+    # Calculate every requested order (order=3 and order=5 by default) from one pass
+    results = {}
+    
+    with prof.stage("encoding", rows=len(df)):
+        bits = encode_candles(df)
+    
+    with prof.stage("counting", rows=len(bits)):
+        tables = count_all_orders(bits, orders[-1])
+    
+    for order in orders:
+        n_pairs = max(len(bits) - order, 0)
+        
+        if n_pairs < 10:
+            print(f"[warn] Order={order}: Only {n_pairs} transitions. Skipping.")
+            continue
+        
+        table = tables[order]
+        probs = table.to_frame() if args.top is None else table.top(args.top)
+        curr_code = last_state_code(bits, order)
+        curr_state = decode_state(curr_code, order) if curr_code is not None else None
+        
+        results[order] = {
+            'table': table,
+            'code': curr_code,
+            'probs': probs,
+            'state': curr_state,
+            'pairs': n_pairs
+        }
+    
+    with prof.stage("rendering"):
+        render_results(results, orders)
     
+    finish_profile(prof, args)
     return 0
 
 
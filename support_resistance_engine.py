@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Swing-point support/resistance levels in O(N)
+
+Python port of support_resistant.py (a Pine script). A bar is a swing low
+when its low is strictly below the lows of the swing_length bars on either
+side (a swing high likewise with highs); the swing lows of the last
+`lookback` bars below the close are supports, the swing highs above it
+resistances, and levels closer than 1% of the close are merged.
+
+Pine compares every bar with each neighbour, de-duplicates against every
+kept level (O(n^2)) and bubble-sorts the result. Here the neighbour test is
+two sliding-window minima / maxima (van Herk / Gil-Werman: block prefix and
+suffix extrema, O(N) for any window), and de-duplication bisects a sorted
+list of the kept levels. Swings are found once for the whole history, so
+every bar gets its nearest support and resistance, not just the last one:
+
+    levels = support_resistance(df)         # clustered levels around the last close
+    nearest = rolling_levels(df)            # nearest support / resistance for every bar
+
+    python support_resistance_engine.py NVDA AAPL
+    python support_resistance_engine.py --universe universe.txt --offline
+    python support_resistance_engine.py --universe universe.txt --index-dir levels/
+
+LevelIndex keeps a ticker's levels sorted and persisted, updated one bar
+at a time, for nearest-level queries in microseconds.
+"""
+
+import argparse
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from price_cache import decode_timestamp, encode_timestamp, load_prices
+
+
+LOOKBACK = 100
+SWING_LENGTH = 5
+MAX_LEVELS = 5
+TOLERANCE = 0.01          # levels within this fraction of the close are one level
+INDEX_VERSION = 1
+
+
+class SRLevels(NamedTuple):
+    close: float
+    supports: List[float]       # nearest first (highest below the close)
+    resistances: List[float]    # nearest first (lowest above the close)
+    n_swing_lows: int           # swing points found in the lookback, before filtering
+    n_swing_highs: int
+
+
+def _sliding(x: np.ndarray, window: int, ufunc, fill: float) -> np.ndarray:
+    """ufunc-reduce of every `window`-long slice of x (len(x) - window + 1 values)
+
+    van Herk / Gil-Werman: cut x into blocks of `window`; every window spans
+    the tail of one block and the head of the next, so it is the combination
+    of a suffix extreme and a prefix extreme. Three passes, independent of
+    the window length.
+    """
+    n = len(x)
+    if n < window:
+        return np.empty(0)
+    m = -(-n // window)
+    blocks = np.full(m * window, fill)
+    blocks[:n] = x
+    blocks = blocks.reshape(m, window)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    start = np.arange(n - window + 1)
+    return ufunc(suffix[start], prefix[start + window - 1])
+
+
+def sliding_max(x: np.ndarray, window: int) -> np.ndarray:
+    """Maximum of every window-long slice, O(N)"""
+    return _sliding(np.asarray(x, dtype=float), window, np.maximum, -np.inf)
+
+
+def sliding_min(x: np.ndarray, window: int) -> np.ndarray:
+    """Minimum of every window-long slice, O(N)"""
+    return _sliding(np.asarray(x, dtype=float), window, np.minimum, np.inf)
+
+
+def swing_points(high: np.ndarray, low: np.ndarray, swing_length: int = SWING_LENGTH):
+    """Boolean swing-high and swing-low masks, True at the swing bar itself
+
+    A swing is only known swing_length bars later. Neighbours past either
+    end of the history do not disqualify a bar (Pine compares against na).
+    """
+    s = swing_length
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    n = len(high)
+    hi_pad = np.r_[np.full(s, -np.inf), high, np.full(s, -np.inf)]
+    lo_pad = np.r_[np.full(s, np.inf), low, np.full(s, np.inf)]
+    hi_win, lo_win = sliding_max(hi_pad, s), sliding_min(lo_pad, s)
+    # window j covers padded [j, j + s): left neighbours of bar c start at c, right ones at c + s + 1
+    c = np.arange(n)
+    swing_high = (high > hi_win[c]) & (high > hi_win[c + s + 1])
+    swing_low = (low < lo_win[c]) & (low < lo_win[c + s + 1])
+    return swing_high, swing_low
+
+
+def cluster_levels(levels: np.ndarray, tolerance: float) -> np.ndarray:
+    """Drop levels closer than `tolerance` (a price distance) to one already kept, in input order
+
+    Like Pine, levels are taken in scan order (the most recent swing
+    first) and each is compared with every kept level, so a cluster is
+    represented by its most recent swing, not necessarily its nearest. The
+    kept levels are also held sorted, so each check is a bisection against
+    the two neighbours instead of Pine's scan over all of them.
+    """
+    kept, ordered = [], []
+    for level in levels:
+        i = bisect_left(ordered, level)
+        if (i < len(ordered) and ordered[i] - level < tolerance) or (i and level - ordered[i - 1] < tolerance):
+            continue
+        ordered.insert(i, level)
+        kept.append(level)
+    return np.array(kept)
+
+
+def _window_swings(df: pd.DataFrame, end: int, lookback: int, swing_length: int):
+    frame = df.rename(columns=str.lower)
+    high, low = frame["high"].to_numpy(dtype=float), frame["low"].to_numpy(dtype=float)
+    swing_high, swing_low = swing_points(high, low, swing_length)
+    # Pine scans bars swing_length..lookback back from the last bar, never the first bar
+    window = slice(max(end - lookback, 1), max(end - swing_length + 1, 1))
+    return high[window][swing_high[window]], low[window][swing_low[window]]
+
+
+def support_resistance(df: pd.DataFrame, lookback: int = LOOKBACK, swing_length: int = SWING_LENGTH,
+                       max_levels: int = MAX_LEVELS, tolerance: float = TOLERANCE) -> SRLevels:
+    """Clustered supports below and resistances above the last close, max_levels each side"""
+    n = len(df)
+    close = float(df.rename(columns=str.lower)["close"].iloc[-1])
+    highs, lows = _window_swings(df, n - 1, lookback, swing_length)
+
+    # Scan order is newest swing first; after merging, nearest first
+    tol = close * tolerance
+    supports = -np.sort(-cluster_levels(lows[::-1][lows[::-1] < close], tol))
+    resistances = np.sort(cluster_levels(highs[::-1][highs[::-1] > close], tol))
+    return SRLevels(close, supports[:max_levels].tolist(), resistances[:max_levels].tolist(),
+                    int(len(lows)), int(len(highs)))
+
+
+def _nearest_in_windows(levels: np.ndarray, positions: np.ndarray, close: np.ndarray,
+                        lookback: int, swing_length: int, below: bool) -> np.ndarray:
+    """Per bar t, the nearest level on one side of close[t] among swings at [t - lookback, t - swing_length]
+
+    Swing positions are sorted, so each bar's candidates are one
+    searchsorted range; the ranges are laid out as an (N, widest range)
+    matrix and reduced at once.
+    """
+    n = len(close)
+    t = np.arange(n)
+    first = np.searchsorted(positions, np.maximum(t - lookback, 1))
+    last = np.searchsorted(positions, t - swing_length, side="right")
+    width = int((last - first).max(initial=0))
+    if width == 0:
+        return np.full(n, np.nan)
+
+    # (N, width) candidate matrix, padded where a window has fewer swings
+    idx = first[:, None] + np.arange(width)
+    valid = idx < last[:, None]
+    cand = levels[np.minimum(idx, len(levels) - 1)]
+    if below:
+        cand = np.where(valid & (cand < close[:, None]), cand, -np.inf)
+        best = cand.max(axis=1)
+        return np.where(np.isfinite(best), best, np.nan)
+    cand = np.where(valid & (cand > close[:, None]), cand, np.inf)
+    best = cand.min(axis=1)
+    return np.where(np.isfinite(best), best, np.nan)
+
+
+def rolling_levels(df: pd.DataFrame, lookback: int = LOOKBACK,
+                   swing_length: int = SWING_LENGTH) -> pd.DataFrame:
+    """Nearest support / resistance and their distance % for every bar, without look-ahead
+
+    Bar t only uses swings confirmed by bar t (at most t - swing_length).
+    These are the nearest swings before merging: where Pine drops the
+    nearest swing as a duplicate of a more recent one within tolerance,
+    support_resistance() reports that one instead, at most
+    tolerance * close further away.
+    """
+    frame = df.rename(columns=str.lower)
+    high, low = frame["high"].to_numpy(dtype=float), frame["low"].to_numpy(dtype=float)
+    close = frame["close"].to_numpy(dtype=float)
+    swing_high, swing_low = swing_points(high, low, swing_length)
+
+    hi_pos, lo_pos = np.flatnonzero(swing_high), np.flatnonzero(swing_low)
+    support = _nearest_in_windows(low[lo_pos], lo_pos, close, lookback, swing_length, below=True)
+    resistance = _nearest_in_windows(high[hi_pos], hi_pos, close, lookback, swing_length, below=False)
+    return pd.DataFrame({
+        "close": close,
+        "support": support,
+        "resistance": resistance,
+        "support_dist_pct": (close - support) / close * 100,
+        "resistance_dist_pct": (resistance - close) / close * 100,
+        "swing_high": swing_high,
+        "swing_low": swing_low,
+    }, index=df.index)
+
+
+class NearestLevels(NamedTuple):
+    support: np.ndarray             # nearest level below each price (NaN if none)
+    resistance: np.ndarray          # nearest level above each price (NaN if none)
+    support_dist_pct: np.ndarray
+    resistance_dist_pct: np.ndarray
+
+
+def _bar_times(frame: pd.DataFrame) -> Optional[pd.DatetimeIndex]:
+    """Bar timestamps from a datetime column (eToro frames) or a DatetimeIndex, else None"""
+    if "datetime" in frame:
+        return pd.DatetimeIndex(pd.to_datetime(frame["datetime"]))
+    if isinstance(frame.index, pd.DatetimeIndex):
+        return frame.index
+    return None
+
+
+class LevelIndex:
+    """Per-ticker swing levels as sorted arrays, for fast nearest-level queries
+
+    Swing lows (supports) and swing highs (resistances) of the last
+    `lookback` bars are kept sorted by price, so the nearest level on either
+    side of any number of prices is one searchsorted per side. update()
+    takes one new bar: it confirms whether the bar swing_length back is a
+    swing (O(swing_length)), inserts it at its sorted position and drops
+    levels older than the lookback, so the index never has to be rebuilt.
+    Levels and bar position match rolling_levels() at the last bar.
+
+    Saved as a small versioned .npz per ticker:
+
+        index = LevelIndex.from_frame(df)
+        index.update(high, low, date)
+        index.query([101.5, 99.0])          # NearestLevels for a batch of prices
+        index.save(level_index_path("NVDA", "levels/"))
+    """
+
+    def __init__(self, lookback: int = LOOKBACK, swing_length: int = SWING_LENGTH):
+        self.lookback = lookback
+        self.swing_length = swing_length
+        self.support = np.empty(0)                          # sorted ascending
+        self.support_pos = np.empty(0, dtype=np.int64)      # bar index of each support
+        self.resistance = np.empty(0)
+        self.resistance_pos = np.empty(0, dtype=np.int64)
+        self.n_bars = 0
+        self.last_date = None
+        # last 2 * swing_length + 1 bars, enough to test the bar swing_length back
+        self._highs = deque(maxlen=2 * swing_length + 1)
+        self._lows = deque(maxlen=2 * swing_length + 1)
+        self._padded = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lookback: int = LOOKBACK,
+                   swing_length: int = SWING_LENGTH) -> "LevelIndex":
+        """Index of the swings confirmed by the last bar of df, in one vectorized pass"""
+        index = cls(lookback, swing_length)
+        frame = df.rename(columns=str.lower)
+        high, low = frame["high"].to_numpy(dtype=float), frame["low"].to_numpy(dtype=float)
+        swing_high, swing_low = swing_points(high, low, swing_length)
+
+        n = len(high)
+        window = np.zeros(n, dtype=bool)
+        window[max(n - 1 - lookback, 1):max(n - swing_length, 1)] = True
+        pos = np.flatnonzero(swing_low & window)
+        order = np.argsort(low[pos], kind="stable")
+        index.support, index.support_pos = low[pos][order], pos[order]
+        pos = np.flatnonzero(swing_high & window)
+        order = np.argsort(high[pos], kind="stable")
+        index.resistance, index.resistance_pos = high[pos][order], pos[order]
+
+        index.n_bars = n
+        index._highs.extend(high[-(2 * swing_length + 1):].tolist())
+        index._lows.extend(low[-(2 * swing_length + 1):].tolist())
+        stamps = _bar_times(frame)
+        if n and stamps is not None:
+            index.last_date = stamps[-1]
+        return index
+
+    @staticmethod
+    def _insert(levels, positions, value, pos):
+        i = np.searchsorted(levels, value)
+        return np.insert(levels, i, value), np.insert(positions, i, pos)
+
+    def update(self, high: float, low: float, date=None) -> None:
+        """Add one bar: confirm the swing swing_length bars back and expire old levels"""
+        s = self.swing_length
+        self._highs.append(float(high))
+        self._lows.append(float(low))
+        self.n_bars += 1
+        if date is not None:
+            self.last_date = pd.Timestamp(date)
+
+        center = self.n_bars - 1 - s
+        if center >= 1:
+            highs, lows = list(self._highs), list(self._lows)
+            c = len(highs) - 1 - s                          # center inside the buffer
+            h, l = highs[c], lows[c]
+            neighbours = highs[max(c - s, 0):c] + highs[c + 1:]
+            if all(h > x for x in neighbours):
+                self.resistance, self.resistance_pos = self._insert(self.resistance, self.resistance_pos,
+                                                                    h, center)
+            neighbours = lows[max(c - s, 0):c] + lows[c + 1:]
+            if all(l < x for x in neighbours):
+                self.support, self.support_pos = self._insert(self.support, self.support_pos, l, center)
+
+        self._padded = None
+        oldest = self.n_bars - 1 - self.lookback
+        if len(self.support_pos) and self.support_pos.min() < oldest:
+            keep = self.support_pos >= oldest
+            self.support, self.support_pos = self.support[keep], self.support_pos[keep]
+        if len(self.resistance_pos) and self.resistance_pos.min() < oldest:
+            keep = self.resistance_pos >= oldest
+            self.resistance, self.resistance_pos = self.resistance[keep], self.resistance_pos[keep]
+
+    def update_frame(self, df: pd.DataFrame) -> int:
+        """Feed the bars of df after last_date through update(); returns bars added
+
+        Bar times come from a datetime column or a DatetimeIndex, as in
+        from_frame(); without either every bar of df is new.
+        """
+        frame = df.rename(columns=str.lower)
+        stamps = _bar_times(frame)
+        if stamps is None:
+            stamps = [None] * len(frame)
+        elif self.last_date is not None:
+            new = np.asarray(stamps > self.last_date)
+            frame, stamps = frame[new], stamps[new]
+        for date, high, low in zip(stamps, frame["high"].to_numpy(dtype=float),
+                                   frame["low"].to_numpy(dtype=float)):
+            self.update(high, low, date)
+        return len(frame)
+
+    def _lookup(self):
+        """Supports with a NaN in front and resistances with a NaN behind, rebuilt after changes
+
+        searchsorted positions index these directly: no support below the
+        lowest level and no resistance above the highest come out as NaN.
+        """
+        if self._padded is None:
+            self._padded = (np.r_[np.nan, self.support], np.r_[self.resistance, np.nan])
+        return self._padded
+
+    def query(self, prices) -> NearestLevels:
+        """Nearest support strictly below and resistance strictly above every price"""
+        prices = np.asarray(prices, dtype=float).reshape(-1)
+        support_at, resistance_at = self._lookup()
+        support = support_at[self.support.searchsorted(prices)]
+        resistance = resistance_at[self.resistance.searchsorted(prices, side="right")]
+        return NearestLevels(support, resistance, (prices - support) / prices * 100,
+                             (resistance - prices) / prices * 100)
+
+    def save(self, path) -> None:
+        last_date, last_tz = encode_timestamp(self.last_date)
+        np.savez(
+            path,
+            version=np.int64(INDEX_VERSION),
+            lookback=np.int64(self.lookback),
+            swing_length=np.int64(self.swing_length),
+            n_bars=np.int64(self.n_bars),
+            support=self.support, support_pos=self.support_pos,
+            resistance=self.resistance, resistance_pos=self.resistance_pos,
+            highs=np.array(self._highs), lows=np.array(self._lows),
+            last_date=last_date,
+            last_tz=last_tz,
+        )
+
+    @classmethod
+    def load(cls, path) -> "LevelIndex":
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version != INDEX_VERSION:
+                raise ValueError(f"Unsupported level index version {version} in {path}")
+
+            index = cls(int(data["lookback"]), int(data["swing_length"]))
+            index.n_bars = int(data["n_bars"])
+            index.support, index.support_pos = data["support"].copy(), data["support_pos"].copy()
+            index.resistance, index.resistance_pos = data["resistance"].copy(), data["resistance_pos"].copy()
+            index._highs.extend(data["highs"].tolist())
+            index._lows.extend(data["lows"].tolist())
+            index.last_date = decode_timestamp(data["last_date"][()], data["last_tz"])
+        return index
+
+
+def level_index_path(ticker: str, index_dir) -> Path:
+    return Path(index_dir) / f"{ticker.upper()}.npz"
+
+
+def update_level_index(ticker: str, index_dir, lookback: int = LOOKBACK, swing_length: int = SWING_LENGTH,
+                       cache_dir: Optional[str] = None, offline: bool = False) -> Tuple[LevelIndex, float]:
+    """Load (or build) a ticker's level index, feed it the new bars and save it back
+
+    Returns the index and the last close. A saved index built with another
+    lookback or swing length is rebuilt from the full history.
+    """
+    path = level_index_path(ticker, index_dir)
+    df = load_prices(ticker, cache_dir=cache_dir, offline=offline)
+    index = LevelIndex.load(path) if path.exists() else None
+    if index is not None and (index.lookback, index.swing_length) == (lookback, swing_length):
+        added = index.update_frame(df)
+    else:
+        index = LevelIndex.from_frame(df, lookback, swing_length)
+        added = len(df)
+    if added:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index.save(path)
+    return index, float(df.rename(columns=str.lower)["close"].iloc[-1])
+
+
+def levels_summary(ticker: str, df: pd.DataFrame, **kwargs) -> dict:
+    """Nearest levels of one ticker as a flat row"""
+    sr = support_resistance(df, **kwargs)
+    support = sr.supports[0] if sr.supports else np.nan
+    resistance = sr.resistances[0] if sr.resistances else np.nan
+    return {
+        "ticker": ticker,
+        "close": sr.close,
+        "support": support,
+        "support_dist_pct": (sr.close - support) / sr.close * 100,
+        "resistance": resistance,
+        "resistance_dist_pct": (resistance - sr.close) / sr.close * 100,
+        "found": f"{sr.n_swing_lows}S/{sr.n_swing_highs}R",
+        "last_date": df.index[-1].date() if hasattr(df.index[-1], "date") else df.index[-1],
+    }
+
+
+def main():
+    from super_markov import read_universe
+
+    ap = argparse.ArgumentParser(description="Swing-point support / resistance for one or many tickers")
+    ap.add_argument("ticker", nargs="*", help="Tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--lookback", type=int, default=LOOKBACK, help=f"Lookback bars (default: {LOOKBACK})")
+    ap.add_argument("--swing-length", type=int, default=SWING_LENGTH,
+                    help=f"Bars on each side of a swing (default: {SWING_LENGTH})")
+    ap.add_argument("--max-levels", type=int, default=MAX_LEVELS,
+                    help=f"Levels shown each side (default: {MAX_LEVELS})")
+    ap.add_argument("--index-dir", default=None,
+                    help="Keep a persistent level index per ticker here and answer from it")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only")
+    args = ap.parse_args()
+
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    if not tickers:
+        ap.error("give at least one ticker or --universe")
+
+    rows = []
+    for ticker in tickers:
+        try:
+            if args.index_dir:
+                index, close = update_level_index(ticker, args.index_dir, args.lookback, args.swing_length,
+                                                  cache_dir=args.cache_dir, offline=args.offline)
+                q = index.query(close)
+                rows.append({"ticker": ticker, "close": close,
+                             "support": q.support[0], "support_dist_pct": q.support_dist_pct[0],
+                             "resistance": q.resistance[0], "resistance_dist_pct": q.resistance_dist_pct[0],
+                             "found": f"{len(index.support)}S/{len(index.resistance)}R",
+                             "last_date": index.last_date.date() if index.last_date is not None else None})
+                continue
+            df = load_prices(ticker, cache_dir=args.cache_dir, offline=args.offline)
+            rows.append(levels_summary(ticker, df, lookback=args.lookback, swing_length=args.swing_length,
+                                       max_levels=args.max_levels))
+        except Exception as e:
+            rows.append({"ticker": ticker, "error": f"{type(e).__name__}: {e}"})
+
+    results = pd.DataFrame(rows)
+    if len(tickers) == 1 and "error" not in results and not args.index_dir:
+        sr = support_resistance(df, args.lookback, args.swing_length, args.max_levels)
+        print(f"Resistances: {', '.join(f'{x:.2f}' for x in sr.resistances) or 'None'}")
+        print(f"Supports:    {', '.join(f'{x:.2f}' for x in sr.supports) or 'None'}\n")
+    for col in ("close", "support", "resistance"):
+        if col in results:
+            results[col] = results[col].map(lambda x: f"{x:.2f}" if pd.notna(x) else "None")
+    for col in ("support_dist_pct", "resistance_dist_pct"):
+        if col in results:
+            results[col] = results[col].map(lambda x: f"{x:.1f}%" if pd.notna(x) else "")
+    print(results.astype(object).fillna("").to_string(index=False))
+    return 0 if "error" not in results else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
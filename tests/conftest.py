@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# The modules live at the repository root, next to this directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_markov import synthetic_ohlcv  # noqa: E402
+
+
+def _daily_bars(n=2500, seed=0):
+    """Business-day bars ending yesterday, so limit-based fetches walking back from now find them"""
+    bars = synthetic_ohlcv(n, seed=seed)
+    end = pd.Timestamp.now(tz="UTC").normalize() - pd.Timedelta(days=1)
+    bars.index = pd.bdate_range(end=end, periods=n, tz="UTC", name="datetime")
+    return bars
+
+
+@pytest.fixture
+def daily_bars():
+    """daily_bars(n, seed): synthetic eToro-style daily history ending yesterday"""
+    return _daily_bars
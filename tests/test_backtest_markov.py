@@ -0,0 +1,76 @@
+"""Walk-forward backtest against a naive refit on every prefix"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_markov import ORDERS, backtest_frame, summarize
+from bench_markov import synthetic_ohlcv
+from super_markov import build_pairs, calc_probs, last_state, predict_direction
+
+SIGN = {"GREEN": 1, "RED": -1}
+
+
+def prefix_refit(df, order):
+    """Direction and confidence before each row from build_pairs/calc_probs on df.iloc[:t]"""
+    direction, confidence = [], []
+    for t in range(len(df)):
+        prefix = df.iloc[:t]
+        state = last_state(prefix, order)
+        if state is None:
+            direction.append(0)
+            confidence.append(0.0)
+            continue
+        row = calc_probs(build_pairs(prefix, order), [state]).loc[state]
+        pred = predict_direction(row)
+        direction.append(SIGN.get(pred["direction"], 0))
+        confidence.append(max(row["P(U)"], row["P(D)"]))
+    return np.array(direction), np.array(confidence)
+
+
+def test_matches_prefix_refit():
+    df = synthetic_ohlcv(300, seed=3)
+    rng = np.random.default_rng(3)
+    dojis = rng.choice(len(df), 30, replace=False)
+    df.iloc[dojis, df.columns.get_loc("Close")] = df["Open"].iloc[dojis]
+    df.iloc[7, df.columns.get_loc("Close")] = np.nan
+
+    record = backtest_frame(df)
+    for order in ORDERS:
+        direction, confidence = prefix_refit(df, order)
+        np.testing.assert_array_equal(record[f"order{order}"], direction)
+        np.testing.assert_allclose(record[f"order{order}_conf"], confidence)
+
+    signal = np.where((record["order3"] == record["order5"]) & (record["order3"] != 0), record["order3"], 0)
+    np.testing.assert_array_equal(record["signal"], signal)
+
+
+@pytest.fixture
+def greens_then_doji():
+    """Ten green candles, then a doji"""
+    opens = np.full(11, 100.0)
+    closes = np.r_[np.full(10, 101.0), 100.0]
+    index = pd.bdate_range("2024-01-01", periods=11, name="Date")
+    return pd.DataFrame({"Open": opens, "High": 102.0, "Low": 99.0, "Close": closes, "Volume": 1e6},
+                        index=index)
+
+
+def test_doji_trade_is_a_zero_return_miss(greens_then_doji):
+    record = backtest_frame(greens_then_doji, leverage=5.0)
+    last = record.iloc[-1]
+    assert last["signal"] == 1 and last["doji"] and last["actual"] == 0
+    assert not last["hit"]
+    assert last["trade_return"] == 0.0
+    assert record["equity"].iloc[-1] == pytest.approx(1.05 ** 4)
+
+
+def test_summarize_coverage(greens_then_doji):
+    stats = summarize(backtest_frame(greens_then_doji))
+    # Rows 5-10 are eligible (5 colored candles closed); order 5 has its
+    # first sample from row 6, so rows 6-10 trade, the doji among them
+    assert stats["candles"] == 11
+    assert stats["trades"] == 5
+    assert stats["longs"] == 5 and stats["shorts"] == 0
+    assert stats["doji_trades"] == 1
+    assert stats["coverage"] == pytest.approx(5 / 6)
+    assert stats["hit_rate"] == pytest.approx(4 / 5)
@@ -0,0 +1,99 @@
+"""confluence(): each component's vote and the star/score/action mapping, on built bars"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from confluence_scanner import CONFLICTING, STARS, confluence
+from volume_profile_engine import BELOW_VA, LOWER_VA, UPPER_VA
+
+PARAMS = dict(lookback=10, resolution=10, sr_lookback=30, swing_length=2)
+
+
+def frame(bars):
+    o, h, l, c, v = map(np.array, zip(*bars))
+    index = pd.bdate_range("2024-01-01", periods=len(bars), name="Date")
+    return pd.DataFrame({"Open": o, "High": h, "Low": l, "Close": c, "Volume": v}, index=index)
+
+
+def green(lo, hi, volume=1e6):
+    """Full-body up bar: all of its volume is buying"""
+    return lo, hi, lo, hi, volume
+
+
+def red(lo, hi, volume=1e6):
+    """Full-body down bar: all of its volume is selling"""
+    return hi, hi, lo, lo, volume
+
+
+def doji(lo, hi, volume=1e6):
+    """Open == close: volume split evenly, no imbalance"""
+    mid = (lo + hi) / 2
+    return mid, hi, lo, mid, volume
+
+
+def history(swing_low):
+    """Sideways bars around 101-104 with one swing low"""
+    return [doji(101, 104)] * 6 + [doji(100, 103), doji(swing_low, 102), doji(100, 103)] + [doji(101, 104)] * 6
+
+
+# The profile window: value area about 100.8-102.9, every bin bought or sold outright
+BUY_TAIL = [green(100, 104) if i % 2 else green(101, 103) for i in range(11)]
+SELL_TAIL = [red(100, 104) if i % 2 else red(101, 103) for i in range(11)]
+# Balanced window with its volume piled at 102-104: value area 102.0-103.6, POC 102.2
+BALANCED_TAIL = [doji(100, 104) if i % 3 == 0 else doji(102, 104, 3e6) for i in range(11)]
+
+
+def test_all_three_agree():
+    result = confluence(frame(history(98) + BUY_TAIL + [green(98.6, 99, 1e4)]), **PARAMS)
+    assert result["vp_position"] == BELOW_VA
+    assert result["sr"] == "support" and result["support"] == 98
+    assert result["orderflow"] == "BUY IMB"
+    assert (result["direction"], result["stars"], result["score"], result["action"]) == \
+        ("BUY", STARS[3], 100, "BUY STRONG")
+
+
+def test_lower_va_votes_near_val_only():
+    bars = history(90) + BALANCED_TAIL + [doji(101.9, 102.3, 1e4)]      # close 102.1, VAL 102.0
+
+    near = confluence(frame(bars), near_pct=1.0, **PARAMS)
+    assert near["vp_position"] == LOWER_VA
+    assert (near["sr"], near["orderflow"]) == ("", "Balanced")
+    assert (near["direction"], near["stars"], near["score"], near["action"]) == ("BUY", STARS[1], 30, "WAIT")
+
+    far = confluence(frame(bars), near_pct=0.05, **PARAMS)
+    assert (far["direction"], far["stars"], far["score"], far["action"]) == (None, STARS[0], 0, "SKIP")
+
+
+def test_order_flow_alone_and_poc_confirmation():
+    bars = history(90) + BUY_TAIL + [green(102.3, 102.4, 1e4)]           # close 102.4, POC 102.2
+
+    alone = confluence(frame(bars), near_pct=0.1, **PARAMS)
+    assert alone["vp_position"] == UPPER_VA and alone["orderflow"] == "BUY IMB"
+    assert (alone["direction"], alone["stars"], alone["score"], alone["action"]) == ("BUY", STARS[1], 30, "WAIT")
+
+    # Within reach of the POC, the profile confirms the order-flow side
+    confirmed = confluence(frame(bars), near_pct=0.5, **PARAMS)
+    assert confirmed["sr"] == ""
+    assert (confirmed["stars"], confirmed["score"], confirmed["action"]) == (STARS[2], 60, "BUY Medium")
+
+
+def test_support_and_profile_without_order_flow():
+    result = confluence(frame(history(99.5) + BALANCED_TAIL + [doji(100.8, 101.6, 1e4)]), **PARAMS)
+    assert result["sr"] == "support" and result["vp_position"] == BELOW_VA
+    assert result["orderflow"] == "Balanced"
+    assert (result["stars"], result["score"], result["action"]) == (STARS[2], 70, "BUY Medium")
+
+
+def test_conflicting_votes_skip():
+    result = confluence(frame(history(98) + SELL_TAIL + [red(98.6, 99, 1e4)]), **PARAMS)
+    assert result["sr"] == "support" and result["vp_position"] == BELOW_VA
+    assert result["orderflow"] == "SELL IMB"
+    assert result["conflicting"]
+    assert (result["direction"], result["stars"], result["score"], result["action"]) == \
+        (None, CONFLICTING, 0, "SKIP")
+
+
+def test_needs_two_windows():
+    with pytest.raises(ValueError, match="Need"):
+        confluence(frame(BUY_TAIL), **PARAMS)
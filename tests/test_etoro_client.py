@@ -0,0 +1,130 @@
+"""EtoroClient against MockMarketServer: retries, instrument cache, windowed history, parsing"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+import requests
+
+from etoro_client import EtoroClient, InstrumentCache, parse_candles
+from mock_market_server import MockMarketServer, candles_payload
+
+
+@pytest.fixture
+def bars(daily_bars):
+    return daily_bars()
+
+
+@pytest.fixture
+def server(bars):
+    with MockMarketServer() as server:
+        server.add_instrument("NVDA", 1137, bars)
+        yield server
+
+
+def make_client(server, tmp_path, **kwargs):
+    kwargs.setdefault("backoff", 0)
+    return EtoroClient("key", "user", base_url=server.base_url,
+                       instrument_cache=tmp_path / "instruments.json", **kwargs)
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_transient_errors(server, tmp_path, status):
+    with make_client(server, tmp_path, retries=3) as client:
+        server.fail_next(2, status=status)
+        df = client.get_candles(1137, "1d", 10)
+    assert len(df) == 10
+    assert server.count("candles") == 3
+
+
+def test_gives_up_after_retries(server, tmp_path):
+    with make_client(server, tmp_path, retries=2) as client:
+        server.fail_next(5, status=503)
+        with pytest.raises(requests.HTTPError):
+            client.get_candles(1137, "1d", 10)
+    assert server.count("candles") == 3
+
+
+def test_search_once_per_symbol_across_clients(server, tmp_path):
+    with make_client(server, tmp_path) as first:
+        assert first.get_instrument_id("NVDA") == 1137
+        assert first.get_instrument_id("nvda") == 1137
+    with make_client(server, tmp_path) as second:
+        assert second.get_instrument_id("NVDA") == 1137
+    assert server.count("search") == 1
+    assert InstrumentCache(tmp_path / "instruments.json").get("NVDA")["id"] == 1137
+
+
+def _put_symbols(path, prefix):
+    cache = InstrumentCache(path)
+    for i in range(20):
+        cache.put(f"{prefix}{i}", i, prefix)
+
+
+def test_instrument_cache_merges_concurrent_writers(tmp_path):
+    path = tmp_path / "instruments.json"
+    first, second = InstrumentCache(path), InstrumentCache(path)
+    first.put("NVDA", 1137, "NVIDIA")
+    second.put("AAPL", 1001, "Apple")
+    assert {"NVDA", "AAPL"} <= set(json.loads(path.read_text()))
+
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(_put_symbols, [path] * 4, "ABCD"))
+    assert len(InstrumentCache(path)) == 2 + 4 * 20
+
+
+def test_unknown_symbol_raises(server, tmp_path):
+    with make_client(server, tmp_path) as client:
+        with pytest.raises(Exception, match="Instrument not found"):
+            client.get_instrument_id("NOPE")
+
+
+def test_history_range_stitches_windows(server, tmp_path, bars):
+    with make_client(server, tmp_path) as client:
+        df = client.get_history("NVDA", "1d", start=bars.index[0], end=bars.index[-1] + pd.Timedelta(days=1))
+    assert server.count("candles") > 1
+    assert not df["datetime"].duplicated().any()
+    assert df["datetime"].is_monotonic_increasing
+    pd.testing.assert_index_equal(pd.DatetimeIndex(df["datetime"]), bars.index, check_names=False)
+    assert (df["close"].to_numpy() == bars["Close"].to_numpy()).all()
+
+
+def test_history_limit_returns_latest_bars(server, tmp_path, bars):
+    with make_client(server, tmp_path) as client:
+        df = client.get_ohlc_data("NVDA", "1d", limit=2200, workers=2)
+    assert len(df) == 2200
+    assert not df["datetime"].duplicated().any()
+    pd.testing.assert_index_equal(pd.DatetimeIndex(df["datetime"]), bars.index[-2200:], check_names=False)
+
+
+def test_history_limit_warns_when_the_server_ignores_the_window(server, tmp_path):
+    server.ignore_bounds = True
+    with make_client(server, tmp_path) as client:
+        with pytest.warns(RuntimeWarning, match="ignored the fromDate/toDate"):
+            df = client.get_ohlc_data("NVDA", "1d", limit=2200, workers=2)
+    assert len(df) == 1000
+
+
+def test_short_history_does_not_warn(tmp_path, recwarn, daily_bars):
+    with MockMarketServer() as server:
+        server.add_instrument("NVDA", 1137, daily_bars(1500))
+        with make_client(server, tmp_path) as client:
+            df = client.get_ohlc_data("NVDA", "1d", limit=2200, workers=2)
+    assert len(df) == 1500
+    assert not [w for w in recwarn if issubclass(w.category, RuntimeWarning)]
+
+
+def test_parse_candles(bars):
+    df = parse_candles(candles_payload(1137, bars.head(5)))
+    assert list(df.columns) == ["datetime", "open", "high", "low", "close", "volume"]
+    assert str(df["datetime"].dt.tz) == "UTC"
+    pd.testing.assert_index_equal(pd.DatetimeIndex(df["datetime"]), bars.index[:5], check_names=False)
+    expected = bars.head(5).rename(columns=str.lower).to_numpy()
+    assert (df[["open", "high", "low", "close", "volume"]].to_numpy() == expected).all()
+
+
+def test_parse_candles_empty():
+    df = parse_candles({})
+    assert df.empty
+    assert list(df.columns) == ["datetime", "open", "high", "low", "close", "volume"]
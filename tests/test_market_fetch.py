@@ -0,0 +1,70 @@
+"""fetch_frames against MockMarketServer: the rate limit caps HTTP requests, not tickers"""
+
+import threading
+
+import pytest
+
+from etoro_client import EtoroClient, TokenBucket
+from market_fetch import fetch_all
+from mock_market_server import MockMarketServer
+
+
+class CountingBucket(TokenBucket):
+    """TokenBucket recording how many tokens were taken"""
+
+    def __init__(self, rate, burst=None):
+        super().__init__(rate, burst)
+        self.taken = 0
+        self._count_lock = threading.Lock()
+
+    def _reserve(self):
+        with self._count_lock:
+            self.taken += 1
+        return super()._reserve()
+
+
+@pytest.fixture
+def server(daily_bars):
+    bars = daily_bars(2500)
+    with MockMarketServer() as server:
+        for i, ticker in enumerate(["AAA", "BBB"]):
+            server.add_instrument(ticker, 100 + i, bars)
+        yield server
+
+
+def make_client(server, tmp_path, **kwargs):
+    return EtoroClient("key", "user", base_url=server.base_url, backoff=0,
+                       instrument_cache=tmp_path / "instruments.json", **kwargs)
+
+
+def test_rate_limits_every_request(server, tmp_path):
+    limiter = CountingBucket(1000)
+    results = fetch_all(["AAA", "BBB"], source="etoro", client=make_client(server, tmp_path), limit=2200,
+                        limiter=limiter)
+
+    assert all(err is None and len(df) == 2200 for _, df, err in results.values())
+    # A search plus several history windows per ticker, each taking a token
+    assert len(server.requests) > 2 * 2
+    assert limiter.taken == len(server.requests)
+
+
+def test_each_call_uses_its_own_bucket(server, tmp_path):
+    client = make_client(server, tmp_path)
+    first, second = CountingBucket(1000), CountingBucket(500)
+    fetch_all(["AAA", "BBB"], source="etoro", client=client, limit=2200, limiter=first)
+    n_first = len(server.requests)
+    results = fetch_all(["AAA", "BBB"], source="etoro", client=client, limit=2200, limiter=second)
+
+    assert all(err is None and len(df) == 2200 for _, df, err in results.values())
+    assert client.limiter is None
+    assert first.taken == n_first
+    assert second.taken == len(server.requests) - n_first > 0
+
+
+def test_client_limit_still_applies(server, tmp_path):
+    own, call = CountingBucket(1000), CountingBucket(1000)
+    client = make_client(server, tmp_path, limiter=own)
+    fetch_all(["AAA"], source="etoro", client=client, limiter=call)
+
+    assert client.limiter is own
+    assert own.taken == call.taken == len(server.requests)
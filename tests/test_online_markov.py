@@ -0,0 +1,71 @@
+"""OnlineMarkovModel: incremental updates and the saved .npz state"""
+
+import numpy as np
+import pytest
+
+from bench_markov import synthetic_ohlcv
+from online_markov import OnlineMarkovModel, update_ticker
+from price_cache import write_cache
+
+
+@pytest.fixture
+def bars():
+    df = synthetic_ohlcv(400, seed=5)
+    df.index = df.index.tz_localize("UTC").tz_convert("America/New_York")
+    return df
+
+
+def assert_same_model(a, b):
+    assert a.orders == b.orders
+    for k in a.orders:
+        np.testing.assert_array_equal(a.counts[k], b.counts[k])
+    assert (a.context, a.n_candles, a.last_date) == (b.context, b.n_candles, b.last_date)
+
+
+def test_bar_by_bar_then_frame_equals_one_frame(bars):
+    whole = OnlineMarkovModel((2, 3, 5))
+    whole.update_frame(bars)
+
+    model = OnlineMarkovModel((2, 3, 5))
+    for date, row in bars.iloc[:150].iterrows():
+        model.update(row["Open"], row["Close"], date)
+    assert model.update_frame(bars) == len(bars) - 150
+    assert_same_model(model, whole)
+
+
+def test_save_load_round_trip(bars, tmp_path):
+    model = OnlineMarkovModel((3, 5, 7))
+    model.update_frame(bars)
+    model.save(tmp_path / "m.npz")
+
+    loaded = OnlineMarkovModel.load(tmp_path / "m.npz")
+    assert_same_model(loaded, model)
+    assert str(loaded.last_date.tz) == "America/New_York"
+
+
+def test_version_mismatch_raises(bars, tmp_path):
+    model = OnlineMarkovModel()
+    model.update_frame(bars)
+    model.save(tmp_path / "m.npz")
+    with np.load(tmp_path / "m.npz") as data:
+        arrays = dict(data)
+    arrays["version"] = np.int64(99)
+    np.savez(tmp_path / "m.npz", **arrays)
+
+    with pytest.raises(ValueError, match="version"):
+        OnlineMarkovModel.load(tmp_path / "m.npz")
+
+
+def test_verdict_orders_always_counted(bars):
+    model = OnlineMarkovModel((2, 4))
+    assert model.orders == (2, 3, 4, 5)
+    model.update_frame(bars)
+    assert model.signal() in {"STRONG", "WEAK", "CONFLICTING", "NO DATA"}
+
+
+def test_update_ticker_rejects_orders_the_saved_model_lacks(bars, tmp_path):
+    write_cache("NVDA", bars, tmp_path / "cache")
+    update_ticker("NVDA", tmp_path / "models", cache_dir=tmp_path / "cache", offline=True)
+    with pytest.raises(ValueError, match="orders"):
+        update_ticker("NVDA", tmp_path / "models", orders=(3, 5, 7), cache_dir=tmp_path / "cache",
+                      offline=True)
@@ -0,0 +1,80 @@
+"""orderflow_engine against a line-by-line port of the Pine order-flow profile"""
+
+import numpy as np
+import pytest
+
+from bench_markov import synthetic_ohlcv
+from orderflow_engine import orderflow_bins, rolling_orderflow
+from volume_profile_engine import MINTICK
+
+
+def pine_orderflow(df, t, plook=10, res=20, threshold=0.75, mintick=MINTICK):
+    """Buy bins, sell bins and the BUY/SELL IMB text flags of bar t, as orderflow_tradingview.py computes them"""
+    o, h, l, c, v = (df[col].to_numpy() for col in ("Open", "High", "Low", "Close", "Volume"))
+    highs, lows, buys, sells = [], [], [], []
+    for i in range(plook + 1):
+        k = t - i
+        highs.append(h[k])
+        lows.append(l[k])
+        total_range = h[k] - l[k]
+        if c[k] == o[k]:
+            buys.append(v[k] * 0.5)
+            sells.append(v[k] * 0.5)
+        elif c[k] > o[k]:
+            body_ratio = (c[k] - o[k]) / total_range if total_range > 0 else 1.0
+            buys.append(v[k] * max(body_ratio, 0.6))
+            sells.append(v[k] * (1 - max(body_ratio, 0.6)))
+        else:
+            body_ratio = (o[k] - c[k]) / total_range if total_range > 0 else 1.0
+            sells.append(v[k] * max(body_ratio, 0.6))
+            buys.append(v[k] * (1 - max(body_ratio, 0.6)))
+
+    minn, maxx = min(lows), max(highs)
+    step = (maxx - minn) / res if maxx - minn != 0.0 else mintick
+
+    def binned(weights):
+        out = []
+        for i in range(res):
+            bottom, top = minn + i * step, minn + (i + 1) * step
+            total = 0.0
+            for lo, hi, w in zip(lows, highs, weights):
+                overlap = max(0, min(hi, top) - max(lo, bottom))
+                if overlap > 0:
+                    total += w * (overlap / (hi - lo) if hi - lo > 0 else 0.0)
+            out.append(total)
+        return out
+
+    bin_buy, bin_sell = binned(buys), binned(sells)
+    buy_streak = sell_streak = 0
+    buy_text = sell_text = False
+    for buy_vol, sell_vol in zip(bin_buy, bin_sell):
+        total = buy_vol + sell_vol
+        buy_streak = buy_streak + 1 if total > 0 and buy_vol / total >= threshold else 0
+        sell_streak = sell_streak + 1 if total > 0 and sell_vol / total >= threshold else 0
+        buy_text |= buy_streak >= 3
+        sell_text |= sell_streak >= 3
+    return bin_buy, bin_sell, buy_text, sell_text
+
+
+@pytest.mark.parametrize("seed,plook,res", [(0, 10, 20), (1, 10, 20), (2, 25, 12)])
+def test_rolling_orderflow_matches_pine(seed, plook, res):
+    df = synthetic_ohlcv(400, seed=seed)
+    flow = orderflow_bins(df, plook, res)
+    out = rolling_orderflow(df, plook, res)
+
+    assert np.isnan(flow.buy[:plook]).all()
+    prev = (False, False)
+    for t in range(plook, len(df)):
+        bin_buy, bin_sell, buy_text, sell_text = pine_orderflow(df, t, plook, res)
+        assert np.allclose(flow.buy[t], bin_buy) and np.allclose(flow.sell[t], bin_sell), t
+        row = out.iloc[t]
+        assert (row["buy_text"], row["sell_text"]) == (buy_text, sell_text), t
+        assert row["new_buy_alert"] == (buy_text and not prev[0]), t
+        assert row["new_sell_alert"] == (sell_text and not prev[1]), t
+        prev = (buy_text, sell_text)
+
+
+def test_compared_data_has_alerts():
+    # Without any alert the comparison above would not cover the alert columns
+    out = rolling_orderflow(synthetic_ohlcv(400, seed=0))
+    assert out["new_buy_alert"].any() and out["new_sell_alert"].any()
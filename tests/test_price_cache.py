@@ -0,0 +1,62 @@
+"""load_prices with FrameProvider: cold load, incremental top-up, up-to-date skip, offline mode"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_markov import synthetic_ohlcv
+from price_cache import FrameProvider, cache_path, load_prices, read_cache, write_cache
+from trading_calendar import get_calendar
+
+
+@pytest.fixture
+def bars():
+    """Daily bars on every session up to the last completed one"""
+    calendar = get_calendar()
+    dates = pd.DatetimeIndex(calendar.sessions(end=calendar.last_completed_session())["session"]).as_unit("ns")[-300:]
+    df = synthetic_ohlcv(len(dates))
+    df.index = dates.rename("Date")
+    return df
+
+
+def test_cold_load_fetches_everything(tmp_path, bars):
+    provider = FrameProvider(bars)
+    df = load_prices("NVDA", provider, cache_dir=tmp_path)
+    assert provider.calls == [("NVDA", None)]
+    pd.testing.assert_frame_equal(df, bars, check_freq=False)
+    pd.testing.assert_frame_equal(read_cache("NVDA", tmp_path), bars, check_freq=False)
+
+
+def test_top_up_fetches_only_new_bars(tmp_path, bars):
+    load_prices("NVDA", FrameProvider(bars.iloc[:-5]), cache_dir=tmp_path)
+    provider = FrameProvider(bars)
+    df = load_prices("NVDA", provider, cache_dir=tmp_path)
+
+    assert len(provider.calls) == 1
+    _, start = provider.calls[0]
+    assert start > bars.index[-6].date()
+    pd.testing.assert_frame_equal(df, bars, check_freq=False)
+
+
+def test_current_cache_skips_the_provider(tmp_path, bars):
+    load_prices("NVDA", FrameProvider(bars), cache_dir=tmp_path)
+    provider = FrameProvider(bars)
+    df = load_prices("NVDA", provider, cache_dir=tmp_path)
+    assert provider.calls == []
+    assert len(df) == len(bars)
+
+
+def test_offline_reads_the_cache_only(tmp_path, bars):
+    with pytest.raises(RuntimeError, match="offline"):
+        load_prices("NVDA", cache_dir=tmp_path, offline=True)
+    load_prices("NVDA", FrameProvider(bars.iloc[:-5]), cache_dir=tmp_path)
+    df = load_prices("NVDA", cache_dir=tmp_path, offline=True)
+    assert len(df) == len(bars) - 5
+
+
+def test_mismatched_files_are_a_miss(tmp_path, bars):
+    write_cache("NVDA", bars, tmp_path)
+    np.save(cache_path("NVDA", tmp_path) / "values.npy", bars.to_numpy()[:-1])
+    assert read_cache("NVDA", tmp_path) is None
+    np.save(cache_path("NVDA", tmp_path) / "values.npy", bars.to_numpy()[:, :3])
+    assert read_cache("NVDA", tmp_path) is None
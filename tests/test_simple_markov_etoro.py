@@ -0,0 +1,49 @@
+"""StreamingMarkovModel against the batch build_markov_model"""
+
+import numpy as np
+import pytest
+
+from bench_markov import as_etoro, synthetic_ohlcv
+from simple_markov_etoro import StreamingMarkovModel, build_markov_model, clear_model_cache
+
+
+@pytest.fixture(params=["integral", "fractional", "tenths"])
+def bars(request):
+    df = as_etoro(synthetic_ohlcv(3000, seed=7))
+    rng = np.random.default_rng(7)
+    if request.param == "fractional":
+        df["volume"] = df["volume"] * 0.37 + 0.013
+    elif request.param == "tenths":
+        # Few distinct values: many bars sit exactly on the window average
+        df["volume"] = rng.integers(1, 4, len(df)) * 0.1
+    return df
+
+
+def assert_same_stats(streamed, batch):
+    assert streamed.keys() == batch.keys()
+    for key, expected in batch.items():
+        got = streamed[key]
+        assert got["total_occurrences"] == expected["total_occurrences"], key
+        assert got["last_seen"] == expected["last_seen"], key
+        assert got["p_bullish"] == pytest.approx(expected["p_bullish"], rel=1e-9), key
+        assert got["p_bearish"] == pytest.approx(expected["p_bearish"], rel=1e-9), key
+
+
+def test_streaming_matches_batch(bars):
+    clear_model_cache()
+    batch, _, _ = build_markov_model(bars)
+
+    stream = StreamingMarkovModel()
+    for o, c, v in zip(bars["open"], bars["close"], bars["volume"]):
+        stream.update(o, c, v)
+    assert_same_stats(stream.pattern_stats(), batch)
+
+
+def test_warm_start_then_stream_matches_batch(bars):
+    clear_model_cache()
+    batch, _, _ = build_markov_model(bars)
+
+    stream = StreamingMarkovModel.from_frame(bars.iloc[:1000])
+    for o, c, v in zip(bars["open"].iloc[1000:], bars["close"].iloc[1000:], bars["volume"].iloc[1000:]):
+        stream.update(o, c, v)
+    assert_same_stats(stream.pattern_stats(), batch)
@@ -0,0 +1,15 @@
+"""scan_ticker: the order-3/order-5 verdict whatever orders are asked for"""
+
+from bench_markov import synthetic_ohlcv
+from price_cache import write_cache
+from super_markov import scan_ticker
+
+
+def test_scan_ticker_always_counts_the_verdict_orders(tmp_path):
+    write_cache("NVDA", synthetic_ohlcv(500), tmp_path)
+    result = scan_ticker("NVDA", orders=(2, 4), cache_dir=tmp_path, offline=True)
+
+    for order in (2, 3, 4, 5):
+        assert f"order{order}_direction" in result
+    assert result["signal"] in {"STRONG", "WEAK", "CONFLICTING", "NO DATA"}
+    assert result == scan_ticker("NVDA", orders=(2, 3, 4, 5), cache_dir=tmp_path, offline=True)
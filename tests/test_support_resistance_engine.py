@@ -0,0 +1,92 @@
+"""support_resistance_engine against a line-by-line port of the Pine S/R detection"""
+
+import numpy as np
+import pytest
+
+from bench_markov import as_etoro, synthetic_ohlcv
+from price_cache import write_cache
+from support_resistance_engine import LevelIndex, rolling_levels, support_resistance, update_level_index
+
+
+def pine_levels(df, t, lookback=100, swing_length=5, max_levels=5):
+    """Raw swings and the merged, sorted levels of bar t, as support_resistant.py builds them"""
+    high, low, close = (df[col].to_numpy() for col in ("High", "Low", "Close"))
+    s = swing_length
+    supports, resistances = [], []
+    for i in range(s, lookback + 1):
+        if i >= t:                                  # bar_index of the last bar is t
+            break
+        # [k] looks k bars back; bars before the history are na and never disqualify
+        is_low = not any(low[t - (i - j)] <= low[t - i] or (i + j <= t and low[t - (i + j)] <= low[t - i])
+                         for j in range(1, s + 1))
+        if is_low:
+            supports.append(low[t - i])
+        is_high = not any(high[t - (i - j)] >= high[t - i] or (i + j <= t and high[t - (i + j)] >= high[t - i])
+                          for j in range(1, s + 1))
+        if is_high:
+            resistances.append(high[t - i])
+
+    def merge(levels, side):
+        valid = []
+        for level in levels:
+            if side(level) and not any(abs(level - v) < close[t] * 0.01 for v in valid):
+                valid.append(level)
+        return valid
+
+    valid_sup = sorted(merge(supports, lambda x: x < close[t]), reverse=True)
+    valid_res = sorted(merge(resistances, lambda x: x > close[t]))
+    return supports, resistances, valid_sup[:max_levels], valid_res[:max_levels]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_levels_match_pine(seed):
+    df = synthetic_ohlcv(500, seed=seed)
+    for t in range(3, len(df), 3):
+        supports, resistances, valid_sup, valid_res = pine_levels(df, t)
+        levels = support_resistance(df.iloc[:t + 1])
+        assert (levels.n_swing_lows, levels.n_swing_highs) == (len(supports), len(resistances)), t
+        assert levels.supports == valid_sup and levels.resistances == valid_res, t
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_rolling_levels_are_nearest_swings(seed):
+    df = synthetic_ohlcv(500, seed=seed)
+    close = df["Close"].to_numpy()
+    out = rolling_levels(df)
+    index = LevelIndex.from_frame(df.iloc[:1])
+    for t in range(len(df)):
+        if t:
+            index.update(df["High"].iloc[t], df["Low"].iloc[t])
+        supports, resistances, _, _ = pine_levels(df, t)
+        support = max((x for x in supports if x < close[t]), default=np.nan)
+        resistance = min((x for x in resistances if x > close[t]), default=np.nan)
+        assert np.allclose(out[["support", "resistance"]].iloc[t], [support, resistance], equal_nan=True), t
+        nearest = index.query([close[t]])
+        assert np.allclose([nearest.support[0], nearest.resistance[0]], [support, resistance], equal_nan=True), t
+
+
+def test_index_updates_from_etoro_frames():
+    df = synthetic_ohlcv(600, seed=2)
+    df.index = df.index.tz_localize("UTC")
+    etoro = as_etoro(df)
+    full = LevelIndex.from_frame(etoro)
+
+    for frame in (etoro, df):
+        index = LevelIndex.from_frame(frame.iloc[:400])
+        assert index.update_frame(frame) == 200
+        assert index.update_frame(frame) == 0
+        assert index.last_date == full.last_date and index.n_bars == full.n_bars
+        assert np.array_equal(index.support, full.support) and np.array_equal(index.resistance, full.resistance)
+
+
+def test_update_level_index_rebuilds_on_new_parameters(tmp_path):
+    df = synthetic_ohlcv(300, seed=4)
+    write_cache("NVDA", df, tmp_path / "cache")
+    kwargs = dict(cache_dir=tmp_path / "cache", offline=True)
+
+    index, _ = update_level_index("NVDA", tmp_path / "levels", lookback=50, swing_length=3, **kwargs)
+    index, _ = update_level_index("NVDA", tmp_path / "levels", lookback=80, swing_length=4, **kwargs)
+    assert (index.lookback, index.swing_length) == (80, 4)
+    expected = LevelIndex.from_frame(df, 80, 4)
+    assert np.array_equal(index.support, expected.support) and np.array_equal(index.resistance, expected.resistance)
+    assert LevelIndex.load(tmp_path / "levels" / "NVDA.npz").lookback == 80
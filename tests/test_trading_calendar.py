@@ -0,0 +1,61 @@
+"""NYSE holidays, early closes and bar labels on known dates"""
+
+from datetime import date
+
+import pandas as pd
+
+from trading_calendar import TZ, early_closes, get_calendar, holidays
+
+
+def test_special_closure():
+    cal = get_calendar()
+    assert not cal.is_session([date(2025, 1, 9)])[0]
+    assert date(2025, 1, 9) not in holidays(2025)
+    assert cal.is_session([date(2025, 1, 8), date(2025, 1, 10)]).all()
+
+
+def test_juneteenth_from_2022():
+    assert date(2021, 6, 18) not in holidays(2021) and date(2021, 6, 19) not in holidays(2021)
+    assert date(2022, 6, 20) in holidays(2022)          # Sunday, observed Monday
+    assert date(2023, 6, 19) in holidays(2023)
+
+
+def test_saturday_new_year_not_observed():
+    assert date(2021, 12, 31) not in holidays(2021)
+    assert not any(d.month == 1 and d.day <= 3 for d in holidays(2022))
+    assert get_calendar().is_session([date(2021, 12, 31)])[0]
+    assert date(2023, 1, 2) in holidays(2023)           # Sunday, observed Monday
+
+
+def test_early_closes():
+    assert early_closes(2025) == [date(2025, 7, 3), date(2025, 11, 28), date(2025, 12, 24)]
+    assert date(2026, 7, 3) not in early_closes(2026)   # Friday: Independence Day observed instead
+    assert date(2026, 7, 3) in holidays(2026)
+
+
+def test_last_completed_session_on_an_early_close():
+    cal = get_calendar()
+    # Thanksgiving is 11-27; 11-28 closes at 13:00 New York = 18:00 UTC
+    assert cal.last_completed_session(pd.Timestamp("2025-11-28 17:00", tz="UTC")) == date(2025, 11, 26)
+    assert cal.last_completed_session(pd.Timestamp("2025-11-28 19:00", tz="UTC")) == date(2025, 11, 28)
+
+
+def test_label_bars_intraday_early_close():
+    bars = pd.DatetimeIndex(["2025-11-28 12:55", "2025-11-28 13:00", "2025-11-28 09:25"], tz=TZ)
+    labels = get_calendar().label_bars(bars, "5m", now=pd.Timestamp("2025-11-28 13:00", tz=TZ))
+    assert labels["in_session"].tolist() == [True, False, False]
+    assert labels["early_close"].tolist() == [True, False, False]
+    assert labels["complete"].tolist() == [True, False, True]
+    assert labels["session"].iloc[0] == pd.Timestamp("2025-11-28")
+    assert labels["session"].iloc[1:].isna().all()
+
+
+def test_label_bars_daily_and_weekly():
+    cal = get_calendar()
+    days = pd.DatetimeIndex(["2025-11-26", "2025-11-28"], tz="UTC")
+    labels = cal.label_bars(days, "1d", now=pd.Timestamp("2025-11-28 17:00", tz="UTC"))
+    assert labels["complete"].tolist() == [True, False]
+
+    # A weekly bar from Monday 11-24 spans the holiday and ends with the early close
+    week = cal.label_bars(pd.DatetimeIndex(["2025-11-24"]), "7d", now=pd.Timestamp("2025-11-28 18:00", tz="UTC"))
+    assert week["complete"].iloc[0] and week["in_session"].iloc[0]
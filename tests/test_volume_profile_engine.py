@@ -0,0 +1,103 @@
+"""volume_profile_engine against a line-by-line port of the Pine profile loops"""
+
+import numpy as np
+import pytest
+
+from bench_markov import synthetic_ohlcv
+from volume_profile_engine import (MINTICK, RollingVolumeProfile, ohlcv_arrays, profile_bins,
+                                   rolling_volume_profile)
+
+
+def pine_profile(high, low, volume, t, lookback=50, resolution=24, value_area_pct=70.0, mintick=MINTICK):
+    """poc, vah, val of the window ending at bar t, as volume_profile.py computes them on its last bar"""
+    max_price, min_price = high[t], low[t]
+    for i in range(1, lookback + 1):
+        max_price = max(max_price, high[t - i])
+        min_price = min(min_price, low[t - i])
+    bin_size = (max_price - min_price) / resolution
+    if bin_size == 0:
+        bin_size = mintick
+
+    bin_prices = [min_price + j * bin_size for j in range(resolution)]
+    bin_volumes = [0.0] * resolution
+    for i in range(lookback + 1):
+        bar_high, bar_low, bar_vol = high[t - i], low[t - i], volume[t - i]
+        for j in range(resolution):
+            overlap = max(0, min(bar_high, bin_prices[j] + bin_size) - max(bar_low, bin_prices[j]))
+            if overlap > 0:
+                bar_range = bar_high - bar_low
+                bin_volumes[j] += bar_vol * (overlap / bar_range if bar_range > 0 else 0)
+
+    max_vol, poc_index = 0, 0
+    for j in range(resolution):
+        if bin_volumes[j] > max_vol:
+            max_vol, poc_index = bin_volumes[j], j
+    poc = bin_prices[poc_index] + bin_size / 2
+
+    target = sum(bin_volumes) * (value_area_pct / 100)
+    va_volume = bin_volumes[poc_index]
+    upper = lower = poc_index
+    while va_volume < target and (upper < resolution - 1 or lower > 0):
+        upper_vol = bin_volumes[upper + 1] if upper < resolution - 1 else 0
+        lower_vol = bin_volumes[lower - 1] if lower > 0 else 0
+        if upper_vol >= lower_vol and upper < resolution - 1:
+            upper += 1
+            va_volume += upper_vol
+        elif lower > 0:
+            lower -= 1
+            va_volume += lower_vol
+        else:
+            break
+    return poc, bin_prices[upper] + bin_size, bin_prices[lower], bin_volumes
+
+
+def pine_position(close, poc, vah, val):
+    if close > vah:
+        return "ABOVE VA"
+    if close < val:
+        return "BELOW VA"
+    if close > poc:
+        return "Upper VA"
+    if close < poc:
+        return "Lower VA"
+    return "AT POC"
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_rolling_profile_matches_pine(seed):
+    df = synthetic_ohlcv(300, seed=seed)
+    high, low, close, volume = ohlcv_arrays(df)
+    out = rolling_volume_profile(df)
+    bins = profile_bins(high, low, volume, 51)
+
+    assert out["poc"].iloc[:50].isna().all()
+    for t in range(50, len(df)):
+        poc, vah, val, bin_volumes = pine_profile(high, low, volume, t)
+        assert np.allclose(bins.volumes[t - 50, :, 0], bin_volumes), t
+        row = out.iloc[t]
+        assert np.isclose(row["poc"], poc) and np.isclose(row["vah"], vah) and np.isclose(row["val"], val), t
+        assert row["position"] == pine_position(close[t], poc, vah, val), t
+        assert row["at_poc"] == (abs(close[t] - poc) / close[t] < 0.005)
+
+
+def test_flat_window_uses_mintick():
+    df = synthetic_ohlcv(60)
+    df[["Open", "High", "Low", "Close"]] = 100.0
+    high, low, _, volume = ohlcv_arrays(df)
+    poc, vah, val, _ = pine_profile(high, low, volume, 59)
+    last = rolling_volume_profile(df).iloc[-1]
+    assert np.allclose([last["poc"], last["vah"], last["val"]], [poc, vah, val])
+
+
+def test_live_profile_matches_batch_histogram():
+    df = synthetic_ohlcv(400, seed=4)
+    high, low, _, volume = ohlcv_arrays(df)
+    bins = profile_bins(high, low, volume, 51)
+
+    live = RollingVolumeProfile.from_frame(df.iloc[:51])
+    for t in range(51, len(df)):
+        live.update(high[t], low[t], volume[t])
+        bottom, step, volumes = live.histogram()
+        w = t - 50
+        assert np.isclose(bottom, bins.bottom[w]) and np.isclose(step, bins.step[w])
+        assert np.allclose(volumes, bins.volumes[w, :, 0], rtol=1e-9, atol=1e-6)
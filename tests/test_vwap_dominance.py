@@ -0,0 +1,80 @@
+"""vwap_dominance against a bar-by-bar port of the Pine script's running state"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench_markov import synthetic_ohlcv
+from vwap_dominance import daily_dominance, session_vwap
+
+
+def rth_bars(days=40, seed=0):
+    """15-minute regular-hours bars (26 a day) on business days, New York time"""
+    sessions = pd.bdate_range("2024-03-04", periods=days)
+    times = [day + pd.Timedelta(hours=9, minutes=30) + k * pd.Timedelta(minutes=15)
+             for day in sessions for k in range(26)]
+    df = synthetic_ohlcv(len(times), seed=seed)
+    df.index = pd.DatetimeIndex(times).tz_localize("America/New_York")
+    return df
+
+
+def pine_dominance(df, threshold=17, min_bars=10):
+    """Per bar: vwap, USE TODAY and TOMORROW PREVIEW, updated as the Pine script does"""
+    pv = v = 0.0
+    above = below = 0
+    y_above = y_below = None
+    y_bars = 0
+    prev_day = None
+    rows = []
+    for ts, (high, low, close, volume) in zip(df.index, df[["High", "Low", "Close", "Volume"]].to_numpy()):
+        new_day = prev_day is not None and ts.day != prev_day      # every bar here is inside RTH
+        prev_day = ts.day
+        if new_day:
+            pv = v = 0.0
+        pv += (high + low + close) / 3 * volume
+        v += volume
+        vwap = pv / v if v > 0 else np.nan
+        if new_day:
+            if above + below > 0:
+                y_above, y_below, y_bars = above, below, above + below
+            above = below = 0
+        if not np.isnan(vwap):
+            if close > vwap:
+                above += 1
+            elif close < vwap:
+                below += 1
+
+        use_today = "WAITING"
+        if y_above is not None and y_bars > 0:
+            use_today = "BULLISH" if y_above >= threshold else "BEARISH" if y_below >= threshold else "NO EDGE"
+        preview = "DEVELOPING"
+        if above + below >= min_bars:
+            preview = "BULLISH" if above >= threshold else "BEARISH" if below >= threshold else "NO EDGE"
+        rows.append((vwap, above, below, use_today, preview))
+    return pd.DataFrame(rows, columns=["vwap", "above", "below", "use_today", "preview"], index=df.index)
+
+
+@pytest.mark.parametrize("seed,threshold", [(0, 17), (1, 14), (2, 12)])
+def test_daily_dominance_matches_pine(seed, threshold):
+    df = rth_bars(seed=seed)
+    pine = pine_dominance(df, threshold)
+    bars = session_vwap(df)
+    assert np.allclose(bars["vwap"], pine["vwap"])
+    assert (bars["above_count"].to_numpy() == pine["above"].to_numpy()).all()
+    assert (bars["below_count"].to_numpy() == pine["below"].to_numpy()).all()
+
+    # USE TODAY holds all day; TOMORROW PREVIEW as of the day's last bar
+    days = daily_dominance(df, threshold).set_index("session")
+    by_day = pine.groupby(pine.index.tz_localize(None).normalize())
+    assert (days["use_today"] == by_day["use_today"].last()).all()
+    assert (days["preview"] == by_day["preview"].last()).all()
+    assert (days["above"] == by_day["above"].last()).all() and (days["below"] == by_day["below"].last()).all()
+    assert {"BULLISH", "BEARISH"} & set(days["use_today"])          # not only NO EDGE / WAITING
+
+
+def test_extended_hours_bars_are_ignored():
+    df = rth_bars(days=5)
+    pre = df.iloc[::26].copy()
+    pre.index = pre.index - pd.Timedelta(hours=1)
+    extended = pd.concat([df, pre]).sort_index()
+    pd.testing.assert_frame_equal(daily_dominance(extended), daily_dominance(df))
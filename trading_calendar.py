@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Precomputed NYSE trading calendar
+
+Every regular session from FIRST_YEAR to LAST_YEAR is computed once into
+three sorted arrays (session date, open and close as UTC nanoseconds), so
+questions about millions of timestamps are a single searchsorted:
+
+    cal = get_calendar()
+    cal.is_open()                                  # right now
+    cal.last_completed_session()                   # last session whose close has passed
+    labels = cal.label_bars(df["datetime"], "5m")  # session, in_session, early_close, complete
+
+Regular hours are 9:30-16:00 New York time. Full-day holidays:
+- New Year's Day (Sunday -> Monday; not observed when it falls on a Saturday)
+- Martin Luther King Jr. Day (3rd Monday of January, from 1998)
+- Washington's Birthday (3rd Monday of February)
+- Good Friday
+- Memorial Day (last Monday of May)
+- Juneteenth (June 19, from 2022)
+- Independence Day, Labor Day (1st Monday of September)
+- Thanksgiving (4th Thursday of November), Christmas
+Fixed-date holidays on a Saturday close the Friday before, on a Sunday the
+Monday after. Market-wide special closures are listed in SPECIAL_CLOSURES.
+
+Early closes (13:00): July 3 when it is Monday-Thursday, the day after
+Thanksgiving, and December 24 when it is Monday-Thursday.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+
+TZ = "America/New_York"
+FIRST_YEAR = 1990
+LAST_YEAR = 2050
+OPEN_TIME = pd.Timedelta(hours=9, minutes=30)
+CLOSE_TIME = pd.Timedelta(hours=16)
+EARLY_CLOSE_TIME = pd.Timedelta(hours=13)
+
+# Unscheduled full-day closures (funerals, 9/11, hurricanes)
+SPECIAL_CLOSURES = [
+    date(1994, 4, 27),                                      # President Nixon
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+    date(2004, 6, 11),                                      # President Reagan
+    date(2007, 1, 2),                                       # President Ford
+    date(2012, 10, 29), date(2012, 10, 30),                 # Hurricane Sandy
+    date(2018, 12, 5),                                      # President G. H. W. Bush
+    date(2025, 1, 9),                                       # President Carter
+]
+
+
+def easter(year: int) -> date:
+    """Western (Gregorian) Easter Sunday, anonymous Gregorian algorithm"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th (1-based) weekday (Mon=0) of a month; n=-1 for the last one"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def holidays(year: int) -> List[date]:
+    """Full-day NYSE holidays of one year (special closures not included)"""
+    days = []
+
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:           # a Saturday New Year's Day is not observed
+        days.append(_observed(new_year))
+    if year >= 1998:
+        days.append(_nth_weekday(year, 1, 0, 3))
+    days.append(_nth_weekday(year, 2, 0, 3))
+    days.append(easter(year) - timedelta(days=2))
+    days.append(_nth_weekday(year, 5, 0, -1))
+    if year >= 2022:
+        days.append(_observed(date(year, 6, 19)))
+    days.append(_observed(date(year, 7, 4)))
+    days.append(_nth_weekday(year, 9, 0, 1))
+    days.append(_nth_weekday(year, 11, 3, 4))
+    days.append(_observed(date(year, 12, 25)))
+    return sorted(days)
+
+
+def early_closes(year: int) -> List[date]:
+    """13:00 closes of one year"""
+    days = [_nth_weekday(year, 11, 3, 4) + timedelta(days=1)]
+    for day in (date(year, 7, 3), date(year, 12, 24)):
+        if day.weekday() <= 3:
+            days.append(day)
+    return sorted(days)
+
+
+def _to_utc_ns(timestamps) -> np.ndarray:
+    """int64 UTC nanoseconds; tz-naive stamps are New York wall time"""
+    index = pd.DatetimeIndex(pd.to_datetime(timestamps))
+    if index.tz is None:
+        index = index.tz_localize(TZ, ambiguous="NaT", nonexistent="shift_forward")
+    return index.tz_convert("UTC").as_unit("ns").asi8
+
+
+class TradingCalendar:
+    """NYSE sessions as sorted arrays, with vectorized lookups"""
+
+    def __init__(self, first_year: int = FIRST_YEAR, last_year: int = LAST_YEAR):
+        days = pd.date_range(f"{first_year}-01-01", f"{last_year}-12-31", freq="D")
+        closed = {d for y in range(first_year, last_year + 1) for d in holidays(y)}
+        closed.update(SPECIAL_CLOSURES)
+        early = {d for y in range(first_year, last_year + 1) for d in early_closes(y)}
+
+        weekday = days.dayofweek < 5
+        is_closed = days.isin(pd.DatetimeIndex(sorted(closed)))
+        self.dates = days[weekday & ~is_closed]
+        self.early_close = self.dates.isin(pd.DatetimeIndex(sorted(early)))
+
+        local_open = self.dates + OPEN_TIME
+        local_close = self.dates + pd.to_timedelta(np.where(self.early_close, EARLY_CLOSE_TIME.value,
+                                                             CLOSE_TIME.value))
+        self.opens = local_open.tz_localize(TZ).tz_convert("UTC").as_unit("ns").asi8
+        self.closes = pd.DatetimeIndex(local_close).tz_localize(TZ).tz_convert("UTC").as_unit("ns").asi8
+        self._day_ns = self.dates.as_unit("ns").asi8
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def sessions(self, start=None, end=None) -> pd.DataFrame:
+        """Sessions between two dates (inclusive) with their New York open and close"""
+        lo = 0 if start is None else np.searchsorted(self.dates, pd.Timestamp(start).normalize())
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, pd.Timestamp(end).normalize(),
+                                                                 side="right")
+        return pd.DataFrame({
+            "session": self.dates[lo:hi],
+            "open": pd.DatetimeIndex(self.opens[lo:hi], tz="UTC").tz_convert(TZ),
+            "close": pd.DatetimeIndex(self.closes[lo:hi], tz="UTC").tz_convert(TZ),
+            "early_close": self.early_close[lo:hi],
+        })
+
+    def is_session(self, dates) -> np.ndarray:
+        """Whether each date is a trading day"""
+        day = pd.DatetimeIndex(pd.to_datetime(dates)).tz_localize(None).normalize().as_unit("ns").asi8
+        pos = np.clip(np.searchsorted(self._day_ns, day), 0, len(self._day_ns) - 1)
+        return self._day_ns[pos] == day
+
+    def is_open(self, now=None) -> bool:
+        """Whether the regular session is in progress at `now` (default: the current time)"""
+        t = _to_utc_ns([now or pd.Timestamp.now(tz="UTC")])[0]
+        i = np.searchsorted(self.opens, t, side="right") - 1
+        return bool(i >= 0 and t < self.closes[i])
+
+    def last_completed_session(self, now=None) -> date:
+        """Date of the latest session whose close is at or before `now`"""
+        t = _to_utc_ns([now or pd.Timestamp.now(tz="UTC")])[0]
+        i = np.searchsorted(self.closes, t, side="right") - 1
+        if i < 0:
+            raise ValueError(f"{now} is before the calendar starts ({self.dates[0].date()})")
+        return self.dates[i].date()
+
+    def label_bars(self, timestamps, timeframe="1d", now=None) -> pd.DataFrame:
+        """Session, in_session, early_close and complete for every bar start in one pass
+
+        Bars of a day or longer are matched by calendar date (their own date,
+        not converted to New York), cover [date, date + length) and are
+        complete once the close of their last session has passed. Intraday
+        bars belong to the session whose hours contain them and are complete
+        once min(start + length, session close) has passed.
+        """
+        bar = pd.Timedelta(timeframe)
+        now_ns = _to_utc_ns([now or pd.Timestamp.now(tz="UTC")])[0]
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps))
+
+        if bar >= pd.Timedelta(days=1):
+            day = index.tz_localize(None).normalize().as_unit("ns").asi8
+            first = np.searchsorted(self._day_ns, day)
+            last = np.searchsorted(self._day_ns, day + bar.value) - 1
+            in_session = last >= first
+            pos = np.clip(first, 0, len(self._day_ns) - 1)
+            end = np.clip(last, 0, len(self._day_ns) - 1)
+            complete = np.where(in_session, self.closes[end] <= now_ns, day + bar.value <= now_ns)
+        else:
+            t = _to_utc_ns(index)
+            pos = np.clip(np.searchsorted(self.opens, t, side="right") - 1, 0, len(self.opens) - 1)
+            in_session = (t >= self.opens[pos]) & (t < self.closes[pos])
+            bar_end = np.where(in_session, np.minimum(t + bar.value, self.closes[pos]), t + bar.value)
+            complete = bar_end <= now_ns
+
+        session = np.where(in_session, self._day_ns[pos], np.datetime64("NaT", "ns").astype(np.int64))
+        return pd.DataFrame({
+            "session": pd.DatetimeIndex(session.astype("datetime64[ns]")),
+            "in_session": in_session,
+            "early_close": in_session & self.early_close[pos],
+            "complete": complete,
+        })
+
+
+@lru_cache(maxsize=None)
+def get_calendar() -> TradingCalendar:
+    """The shared calendar, built on first use"""
+    return TradingCalendar()
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="NYSE sessions, holidays and early closes")
+    ap.add_argument("year", type=int, nargs="?", default=datetime.now().year)
+    args = ap.parse_args()
+
+    cal = get_calendar()
+    print(f"Holidays {args.year}:")
+    for d in holidays(args.year):
+        print(f"  {d} {d.strftime('%a')}")
+    print(f"Early closes {args.year} (13:00):")
+    for d in early_closes(args.year):
+        print(f"  {d} {d.strftime('%a')}")
+    print(f"\nSessions in {args.year}: {len(cal.sessions(f'{args.year}-01-01', f'{args.year}-12-31'))}")
+    print(f"Market open now: {cal.is_open()}")
+    print(f"Last completed session: {cal.last_completed_session()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
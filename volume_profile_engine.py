@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Vectorized volume profile: POC and value area for every bar
+
+Python port of the profile in volume_profile.py (a Pine script). For each
+bar the last lookback + 1 bars are binned into `resolution` equal price
+bins between the window's low and high; every bar spreads its volume over
+the bins in proportion to how much of its high-low range each bin covers.
+The Point of Control (POC) is the middle of the fullest bin and the value
+area grows from the POC towards the fuller neighbour until it holds
+value_area_pct of the volume.
+
+Pine recomputes this with nested loops, O(lookback x resolution) per bar.
+Here each window is O(lookback + resolution): a bar's share of volume below
+a price is a ramp between its low and high, so the volume below every bin
+edge is two cumulative sums over a difference array. All windows of the
+history are processed together in chunks:
+
+    profile = rolling_volume_profile(df)          # poc, vah, val, position, ... per bar
+    bins = volume_profile(df)                     # histogram of the last window
+
+For a live feed, RollingVolumeProfile keeps the same profile on a fixed
+tick grid with O(1) work per new bar:
+
+    live = RollingVolumeProfile.from_frame(df)
+    live.update(high, low, volume)
+    live.levels()                                 # poc, vah, val of the current window
+
+    python volume_profile_engine.py NVDA AAPL
+    python volume_profile_engine.py --universe universe.txt --offline
+
+profile_bins() takes several volume columns at once (e.g. total, buy and
+sell volume), so one overlap computation serves all of them.
+"""
+
+import argparse
+import math
+from collections import deque
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+LOOKBACK = 50
+RESOLUTION = 24
+VALUE_AREA_PCT = 70.0
+MINTICK = 0.01            # bin size when the window has no range (Pine: syminfo.mintick)
+POC_PROXIMITY = 0.005     # "at POC" when |close - poc| / close is below this
+CHUNK_WINDOWS = 4096      # windows binned per numpy pass (bounds memory on long histories)
+
+ABOVE_VA = "ABOVE VA"
+BELOW_VA = "BELOW VA"
+UPPER_VA = "Upper VA"
+LOWER_VA = "Lower VA"
+AT_POC = "AT POC"
+
+
+class ProfileLevels(NamedTuple):
+    poc: float
+    vah: float
+    val: float
+
+
+class ProfileBins(NamedTuple):
+    """Binned volume of every window; window i ends at bar i + window - 1"""
+    bottom: np.ndarray     # (n_windows,) lowest low of the window
+    step: np.ndarray       # (n_windows,) bin height
+    volumes: np.ndarray    # (n_windows, resolution, k) volume per bin and column
+
+
+def ohlcv_arrays(df: pd.DataFrame):
+    """high, low, close, volume as float arrays from yfinance- or eToro-style columns"""
+    frame = df.rename(columns=str.lower)
+    return tuple(frame[c].to_numpy(dtype=float) for c in ("high", "low", "close", "volume"))
+
+
+def rolling_range(high: np.ndarray, low: np.ndarray, window: int):
+    """Highest high and lowest low of each full window (n - window + 1 values)"""
+    hi = pd.Series(high).rolling(window).max().to_numpy()[window - 1:]
+    lo = pd.Series(low).rolling(window).min().to_numpy()[window - 1:]
+    return hi, lo
+
+
+def _bin_chunk(high, low, weights, starts, bottom, step, window, resolution):
+    """Proportional bin volumes for the windows starting at `starts`, via a difference array
+
+    In bin units a bar covers [a, b]; its volume below edge x is
+    d * (ramp(x - a) - ramp(x - b)) with density d = weight / (b - a). A ramp
+    starting at a is, on the integer edges, a jump of ceil(a) - a at ceil(a)
+    followed by slope 1, so jumps and slopes go into two (resolution + 2)
+    columns per window and two cumulative sums give the volume below every edge.
+    """
+    n_win, k = len(starts), weights.shape[1]
+    idx = starts[:, None] + np.arange(window)                         # (n_win, window) bar index
+    a = (low[idx] - bottom[:, None]) / step[:, None]
+    b = (high[idx] - bottom[:, None]) / step[:, None]
+    span = b - a
+    density = np.where(span > 0, 1.0 / np.where(span > 0, span, 1.0), 0.0)   # zero-range bars add nothing
+
+    width = resolution + 2
+    ca = np.minimum(np.ceil(a), width - 1).astype(np.int64)
+    cb = np.minimum(np.ceil(b), width - 1).astype(np.int64)
+    row = (np.arange(n_win) * width)[:, None]
+    cells = np.concatenate([(row + ca).ravel(), (row + cb).ravel()])
+    slope = np.concatenate([density.ravel(), -density.ravel()])
+    jump = np.concatenate([(density * (ca - a)).ravel(), -(density * (cb - b)).ravel()])
+
+    volumes = np.empty((n_win, resolution, k))
+    for col in range(k):
+        w = np.tile(weights[idx, col].ravel(), 2)
+        s = np.bincount(cells, slope * w, minlength=n_win * width).reshape(n_win, width)
+        j = np.bincount(cells, jump * w, minlength=n_win * width).reshape(n_win, width)
+        # volume below edge e = sum of jumps at <= e + sum over slopes of (e - start)
+        ramp = np.zeros_like(s)
+        ramp[:, 1:] = np.cumsum(np.cumsum(s, axis=1), axis=1)[:, :-1]
+        below = np.cumsum(j, axis=1) + ramp
+        volumes[:, :, col] = np.diff(below[:, :resolution + 1], axis=1)
+    return volumes
+
+
+def profile_bins(high: np.ndarray, low: np.ndarray, weights: np.ndarray, window: int,
+                 resolution: int = RESOLUTION, mintick: float = MINTICK,
+                 chunk: int = CHUNK_WINDOWS) -> ProfileBins:
+    """Bin every full `window`-bar window of high/low with the (N,) or (N, k) `weights`
+
+    Bins span [lowest low, highest high] of the window in `resolution` equal
+    steps (mintick when the window has no range); each bar spreads its weight
+    over the bins in proportion to the overlap with its high-low range.
+    """
+    high, low = np.asarray(high, dtype=float), np.asarray(low, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    weights = weights[:, None] if weights.ndim == 1 else weights
+    n_win = max(len(high) - window + 1, 0)
+
+    hi, lo = rolling_range(high, low, window) if n_win else (np.empty(0), np.empty(0))
+    step = (hi - lo) / resolution
+    step = np.where(step == 0, mintick, step)
+
+    volumes = np.empty((n_win, resolution, weights.shape[1]))
+    for start in range(0, n_win, chunk):
+        sl = slice(start, min(start + chunk, n_win))
+        volumes[sl] = _bin_chunk(high, low, weights, np.arange(sl.start, sl.stop),
+                                 lo[sl], step[sl], window, resolution)
+    return ProfileBins(lo, step, volumes)
+
+
+def value_area(volumes: np.ndarray, value_area_pct: float = VALUE_AREA_PCT):
+    """POC, lower and upper value-area bin of every (n, resolution) histogram row
+
+    POC is the first fullest bin. From there the area grows one bin at a
+    time towards the fuller neighbour (up on ties) until it holds
+    value_area_pct of the volume, exactly like the Pine loop, but one step
+    for all rows at once (at most resolution - 1 steps).
+    """
+    n, resolution = volumes.shape
+    rows = np.arange(n)
+    poc = np.argmax(volumes, axis=1)
+    upper, lower = poc.copy(), poc.copy()
+    filled = volumes[rows, poc]
+    target = volumes.sum(axis=1) * (value_area_pct / 100)
+
+    active = (filled < target) & ((upper < resolution - 1) | (lower > 0))
+    for _ in range(resolution - 1):
+        if not active.any():
+            break
+        can_up, can_down = upper < resolution - 1, lower > 0
+        up_vol = np.where(can_up, volumes[rows, np.minimum(upper + 1, resolution - 1)], 0.0)
+        down_vol = np.where(can_down, volumes[rows, np.maximum(lower - 1, 0)], 0.0)
+        go_up = active & can_up & (up_vol >= down_vol)
+        go_down = active & ~go_up & can_down
+        upper += go_up
+        lower -= go_down
+        filled += np.where(go_up, up_vol, np.where(go_down, down_vol, 0.0))
+        active &= (go_up | go_down) & (filled < target) & ((upper < resolution - 1) | (lower > 0))
+    return poc, lower, upper
+
+
+def va_position(close, poc, vah, val) -> np.ndarray:
+    """ABOVE VA / BELOW VA / Upper VA / Lower VA / AT POC ("" where the profile is missing)"""
+    close, poc, vah, val = (np.asarray(x, dtype=float) for x in (close, poc, vah, val))
+    return np.select(
+        [np.isnan(poc) | np.isnan(vah) | np.isnan(val), close > vah, close < val, close > poc, close < poc],
+        ["", ABOVE_VA, BELOW_VA, UPPER_VA, LOWER_VA],
+        AT_POC,
+    ).astype(object)
+
+
+def rolling_volume_profile(df: pd.DataFrame, lookback: int = LOOKBACK, resolution: int = RESOLUTION,
+                           value_area_pct: float = VALUE_AREA_PCT, mintick: float = MINTICK,
+                           chunk: int = CHUNK_WINDOWS) -> pd.DataFrame:
+    """poc, vah, val, position and alert flags for every bar (NaN until lookback + 1 bars exist)
+
+    above_va / below_va / at_poc are the Pine alert states; the new_* columns
+    are True on the bar where the state starts (the alertcondition triggers).
+    """
+    high, low, close, volume = ohlcv_arrays(df)
+    window = lookback + 1
+    bins = profile_bins(high, low, volume, window, resolution, mintick, chunk)
+    poc_bin, lower, upper = value_area(bins.volumes[:, :, 0], value_area_pct)
+
+    n = len(close)
+    poc, vah, val = (np.full(n, np.nan) for _ in range(3))
+    done = slice(window - 1, n)
+    poc[done] = bins.bottom + (poc_bin + 0.5) * bins.step
+    vah[done] = bins.bottom + (upper + 1) * bins.step
+    val[done] = bins.bottom + lower * bins.step
+
+    out = pd.DataFrame({"close": close, "poc": poc, "vah": vah, "val": val}, index=df.index)
+    out["position"] = va_position(close, poc, vah, val)
+    with np.errstate(invalid="ignore"):
+        out["above_va"] = close > vah
+        out["below_va"] = close < val
+        out["at_poc"] = np.abs(close - poc) / close < POC_PROXIMITY
+    for state in ("above_va", "below_va", "at_poc"):
+        now = out[state].to_numpy()
+        out[f"new_{state}"] = now & ~np.r_[False, now[:-1]]
+    return out
+
+
+def volume_profile(df: pd.DataFrame, lookback: int = LOOKBACK, resolution: int = RESOLUTION,
+                   value_area_pct: float = VALUE_AREA_PCT, mintick: float = MINTICK) -> pd.DataFrame:
+    """Histogram of the last window: bin bottom/top, volume, and POC / value-area membership"""
+    high, low, _, volume = ohlcv_arrays(df.iloc[-(lookback + 1):])
+    bins = profile_bins(high, low, volume, lookback + 1, resolution, mintick)
+    if not len(bins.bottom):
+        raise ValueError(f"Need {lookback + 1} bars for a {lookback}-bar profile, got {len(df)}")
+    volumes = bins.volumes[0, :, 0]
+    poc, lower, upper = (int(x[0]) for x in value_area(volumes[None, :], value_area_pct))
+
+    bottom = bins.bottom[0] + np.arange(resolution) * bins.step[0]
+    return pd.DataFrame({
+        "bottom": bottom,
+        "top": bottom + bins.step[0],
+        "volume": volumes,
+        "poc": np.arange(resolution) == poc,
+        "value_area": (np.arange(resolution) >= lower) & (np.arange(resolution) <= upper),
+    })
+
+
+class RollingVolumeProfile:
+    """Sliding-window volume profile on a fixed tick grid, O(1) per bar
+
+    Bars are spread over a grid of `tick`-sized price cells that never moves,
+    so a bar entering or leaving the window touches four cells: in the
+    difference-array form of profile_bins() a bar is a jump and a slope
+    where its low starts and the negated pair where its high ends. The
+    window's low and high come from monotonic deques. Only a query
+    integrates the grid over the window's range, O(range / tick), and
+    rebins it to `resolution` bins, whose edges generally fall inside cells.
+    With highs and lows on the tick grid the volume inside a cell is uniform,
+    so the rebinned histogram equals profile_bins() up to rounding (levels can
+    differ only where two bins tie); off-grid prices are smeared by at most
+    one tick.
+
+    When price leaves the grid it is re-centred on the window, an O(window)
+    rebuild amortized over the bars it took to get there. Adding and
+    subtracting floats leaves rounding residue in the grid, so it is also
+    rebuilt every REBUILD_EVERY updates.
+    """
+
+    REBUILD_EVERY = 10_000
+    GROW = 1024               # minimum spare cells on each side of the window's range
+
+    def __init__(self, lookback: int = LOOKBACK, resolution: int = RESOLUTION,
+                 value_area_pct: float = VALUE_AREA_PCT, tick: float = MINTICK):
+        self.window = lookback + 1
+        self.resolution = resolution
+        self.value_area_pct = value_area_pct
+        self.tick = float(tick)
+
+        self.origin: Optional[float] = None    # price of grid cell 0
+        self.slope = np.zeros(0)
+        self.jump = np.zeros(0)
+        self.bars = deque()                     # (index, high, low, volume) of the window
+        self._max = deque()                     # (index, high), highs decreasing
+        self._min = deque()                     # (index, low), lows increasing
+        self.n_bars = 0
+        self._since_rebuild = 0
+        self._levels: Optional[ProfileLevels] = None
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lookback: int = LOOKBACK, resolution: int = RESOLUTION,
+                   value_area_pct: float = VALUE_AREA_PCT, tick: float = MINTICK) -> "RollingVolumeProfile":
+        """Profile of the last lookback + 1 bars of df, ready for update()"""
+        profile = cls(lookback, resolution, value_area_pct, tick)
+        high, low, _, volume = ohlcv_arrays(df.iloc[-profile.window:])
+        profile.n_bars = len(df) - len(high)
+        for h, l, v in zip(high, low, volume):
+            profile.update(h, l, v)
+        return profile
+
+    def _ticks(self, price: float) -> float:
+        """Price in grid units, snapped to an integer when it is one up to rounding"""
+        x = (price - self.origin) / self.tick
+        r = round(x)
+        return float(r) if abs(x - r) < 1e-9 else x
+
+    def _ensure(self, low: float, high: float) -> None:
+        """Make room for [low, high]: a new grid around the window when a bar falls outside
+
+        The grid spans the window's range plus as many spare cells on each
+        side (at least GROW), so it is rebuilt (O(window)) only after price
+        has moved a whole window range beyond it; its size follows the
+        window's range instead of the price's whole history.
+        """
+        if self.origin is not None and low >= self.origin and self._ticks(high) + 2 < len(self.slope):
+            return
+        lows = [l for _, _, l, _ in self.bars] + [low]
+        highs = [h for _, h, _, _ in self.bars] + [high]
+        spare = max(self.GROW, math.ceil((max(highs) - min(lows)) / self.tick))
+        self.origin = (math.floor(min(lows) / self.tick) - spare) * self.tick
+        size = math.ceil(self._ticks(max(highs))) + 2 + spare
+        self.slope = np.zeros(size)
+        self.jump = np.zeros(size)
+        self.rebuild()
+
+    def _spread(self, high: float, low: float, volume: float, sign: float) -> None:
+        """Add (sign=1) or remove (sign=-1) one bar's volume; zero-range bars carry none"""
+        a, b = self._ticks(low), self._ticks(high)
+        if b <= a:
+            return
+        d = sign * volume / (b - a)
+        ca, cb = math.ceil(a), math.ceil(b)
+        self.slope[ca] += d
+        self.jump[ca] += d * (ca - a)
+        self.slope[cb] -= d
+        self.jump[cb] -= d * (cb - b)
+
+    def update(self, high: float, low: float, volume: float) -> None:
+        """Add one bar, dropping the oldest once the window is full"""
+        i = self.n_bars
+        self._ensure(low, high)
+        self.bars.append((i, high, low, volume))
+        self._spread(high, low, volume, 1.0)
+        if len(self.bars) > self.window:
+            _, h, l, v = self.bars.popleft()
+            self._spread(h, l, v, -1.0)
+
+        while self._max and self._max[-1][1] <= high:
+            self._max.pop()
+        self._max.append((i, high))
+        while self._min and self._min[-1][1] >= low:
+            self._min.pop()
+        self._min.append((i, low))
+        first = i - self.window + 1
+        while self._max[0][0] < first:
+            self._max.popleft()
+        while self._min[0][0] < first:
+            self._min.popleft()
+
+        self.n_bars += 1
+        self._levels = None
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.REBUILD_EVERY:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """Re-spread the window's bars on a zeroed grid (clears accumulated rounding)"""
+        self.slope[:] = 0.0
+        self.jump[:] = 0.0
+        for _, h, l, v in self.bars:
+            self._spread(h, l, v, 1.0)
+        self._since_rebuild = 0
+
+    @property
+    def ready(self) -> bool:
+        """True once the window holds lookback + 1 bars"""
+        return len(self.bars) == self.window
+
+    def histogram(self):
+        """(bottom, step, volumes) of the current window, rebinned from the grid"""
+        if not self.bars:
+            raise ValueError("No bars yet")
+        hi, lo = self._max[0][1], self._min[0][1]
+        step = (hi - lo) / self.resolution or self.tick
+
+        # volume below every integer cell edge spanning the window
+        k0 = math.floor(self._ticks(lo))
+        k1 = math.ceil(self._ticks(hi)) + 1
+        s, j = self.slope[k0:k1 + 1], self.jump[k0:k1 + 1]
+        below = np.cumsum(j) + np.r_[0.0, np.cumsum(np.cumsum(s))[:-1]]
+
+        # linear inside a cell, evaluated at the bin edges
+        x = np.array([self._ticks(lo + e * step) for e in range(self.resolution + 1)]) - k0
+        x = np.clip(x, 0, len(below) - 1)
+        edges = np.interp(x, np.arange(len(below)), below)
+        return lo, step, np.diff(edges)
+
+    def levels(self) -> ProfileLevels:
+        """POC, VAH and VAL of the current window (cached until the next update)"""
+        if self._levels is None:
+            bottom, step, volumes = self.histogram()
+            poc, lower, upper = (int(x[0]) for x in value_area(volumes[None, :], self.value_area_pct))
+            self._levels = ProfileLevels(bottom + (poc + 0.5) * step,
+                                         bottom + (upper + 1) * step,
+                                         bottom + lower * step)
+        return self._levels
+
+    def position(self, close: float) -> str:
+        """Value-area position of a price against the current window"""
+        poc, vah, val = self.levels()
+        return str(va_position([close], [poc], [vah], [val])[0])
+
+
+def profile_summary(ticker: str, df: pd.DataFrame, **kwargs) -> dict:
+    """Latest profile of one ticker as a flat row"""
+    last = rolling_volume_profile(df.iloc[-(kwargs.get("lookback", LOOKBACK) + 1):], **kwargs).iloc[-1]
+    close = last["close"]
+    return {
+        "ticker": ticker,
+        "close": close,
+        "position": last["position"],
+        "poc": last["poc"],
+        "vah": last["vah"],
+        "val": last["val"],
+        "poc_dist_pct": (close - last["poc"]) / close * 100,
+        "last_date": df.index[-1].date() if hasattr(df.index[-1], "date") else df.index[-1],
+    }
+
+
+def main():
+    from price_cache import load_prices
+    from super_markov import read_universe
+
+    ap = argparse.ArgumentParser(description="Volume profile POC / value area for one or many tickers")
+    ap.add_argument("ticker", nargs="*", help="Tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--lookback", type=int, default=LOOKBACK, help=f"Lookback bars (default: {LOOKBACK})")
+    ap.add_argument("--resolution", type=int, default=RESOLUTION, help=f"Price bins (default: {RESOLUTION})")
+    ap.add_argument("--value-area", type=float, default=VALUE_AREA_PCT,
+                    help=f"Value area %% (default: {VALUE_AREA_PCT:g})")
+    ap.add_argument("--cache-dir", default=None, help="Price cache directory")
+    ap.add_argument("--offline", action="store_true", help="Use cached prices only")
+    args = ap.parse_args()
+
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    if not tickers:
+        ap.error("give at least one ticker or --universe")
+
+    params = dict(lookback=args.lookback, resolution=args.resolution, value_area_pct=args.value_area)
+    rows = []
+    for ticker in tickers:
+        try:
+            df = load_prices(ticker, cache_dir=args.cache_dir, offline=args.offline)
+            rows.append(profile_summary(ticker, df, **params))
+        except Exception as e:
+            rows.append({"ticker": ticker, "error": f"{type(e).__name__}: {e}"})
+
+    results = pd.DataFrame(rows)
+    if len(tickers) == 1 and "error" not in results:
+        print(volume_profile(df, **params).iloc[::-1].to_string(index=False, float_format="%.2f"))
+        print()
+    for col in ("close", "poc", "vah", "val"):
+        if col in results:
+            results[col] = results[col].map(lambda x: f"{x:.2f}" if pd.notna(x) else "")
+    if "poc_dist_pct" in results:
+        results["poc_dist_pct"] = results["poc_dist_pct"].map(lambda x: f"{x:+.1f}%" if pd.notna(x) else "")
+    print(results.astype(object).fillna("").to_string(index=False))
+    return 0 if "error" not in results else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Session VWAP dominance: raw above/below counts per day, vectorized
+
+Python port of "Yesterday VWAP Dominance (Raw Count).pine". During regular
+trading hours (9:30-16:00 New York) each bar's close is compared with the
+session VWAP so far (cumulative hlc3 * volume / cumulative volume, reset
+every day), and the day's bars above and below are counted:
+
+- USE TODAY: yesterday's counts. BULLISH when yesterday had at least
+  `threshold` bars above VWAP, BEARISH when it had that many below, NO EDGE
+  otherwise, WAITING before the first counted day. Days without counts
+  keep the previous day's snapshot, as in Pine.
+- TOMORROW PREVIEW: the same call from today's own counts, once at least
+  `min_bars` bars were counted (DEVELOPING before).
+
+On 15-minute bars a full session has 26 bars, so the default threshold
+17 is about 65%.
+
+Pine keeps running sums bar by bar and only inside TradingView. Here
+sessions are grouped by New York date and the VWAP comes from grouped
+cumulative sums, so years of bars for many tickers take one pass. Every
+historical day gets its biases, and the threshold can be swept against
+the return of the session the bias is used for:
+
+    bars = session_vwap(df)             # per RTH bar: vwap, running above/below counts
+    days = daily_dominance(df)          # per day: counts, preview, use_today, session return
+    threshold_sweep(days)               # hit rate of USE TODAY for thresholds 10..26
+
+    python vwap_dominance.py NVDA AAPL --timeframe 15m --limit 20000
+    python vwap_dominance.py --universe universe.txt --sweep
+
+Pine starts a new day only on an RTH bar whose day of month differs from
+the previous bar's, which never happens when extended-hours bars precede
+the open; grouping by date does not depend on that.
+"""
+
+import argparse
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+from trading_calendar import TZ
+
+
+RTH_START = 930           # hhmm, New York
+RTH_END = 1600
+THRESHOLD = 17
+MIN_BARS = 10
+SWEEP_THRESHOLDS = range(10, 27)
+
+BULLISH = "BULLISH"
+BEARISH = "BEARISH"
+NO_EDGE = "NO EDGE"
+WAITING = "WAITING"
+DEVELOPING = "DEVELOPING"
+
+
+def _new_york_times(df: pd.DataFrame) -> pd.DatetimeIndex:
+    """Bar times in New York from a datetime column or a DatetimeIndex (naive = New York time)"""
+    stamps = df["datetime"] if "datetime" in df else df.index
+    index = pd.DatetimeIndex(pd.to_datetime(stamps))
+    if index.tz is None:
+        return index.tz_localize(TZ, ambiguous="NaT", nonexistent="shift_forward")
+    return index.tz_convert(TZ)
+
+
+def _grouped_cumsum(values: np.ndarray, group: np.ndarray) -> np.ndarray:
+    """Cumulative sum restarting with every group (summed per group, so no cross-day rounding)"""
+    return pd.Series(values).groupby(group, sort=False).cumsum().to_numpy()
+
+
+def session_vwap(df: pd.DataFrame) -> pd.DataFrame:
+    """Per regular-hours bar: session date, VWAP so far, above/below flags and running counts"""
+    ny = _new_york_times(df)
+    hm = ny.hour * 100 + ny.minute
+    rth = np.asarray((hm >= RTH_START) & (hm < RTH_END))
+
+    frame = df.rename(columns=str.lower)[rth]
+    ny = ny[rth]
+    high, low, close, volume = (frame[c].to_numpy(dtype=float) for c in ("high", "low", "close", "volume"))
+    session = ny.normalize().tz_localize(None)
+
+    day = pd.factorize(session)[0]
+    pv = _grouped_cumsum((high + low + close) / 3 * volume, day)
+    v = _grouped_cumsum(volume, day)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = np.where(v > 0, pv / v, np.nan)
+    above = close > vwap
+    below = close < vwap
+
+    return pd.DataFrame({
+        "session": session,
+        "open": frame["open"].to_numpy(dtype=float),
+        "close": close,
+        "vwap": vwap,
+        "above": above,
+        "below": below,
+        "above_count": _grouped_cumsum(above.astype(np.int64), day),
+        "below_count": _grouped_cumsum(below.astype(np.int64), day),
+    }, index=frame.index)
+
+
+def dominance_bias(above, below, threshold: int = THRESHOLD, default: str = NO_EDGE) -> np.ndarray:
+    """BULLISH / BEARISH / NO EDGE from raw counts; `default` where the counts are missing"""
+    above, below = np.asarray(above, dtype=float), np.asarray(below, dtype=float)
+    return np.select([np.isnan(above), above >= threshold, below >= threshold],
+                     [default, BULLISH, BEARISH], NO_EDGE).astype(object)
+
+
+def daily_dominance(df: pd.DataFrame, threshold: int = THRESHOLD, min_bars: int = MIN_BARS) -> pd.DataFrame:
+    """One row per session: raw counts, TOMORROW PREVIEW, USE TODAY and the session's return
+
+    session_return is the last RTH close over the first RTH open - 1, the
+    move the USE TODAY bias is meant to trade.
+    """
+    bars = session_vwap(df)
+    if bars.empty:
+        return pd.DataFrame(columns=["session", "bars", "above", "below", "total", "preview",
+                                     "y_above", "y_below", "use_today", "session_return"])
+
+    grouped = bars.groupby("session", sort=True)
+    days = pd.DataFrame({
+        "bars": grouped.size(),
+        "above": grouped["above"].sum(),
+        "below": grouped["below"].sum(),
+        "first_open": grouped["open"].first(),
+        "last_close": grouped["close"].last(),
+    })
+    days["total"] = days["above"] + days["below"]
+
+    counted = days["total"] > 0
+    days["preview"] = np.where(days["total"] >= min_bars,
+                               dominance_bias(days["above"], days["below"], threshold), DEVELOPING)
+
+    # Yesterday = the latest earlier day with any counts (Pine keeps the old snapshot otherwise)
+    days["y_above"] = days["above"].where(counted).shift(1).ffill().astype("Int64")
+    days["y_below"] = days["below"].where(counted).shift(1).ffill().astype("Int64")
+    days["use_today"] = dominance_bias(days["y_above"].astype(float), days["y_below"].astype(float),
+                                       threshold, default=WAITING)
+    days["session_return"] = days["last_close"] / days["first_open"] - 1
+    return days.drop(columns=["first_open", "last_close"]).reset_index()
+
+
+def threshold_sweep(days: pd.DataFrame, thresholds: Iterable[int] = SWEEP_THRESHOLDS) -> pd.DataFrame:
+    """USE TODAY for every threshold at once, scored against the same session's return
+
+    A BULLISH day is a hit when the session closes above its open, a BEARISH
+    day when it closes below. edge_pct is the mean of the return taken in
+    the bias direction. `days` can hold many tickers stacked together.
+    """
+    thresholds = np.asarray(list(thresholds))
+    y_above = days["y_above"].astype(float).to_numpy()
+    y_below = days["y_below"].astype(float).to_numpy()
+    ret = days["session_return"].to_numpy(dtype=float)
+    known = ~np.isnan(y_above) & ~np.isnan(ret)
+
+    # (thresholds, days) masks; signed = the session return in the bias direction
+    bull = known & (y_above >= thresholds[:, None])
+    bear = known & ~bull & (y_below >= thresholds[:, None])
+    signed = np.where(bull, ret, np.where(bear, -ret, np.nan))
+
+    with np.errstate(invalid="ignore"):
+        n_bull, n_bear = bull.sum(axis=1), bear.sum(axis=1)
+        n = n_bull + n_bear
+        out = pd.DataFrame({
+            "threshold": thresholds,
+            "bullish_days": n_bull,
+            "bearish_days": n_bear,
+            "bullish_hit": (bull & (ret > 0)).sum(axis=1) / np.where(n_bull, n_bull, np.nan),
+            "bearish_hit": (bear & (ret < 0)).sum(axis=1) / np.where(n_bear, n_bear, np.nan),
+            "hit_rate": (signed > 0).sum(axis=1) / np.where(n, n, np.nan),
+            "edge_pct": np.nansum(signed, axis=1) / np.where(n, n, np.nan) * 100,
+        })
+    return out
+
+
+def universe_dominance(frames: Dict[str, pd.DataFrame], threshold: int = THRESHOLD,
+                       min_bars: int = MIN_BARS) -> pd.DataFrame:
+    """daily_dominance() of several tickers stacked, with a ticker column"""
+    days = [daily_dominance(df, threshold, min_bars).assign(ticker=t) for t, df in frames.items()]
+    days = [d for d in days if not d.empty]
+    if not days:
+        return pd.DataFrame()
+    out = pd.concat(days, ignore_index=True)
+    return out[["ticker"] + [c for c in out.columns if c != "ticker"]]
+
+
+def _format_sweep(sweep: pd.DataFrame) -> pd.DataFrame:
+    out = sweep.astype(object)
+    for col in ("bullish_hit", "bearish_hit", "hit_rate"):
+        out[col] = sweep[col].map(lambda x: f"{x:.1%}" if pd.notna(x) else "")
+    out["edge_pct"] = sweep["edge_pct"].map(lambda x: f"{x:+.3f}%" if pd.notna(x) else "")
+    return out
+
+
+def main():
+    from market_fetch import fetch_all
+    from super_markov import read_universe
+
+    ap = argparse.ArgumentParser(description="Yesterday VWAP dominance (raw count) from intraday eToro bars")
+    ap.add_argument("ticker", nargs="*", help="Tickers")
+    ap.add_argument("--universe", default=None, help="File of tickers (one per line or comma-separated)")
+    ap.add_argument("--timeframe", default="15m", help="Bar size (default: 15m)")
+    ap.add_argument("--limit", type=int, default=2000, help="Candles per ticker (default: 2000)")
+    ap.add_argument("--threshold", type=int, default=THRESHOLD, help=f"Dominance bars (default: {THRESHOLD})")
+    ap.add_argument("--min-bars", type=int, default=MIN_BARS,
+                    help=f"Bars before TOMORROW PREVIEW makes a call (default: {MIN_BARS})")
+    ap.add_argument("--sweep", action="store_true", help="Score USE TODAY for thresholds 10..26")
+    ap.add_argument("--days", type=int, default=5, help="Recent days shown per ticker (default: 5)")
+    args = ap.parse_args()
+
+    tickers = [t.upper() for t in args.ticker]
+    if args.universe:
+        tickers += read_universe(args.universe)
+    if not tickers:
+        ap.error("give at least one ticker or --universe")
+
+    import simple_markov_etoro as etoro
+    results = fetch_all(tickers, source="etoro", client=etoro.get_client(), timeframe=args.timeframe,
+                        limit=args.limit)
+    frames = {t: df for t, (_, df, err) in results.items() if err is None}
+    for t, (_, _, err) in results.items():
+        if err is not None:
+            print(f"{t}: {type(err).__name__}: {err}")
+
+    days = universe_dominance(frames, args.threshold, args.min_bars)
+    if days.empty:
+        print("No regular-hours bars")
+        return 1
+
+    for ticker, group in days.groupby("ticker", sort=False):
+        print(f"{'='*70}")
+        print(f"{ticker}: {len(group)} sessions")
+        print(f"{'='*70}")
+        recent = group.tail(args.days).drop(columns="ticker").astype(object)
+        recent["session"] = group["session"].tail(args.days).dt.date
+        recent["session_return"] = group["session_return"].tail(args.days).map(lambda x: f"{x:+.2%}")
+        print(recent.fillna("").to_string(index=False))
+        print()
+
+    if args.sweep:
+        print(f"USE TODAY threshold sweep ({len(days)} sessions, {days['ticker'].nunique()} tickers):")
+        print(_format_sweep(threshold_sweep(days)).to_string(index=False))
+    return 0 if len(frames) == len(tickers) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())